@@ -22,6 +22,7 @@ def get_api_key() -> str:
     return os.getenv('OPENAI_API_KEY', '')
 
 from src.data_formatter import format_data_for_llm
+from src.schema import combine_date_time
 from src.llm_client import get_llm_response
 from src.ai_assistant_agent import answer_with_tools
 
@@ -49,15 +50,11 @@ def ensure_dt(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with 'dt' column added
     """
+    # Pipeline tuottaa 'dt'-sarakkeen valmiiksi; lasketaan vain jos se puuttuu
+    if "dt" in df.columns and pd.api.types.is_datetime64_any_dtype(df["dt"]):
+        return df.copy(deep=False)
     df = df.copy()
-    # date voi olla "YYYY-MM-DD" tai datetime; time voi puuttua
-    date = pd.to_datetime(df.get("date"), errors="coerce")
-    if "time" in df.columns:
-        # yhdistä date + time turvallisesti
-        time = pd.to_timedelta(df["time"].astype(str), errors="coerce")
-        df["dt"] = date + time.fillna(pd.Timedelta(0))
-    else:
-        df["dt"] = date
+    df["dt"] = combine_date_time(df.get("date"), df["time"] if "time" in df.columns else None)
     return df
 
 
@@ -204,7 +201,8 @@ def render_ai_assistant_tab(df: pd.DataFrame):
         if not vector_db_exists or 'vector_db_initialized' not in st.session_state:
             try:
                 with st.spinner("Luodaan vektoritietokantaa (ensimmäinen käyttö voi kestää hetken)..."):
-                    store_transactions(df, collection_name, api_key, vector_db_path, clear_existing=True)
+                    # Incremental: only new or changed transactions are embedded
+                    store_transactions(df, collection_name, api_key, vector_db_path)
                     st.session_state.vector_db_initialized = True
                     st.session_state.vector_db_timestamp = excel_modified
             except Exception as e:
@@ -215,8 +213,8 @@ def render_ai_assistant_tab(df: pd.DataFrame):
             # Data has changed, update vector store
             try:
                 with st.spinner("Päivitetään vektoritietokantaa..."):
-                    # Clear existing and recreate (clear_existing=True handles this)
-                    store_transactions(df, collection_name, api_key, vector_db_path, clear_existing=True)
+                    # Embed new/changed transactions and delete vanished ones
+                    store_transactions(df, collection_name, api_key, vector_db_path)
                     st.session_state.vector_db_timestamp = excel_modified
             except Exception as e:
                 st.warning(f"⚠️ Vektoritietokannan päivitys epäonnistui: {str(e)}")
@@ -50,9 +50,15 @@ except ImportError:
 from src.pipeline import (
     process_new_files,
     detect_new_files,
-    process_dataframe
+    process_transactions,
+    load_processed_data,
+    save_edited_data,
+    save_processed_data
 )
 from src.config import CATEGORY_EN_TO_FI, GENERAL_2ND_CATEGORIES
+from src.schema import combine_date_time, set_value
+from src.profiler import load_profile_reports
+from src.transaction_store import load_segments_since, merge_transactions, read_manifest
 
 
 # Page configuration
@@ -74,9 +80,47 @@ if 'selected_category' not in st.session_state:
 
 
 @st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_data():
-    """Load processed data (deprecated - using session state)."""
-    return pd.DataFrame()
+def load_data(store_version: int = 0):
+    """Load processed data from the persistent transaction store (cached per manifest version)."""
+    return load_processed_data()
+
+
+def load_store() -> pd.DataFrame:
+    """Load the whole transaction store and remember the manifest version it reflects."""
+    # Read the version first: segments published during the load are merged
+    # again by sync_store_segments, which the deduplication makes harmless
+    version = read_manifest()["version"]
+    st.session_state.store_version = version
+    return load_data(version)
+
+
+def sync_store_segments():
+    """Merge the segments published since the session's data was loaded (e.g. by auto_process)."""
+    known = st.session_state.get('store_version')
+    if known is None or st.session_state.df.empty:
+        return
+    
+    try:
+        new_rows, version = load_segments_since(known)
+    except Exception as e:
+        st.warning(f"Could not load new transactions: {e}")
+        return
+    
+    if version == known:
+        return
+    
+    if new_rows is None:
+        # The store was replaced or the segments were pruned: reload it whole
+        if st.session_state.edited:
+            st.info("ℹ️ The transaction store changed. Save or discard your edits to reload it.")
+            return
+        st.session_state.df = load_store()
+        return
+    
+    if not new_rows.empty:
+        st.session_state.df = merge_transactions(st.session_state.df, new_rows)
+        st.toast(f"📥 Loaded {len(new_rows)} new transaction(s)")
+    st.session_state.store_version = version
 
 
 def refresh_data():
@@ -85,7 +129,9 @@ def refresh_data():
         try:
             df = process_new_files(verbose=False)
             if not df.empty:
-                st.session_state.df = df
+                # New files were merged into the store; reload the full dataset
+                load_data.clear()
+                st.session_state.df = load_store()
         except Exception as e:
             st.warning(f"Could not process new files: {e}")
     st.session_state.edited = False
@@ -93,10 +139,21 @@ def refresh_data():
 
 
 def save_changes(df: pd.DataFrame):
-    """Save changes to session state."""
+    """Save changes to session state and the transaction store."""
     st.session_state.df = df
     st.session_state.edited = False
-    st.success("Changes saved to session!")
+    try:
+        # df replaces the store: refuse if the store has rows the session has not loaded
+        if read_manifest()["version"] != st.session_state.get('store_version'):
+            st.session_state.edited = True
+            st.warning("The transaction store changed since it was loaded. Changes were kept in the session only. Use 🔄 Refresh Data to reload the store (this discards unsaved edits).")
+            return
+        save_edited_data(df)
+        load_data.clear()
+        st.session_state.store_version = read_manifest()["version"]
+        st.success("Changes saved!")
+    except Exception as e:
+        st.warning(f"Changes saved to session, but not to the transaction store: {e}")
 
 
 # Insights helper functions
@@ -115,7 +172,7 @@ def calculate_category_changes(df: pd.DataFrame, period_months: int = 1, custom_
     # Get monthly spending by category
     df_temp = df.copy()
     df_temp['month_period'] = df_temp['date'].dt.to_period('M')
-    monthly_by_cat = df_temp.groupby(['month_period', 'category'])['adjusted_amount'].sum().reset_index()
+    monthly_by_cat = df_temp.groupby(['month_period', 'category'], observed=True)['adjusted_amount'].sum().reset_index()
     monthly_by_cat['month_period'] = monthly_by_cat['month_period'].astype(str)
     
     # Sort by date
@@ -168,11 +225,11 @@ def calculate_category_changes(df: pd.DataFrame, period_months: int = 1, custom_
         period2_name = f"{period2_start.strftime('%Y-%m')} - {period2_end.strftime('%Y-%m')}"
         
         # Calculate totals for each period
-        period1_totals = period1_df.groupby('category')['adjusted_amount'].sum()
-        period2_totals = period2_df.groupby('category')['adjusted_amount'].sum()
+        period1_totals = period1_df.groupby('category', observed=True)['adjusted_amount'].sum()
+        period2_totals = period2_df.groupby('category', observed=True)['adjusted_amount'].sum()
         
         # Calculate average per category (all time)
-        avg_by_cat = df_temp.groupby('category')['adjusted_amount'].sum() / df_temp['month_period'].nunique()
+        avg_by_cat = df_temp.groupby('category', observed=True)['adjusted_amount'].sum() / df_temp['month_period'].nunique()
         
     else:
         # Fixed period comparison (1, 3, or 6 months)
@@ -215,11 +272,11 @@ def calculate_category_changes(df: pd.DataFrame, period_months: int = 1, custom_
         period1_data = monthly_by_cat[monthly_by_cat['month_period'].isin(period1_months)]
         period2_data = monthly_by_cat[monthly_by_cat['month_period'].isin(period2_months)]
         
-        period1_totals = period1_data.groupby('category')['adjusted_amount'].sum()
-        period2_totals = period2_data.groupby('category')['adjusted_amount'].sum()
+        period1_totals = period1_data.groupby('category', observed=True)['adjusted_amount'].sum()
+        period2_totals = period2_data.groupby('category', observed=True)['adjusted_amount'].sum()
         
         # Calculate average per category (all time)
-        avg_by_cat = df_temp.groupby('category')['adjusted_amount'].sum() / df_temp['month_period'].nunique()
+        avg_by_cat = df_temp.groupby('category', observed=True)['adjusted_amount'].sum() / df_temp['month_period'].nunique()
     
     # Calculate changes
     changes = []
@@ -313,7 +370,7 @@ def get_top_merchants_by_category(df: pd.DataFrame, category: str, period_months
         return []
     
     # Get top merchants
-    top_merchants = period_df.groupby('merchant')['adjusted_amount'].sum().sort_values(ascending=False).head(top_n)
+    top_merchants = period_df.groupby('merchant', observed=True)['adjusted_amount'].sum().sort_values(ascending=False).head(top_n)
     
     return [
         {'merchant': merchant, 'amount': float(amount)}
@@ -570,7 +627,7 @@ def get_budget_vs_actual(df: pd.DataFrame, budgets: dict, month: str = None) ->
         df_temp = df_temp[df_temp['month_str'] == month]
     
     # Calculate actual spending by category
-    actual = df_temp.groupby('category')['adjusted_amount'].sum().reset_index()
+    actual = df_temp.groupby('category', observed=True)['adjusted_amount'].sum().reset_index()
     actual.columns = ['category', 'actual']
     
     # Merge with budgets
@@ -595,10 +652,8 @@ def identify_recurring_expenses(df: pd.DataFrame, months: int = 6, min_count: in
     
     df_temp = df.copy()
     df_temp['date'] = pd.to_datetime(df_temp['date'])
-    df_temp['dt'] = df_temp['date']
-    if 'time' in df_temp.columns:
-        time = pd.to_timedelta(df_temp['time'].astype(str), errors='coerce').fillna(pd.Timedelta(0))
-        df_temp['dt'] = df_temp['date'] + time
+    if 'dt' not in df_temp.columns:
+        df_temp['dt'] = combine_date_time(df_temp['date'], df_temp['time'] if 'time' in df_temp.columns else None)
     
     amount_col = 'adjusted_amount' if 'adjusted_amount' in df_temp.columns else 'amount'
     
@@ -611,11 +666,11 @@ def identify_recurring_expenses(df: pd.DataFrame, months: int = 6, min_count: in
     sub['ym'] = sub['dt'].dt.to_period('M').astype(str)
     
     # Get most common category for each merchant (in case merchant appears in multiple categories)
-    merchant_category = sub.groupby('merchant')['category'].apply(lambda x: x.mode().iloc[0] if not x.mode().empty else x.iloc[0] if len(x) > 0 else 'Unknown').reset_index()
+    merchant_category = sub.groupby('merchant', observed=True)['category'].apply(lambda x: x.mode().iloc[0] if not x.mode().empty else x.iloc[0] if len(x) > 0 else 'Unknown').reset_index()
     merchant_category.columns = ['merchant', 'category']
     
     # Group by merchant
-    g = sub.groupby('merchant', dropna=False).agg(
+    g = sub.groupby('merchant', dropna=False, observed=True).agg(
         txn_count=(amount_col, 'count'),
         sum_eur=(amount_col, 'sum'),
         months_active=('ym', 'nunique'),
@@ -704,17 +759,21 @@ with st.sidebar:
         if st.button("🔄 Process Uploaded File", use_container_width=True, type="primary"):
             try:
                 with st.spinner("Processing uploaded CSV file..."):
-                    # Read CSV from uploaded file
-                    df_uploaded = pd.read_csv(uploaded_file, delimiter=',', quotechar='"', encoding='utf-8')
-                    
-                    # Strip column names
-                    df_uploaded.columns = [col.strip() for col in df_uploaded.columns]
-                    
-                    # Process through pipeline
-                    df_processed = process_dataframe(df_uploaded, start_date='2025-01-01', verbose=False)
+                    # Load and process through the pipeline (same CSV reader and
+                    # stage graph as files in data/raw)
+                    df_processed = process_transactions(
+                        uploaded_file,
+                        start_date='2025-01-01',
+                        verbose=False,
+                        profile=st.session_state.get('profile_pipeline', False)
+                    )
                     
-                    # Save to session state
-                    st.session_state.df = df_processed
+                    # Merge into the store, then show the whole store (the
+                    # upload alone must never become the session data: saving
+                    # edits replaces the store with it)
+                    save_processed_data(df_processed)
+                    load_data.clear()
+                    st.session_state.df = load_store()
                     st.session_state.edited = False
                     
                     st.success(f"✅ Processed {len(df_processed)} transactions!")
@@ -754,8 +813,42 @@ with st.sidebar:
         if amount_col in st.session_state.df.columns:
             total_amount = st.session_state.df[amount_col].sum()
             st.metric("Total Amount", f"€{total_amount:,.2f}")
+    
+    st.divider()
+    
+    # Pipeline stage profile (uploads when enabled here, file processing with PIPELINE_PROFILE=1)
+    with st.expander("⏱️ Pipeline Profile", expanded=False):
+        st.checkbox("Profile uploaded files", key="profile_pipeline")
+        profile_reports = [report for report in load_profile_reports() if report.get('stages')]
+        profile_report = None
+        if profile_reports:
+            # Newest run first; parallel workers add one report per file
+            profile_report = st.selectbox(
+                "Run",
+                profile_reports[::-1],
+                format_func=lambda report: f"{str(report.get('created', ''))[:19]} · {report.get('source')}",
+                key="profile_run"
+            )
+        if profile_report:
+            profile_df = pd.DataFrame(profile_report['stages'])[
+                ['stage', 'wall_s', 'cpu_s', 'peak_rss_delta_mb', 'rows_in', 'rows_out', 'cached']
+            ]
+            st.dataframe(profile_df, hide_index=True, use_container_width=True)
+            st.caption(f"Total: {profile_report.get('total_wall_s', 0):.3f} s wall, {profile_report.get('total_cpu_s', 0):.3f} s CPU")
+        else:
+            st.caption("No profile yet. Enable profiling and process a file.")
 
 # Load data if not loaded
+if st.session_state.df.empty:
+    # Cold start: read the persistent transaction store
+    try:
+        st.session_state.df = load_store()
+    except Exception as e:
+        st.warning(f"Could not load stored transactions: {e}")
+else:
+    # Pick up batches published by other writers (e.g. auto_process) since the last run
+    sync_store_segments()
+
 if st.session_state.df.empty:
     # Try to process default CSV file if it exists
     from src.config import DEFAULT_CSV_PATH
@@ -763,7 +856,10 @@ if st.session_state.df.empty:
     if DEFAULT_CSV_PATH and os.path.exists(DEFAULT_CSV_PATH):
         with st.spinner("Processing CSV file..."):
             try:
-                st.session_state.df = process_file(DEFAULT_CSV_PATH, start_date='2025-01-01', verbose=False)
+                # process_file may return only appended rows: show the whole store
+                process_file(DEFAULT_CSV_PATH, start_date='2025-01-01', verbose=False)
+                load_data.clear()
+                st.session_state.df = load_store()
                 st.success("✅ CSV file processed successfully!")
                 st.rerun()
             except Exception as e:
@@ -927,7 +1023,7 @@ else:
                         col1, col2 = st.columns(2)
                         
                         with col1:
-                            month_cat = month_df.groupby('category')['adjusted_amount'].sum().sort_values(ascending=False)
+                            month_cat = month_df.groupby('category', observed=True)['adjusted_amount'].sum().sort_values(ascending=False)
                             if not month_cat.empty:
                                 fig_cat = px.pie(
                                     month_cat,
@@ -947,13 +1043,13 @@ else:
                         with col2:
                             if '2nd category' in month_df.columns:
                                 # Get top subcategories
-                                month_subcat = month_df.groupby('2nd category')['adjusted_amount'].sum().sort_values(ascending=False).head(10)
+                                month_subcat = month_df.groupby('2nd category', observed=True)['adjusted_amount'].sum().sort_values(ascending=False).head(10)
                                 if not month_subcat.empty:
                                     # Group by subcategory and merchant for stacked bars
                                     if 'merchant' in month_df.columns:
                                         subcat_merchant = month_df[
                                             month_df['2nd category'].isin(month_subcat.index)
-                                        ].groupby(['2nd category', 'merchant'])['adjusted_amount'].sum().reset_index()
+                                        ].groupby(['2nd category', 'merchant'], observed=True)['adjusted_amount'].sum().reset_index()
                                         
                                         # Create pivot table for stacked bars
                                         pivot_subcat = subcat_merchant.pivot_table(
@@ -961,7 +1057,8 @@ else:
                                             columns='merchant',
                                             values='adjusted_amount',
                                             aggfunc='sum',
-                                            fill_value=0
+                                            fill_value=0,
+                                            observed=True
                                         )
                                         
                                         # Reorder rows to match sorted subcategories (largest to smallest)
@@ -1039,7 +1136,7 @@ else:
                     # Top merchants for selected month
                     if 'merchant' in month_df.columns:
                         st.subheader("Top Merchants")
-                        top_merchants_month = month_df.groupby('merchant')['adjusted_amount'].sum().sort_values(ascending=False).head(10)
+                        top_merchants_month = month_df.groupby('merchant', observed=True)['adjusted_amount'].sum().sort_values(ascending=False).head(10)
                         if not top_merchants_month.empty:
                             fig_merch = px.bar(
                                 x=top_merchants_month.values,
@@ -1086,7 +1183,7 @@ else:
             col1, col2 = st.columns(2)
             
             with col1:
-                category_sum = df.groupby('category')['adjusted_amount'].sum().sort_values(ascending=False)
+                category_sum = df.groupby('category', observed=True)['adjusted_amount'].sum().sort_values(ascending=False)
                 if not category_sum.empty:
                     fig = px.pie(
                         values=category_sum.values,
@@ -1108,7 +1205,7 @@ else:
             
             with col2:
                 if '2nd category' in df.columns and 'adjusted_amount' in df.columns:
-                    subcat_sum = df.groupby('2nd category')['adjusted_amount'].sum().sort_values(ascending=False)
+                    subcat_sum = df.groupby('2nd category', observed=True)['adjusted_amount'].sum().sort_values(ascending=False)
                     if not subcat_sum.empty:
                         fig = px.bar(
                             x=subcat_sum.values,
@@ -1143,7 +1240,7 @@ else:
             # Monthly Average by Subcategory chart (full width, below the two columns)
             if '2nd category' in df.columns and 'adjusted_amount' in df.columns and 'date' in df.columns:
                 # Calculate total per subcategory
-                subcat_totals = df.groupby('2nd category')['adjusted_amount'].sum()
+                subcat_totals = df.groupby('2nd category', observed=True)['adjusted_amount'].sum()
                 
                 # Count number of unique months in the data
                 num_months = df['date'].dt.to_period('M').nunique()
@@ -1208,7 +1305,7 @@ else:
                     with subcat_col:
                         # Show subcategory pie chart for selected category
                         if '2nd category' in df.columns:
-                            subcat_sum_temp = cat_df.groupby('2nd category')['adjusted_amount'].sum().sort_values(ascending=False)
+                            subcat_sum_temp = cat_df.groupby('2nd category', observed=True)['adjusted_amount'].sum().sort_values(ascending=False)
                             if not subcat_sum_temp.empty:
                                 fig_subcat_pie = px.pie(
                                     subcat_sum_temp,
@@ -1228,7 +1325,7 @@ else:
                     with merch_col:
                         # Top merchants in category
                         if 'merchant' in cat_df.columns:
-                            top_merchants_cat = cat_df.groupby('merchant')['adjusted_amount'].sum().sort_values(ascending=False).head(10)
+                            top_merchants_cat = cat_df.groupby('merchant', observed=True)['adjusted_amount'].sum().sort_values(ascending=False).head(10)
                             if not top_merchants_cat.empty:
                                 fig_merch_cat = px.bar(
                                     x=top_merchants_cat.values,
@@ -1292,7 +1389,7 @@ else:
                     if '2nd category' in cat_df.columns and 'date' in cat_df.columns:
                         st.subheader("Monthly Average per Subcategory")
                         # Calculate total per subcategory and divide by number of months
-                        subcat_totals = cat_df.groupby('2nd category')['adjusted_amount'].sum()
+                        subcat_totals = cat_df.groupby('2nd category', observed=True)['adjusted_amount'].sum()
                         
                         # Count number of unique months in the data
                         num_months = cat_df['date'].dt.to_period('M').nunique()
@@ -1321,7 +1418,7 @@ else:
                     # Monthly Average per Merchant chart (at the bottom of the page)
                     if 'merchant' in cat_df.columns and 'date' in cat_df.columns:
                         # Calculate total per merchant
-                        merchant_totals = cat_df.groupby('merchant')['adjusted_amount'].sum()
+                        merchant_totals = cat_df.groupby('merchant', observed=True)['adjusted_amount'].sum()
                         
                         # Count number of unique months in the data
                         num_months_merch = cat_df['date'].dt.to_period('M').nunique()
@@ -1451,7 +1548,8 @@ else:
                         index='category',
                         columns='month',
                         aggfunc='sum',
-                        fill_value=0
+                        fill_value=0,
+                        observed=True
                     )
                     
                     # Sort columns (months 1-12) and rename to include year
@@ -2377,7 +2475,7 @@ else:
                 cat_trends = cat_df.groupby([
                     cat_df['date'].dt.to_period('M'),
                     'category'
-                ])['adjusted_amount'].sum().reset_index()
+                ], observed=True)['adjusted_amount'].sum().reset_index()
                 cat_trends['date'] = cat_trends['date'].astype(str)
                 cat_trends = cat_trends.sort_values('date')
                 
@@ -2398,7 +2496,7 @@ else:
             st.subheader("Top Merchants Analysis")
             
             top_n = st.slider("Number of merchants to show:", 5, 30, 15, key="top_merchants")
-            top_merchants = df.groupby('merchant')['adjusted_amount'].sum().sort_values(ascending=False).head(top_n)
+            top_merchants = df.groupby('merchant', observed=True)['adjusted_amount'].sum().sort_values(ascending=False).head(top_n)
             
             if not top_merchants.empty:
                 col1, col2 = st.columns([2, 1])
@@ -2584,8 +2682,8 @@ else:
                         
                         # Update dataframe
                         idx = df.index[selected_idx]
-                        df.loc[idx, 'category'] = new_category
-                        df.loc[idx, '2nd category'] = new_2nd_category
+                        set_value(df, idx, 'category', new_category)
+                        set_value(df, idx, '2nd category', new_2nd_category)
                         df.loc[idx, 'notes'] = cleaned_notes
                         
                         # Ensure cost_allocation and adjusted_amount columns exist
@@ -2605,7 +2703,7 @@ else:
         # Save all changes button
         if st.session_state.edited:
             st.divider()
-            if st.button("💾 Save All Changes to Excel", type="primary", use_container_width=True):
+            if st.button("💾 Save All Changes", type="primary", use_container_width=True):
                 save_changes(st.session_state.df)
     
     with tab5:
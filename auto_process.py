@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 """Automatic CSV file processor using watchdog."""
 
+import threading
 import time
 from pathlib import Path
+from typing import Dict, List, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import sys
@@ -10,44 +12,179 @@ import sys
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.pipeline import process_file
-from src.config import RAW_DATA_DIR
+from src.pipeline import process_files
+from src.config import (
+    RAW_DATA_DIR,
+    WATCH_DEBOUNCE_SECONDS,
+    WATCH_POLL_SECONDS,
+    WATCH_BATCH_MAX_WAIT_SECONDS
+)
+
+
+class PendingFiles:
+    """
+    Thread-safe queue of CSV files waiting for their writes to finish.
+    
+    The watcher thread only records paths (no I/O, no waiting). The worker
+    polls the recorded files: a file is ready once its size and modification
+    time have stayed unchanged for the debounce period.
+    """
+    
+    def __init__(self, debounce: float = WATCH_DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        # path -> (size, mtime_ns, time of the last change); size None = not yet seen
+        self._entries: Dict[Path, Tuple] = {}
+    
+    def touch(self, path: Path):
+        """Record activity on a file (restarts its debounce)."""
+        with self._lock:
+            self._entries[path] = (None, None, time.monotonic())
+    
+    def discard(self, path: Path):
+        """Forget a file (e.g. it was moved away)."""
+        with self._lock:
+            self._entries.pop(path, None)
+    
+    def poll(self) -> Tuple[List[Path], bool]:
+        """
+        Check the recorded files and take out the ones whose size has settled.
+        
+        Returns:
+            Tuple of (ready files in event order, whether files are still settling)
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, changed_at) in entries:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self._remove_if_unchanged(path, (size, mtime_ns, changed_at))
+                continue
+            
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != (size, mtime_ns):
+                self._replace_if_unchanged(path, (size, mtime_ns, changed_at), current + (now,))
+            elif now - changed_at >= self.debounce:
+                if self._remove_if_unchanged(path, (size, mtime_ns, changed_at)) and size > 0:
+                    ready.append(path)
+        
+        with self._lock:
+            settling = bool(self._entries)
+        return ready, settling
+    
+    def _remove_if_unchanged(self, path: Path, entry: Tuple) -> bool:
+        """Remove an entry unless the watcher touched it meanwhile."""
+        with self._lock:
+            if self._entries.get(path) != entry:
+                return False
+            del self._entries[path]
+            return True
+    
+    def _replace_if_unchanged(self, path: Path, entry: Tuple, new_entry: Tuple):
+        """Replace an entry unless the watcher touched it meanwhile."""
+        with self._lock:
+            if self._entries.get(path) == entry:
+                self._entries[path] = new_entry
+
+
+class BatchWorker(threading.Thread):
+    """
+    Drain the pending files and process them in batches.
+    
+    Files that become ready while others of the same burst are still being
+    written are held back (up to WATCH_BATCH_MAX_WAIT_SECONDS), so a burst
+    goes to process_files as one batch: one cross-file deduplication and one
+    store write. process_files spreads a batch over PIPELINE_WORKERS processes.
+    """
+    
+    def __init__(self, pending: PendingFiles, start_date: str = '2025-01-01'):
+        super().__init__(daemon=True)
+        self.pending = pending
+        self.start_date = start_date
+        self._stop_event = threading.Event()
+    
+    def stop(self):
+        """Ask the worker to exit after the current batch."""
+        self._stop_event.set()
+    
+    def run(self):
+        batch = []
+        batch_started = None
+        
+        while not self._stop_event.wait(WATCH_POLL_SECONDS):
+            ready, settling = self.pending.poll()
+            for path in ready:
+                if path not in batch:
+                    batch.append(path)
+            
+            if not batch:
+                continue
+            if batch_started is None:
+                batch_started = time.monotonic()
+            
+            if not settling or time.monotonic() - batch_started >= WATCH_BATCH_MAX_WAIT_SECONDS:
+                self.process_batch(batch)
+                batch = []
+                batch_started = None
+    
+    def process_batch(self, batch: List[Path]):
+        """Process a batch of settled files as one store update."""
+        files = [path for path in batch if path.exists()]
+        if not files:
+            return
+        
+        print(f"\n🔄 Käsitellään {len(files)} CSV-tiedosto(a): {', '.join(path.name for path in files)}")
+        
+        try:
+            df = process_files(files, start_date=self.start_date, verbose=True)
+            
+            if not df.empty:
+                print(f"✅ Käsitelty {len(df)} tapahtumaa")
+            else:
+                print("⚠️  Tiedostot olivat tyhjiä tai eivät sisältäneet uusia tapahtumia")
+        
+        except Exception as e:
+            print(f"❌ Virhe käsiteltäessä tiedostoja: {e}")
+
 
 class CSVHandler(FileSystemEventHandler):
-    """Handle CSV file events."""
+    """Handle CSV file events by queueing the files (never blocks the watcher)."""
     
-    def __init__(self):
-        self.processed_files = set()
+    def __init__(self, pending: PendingFiles):
+        self.pending = pending
+    
+    @staticmethod
+    def _csv_path(path: str):
+        """Get the path of a CSV file (None for other files)."""
+        file_path = Path(path)
+        return file_path if file_path.suffix.lower() == '.csv' else None
     
     def on_created(self, event):
         """Called when a file is created."""
+        self.on_modified(event)
+    
+    def on_modified(self, event):
+        """Called when a file is written to."""
         if event.is_directory:
             return
-        
-        file_path = Path(event.src_path)
-        
-        # Only process CSV files
-        if file_path.suffix.lower() == '.csv':
-            # Wait a bit to ensure file is fully written
-            time.sleep(2)
-            
-            print(f"\n🔄 Uusi CSV-tiedosto havaittu: {file_path.name}")
-            
-            try:
-                # Process the file
-                df = process_file(
-                    str(file_path),
-                    start_date='2025-01-01',
-                    verbose=True
-                )
-                
-                if not df.empty:
-                    print(f"✅ Käsitelty {len(df)} tapahtumaa")
-                else:
-                    print("⚠️  Tiedosto oli tyhjä tai ei sisältänyt uusia tapahtumia")
-                    
-            except Exception as e:
-                print(f"❌ Virhe käsiteltäessä tiedostoa: {e}")
+        file_path = self._csv_path(event.src_path)
+        if file_path is not None:
+            self.pending.touch(file_path)
+    
+    def on_moved(self, event):
+        """Called when a file is renamed (e.g. a finished download)."""
+        if event.is_directory:
+            return
+        src_path = self._csv_path(event.src_path)
+        if src_path is not None:
+            self.pending.discard(src_path)
+        dest_path = self._csv_path(event.dest_path)
+        if dest_path is not None:
+            self.pending.touch(dest_path)
 
 def main():
     """Start the file watcher."""
@@ -61,12 +198,15 @@ def main():
     # Ensure directory exists
     RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Create event handler and observer
-    event_handler = CSVHandler()
+    # Event queue, the worker draining it, and the event handler feeding it
+    pending = PendingFiles()
+    worker = BatchWorker(pending)
+    event_handler = CSVHandler(pending)
     observer = Observer()
     observer.schedule(event_handler, str(RAW_DATA_DIR), recursive=False)
     
     # Start watching
+    worker.start()
     observer.start()
     
     try:
@@ -74,9 +214,11 @@ def main():
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
+        worker.stop()
         print("\n\n👋 Lopetetaan tarkkailu...")
     
     observer.join()
+    worker.join()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""Benchmarks for the transaction pipeline, the AI tools and the processed dataset."""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Lisää src-hakemisto polkuun
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.ai_tools import TOOL_REGISTRY
+from src.card_resolver import parse_card_last4, resolve_card_names
+from src.categorizer import CATEGORY_VOCABULARIES
+from src.config import BENCHMARK_DIR, BENCHMARK_RESULTS_PATH, CARD_MAPPING
+from src.data_formatter import format_data_for_llm
+from src.pipeline import process_transactions
+from src.schema import CATEGORICAL_COLUMNS, encode_categoricals
+from src.synthetic_data import format_row_count, generate_curve_csv, parse_row_count, synthetic_csv_path
+
+# Groupbys run by the dashboards, the AI tools and format_data_for_llm
+GROUPBY_KEYS = [
+    ["category"],
+    ["2nd category"],
+    ["merchant"],
+    ["card"],
+    ["category", "2nd category"],
+]
+
+# Arguments of every AI tool in the pipeline suite
+TOOL_ARGS = {
+    "get_latest": {"n": 10},
+    "sum_by_merchant": {"merchant_substr": "prisma"},
+    "sum_by_category": {"category": "Ruokakauppa"},
+    "top_transactions": {"n": 10},
+    "group_by_month": {},
+    "outliers_large": {"min_amount": 200.0},
+    "recurring_merchants": {},
+    "merchant_breakdown": {"merchant_substr": "prisma"},
+    "category_trend": {"category": "Ostokset"},
+}
+
+# Relative slowdown against the previous run reported as a regression
+REGRESSION_THRESHOLD = 0.2
+
+
+def make_processed_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a processed-like dataset with text columns (object dtype).
+
+    Args:
+        rows: Number of rows
+        seed: Random seed
+
+    Returns:
+        DataFrame with the CATEGORICAL_COLUMNS as Python strings
+    """
+    rng = np.random.default_rng(seed)
+    merchants = np.array([f"Merchant {i}" for i in range(2000)], dtype=object)
+
+    def pick(values):
+        values = np.asarray(values, dtype=object)
+        return values[rng.integers(0, len(values), rows)]
+
+    return pd.DataFrame({
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "merchant": pick(merchants),
+        "amount": rng.gamma(2.0, 20.0, rows).round(2),
+        "currency": pick(["EUR", "SEK", "USD"]),
+        "foreign_currency": pick(["EUR", "SEK", "USD"]),
+        "card": pick(CATEGORY_VOCABULARIES["card"]),
+        "category": pick(CATEGORY_VOCABULARIES["category"]),
+        "2nd category": pick(CATEGORY_VOCABULARIES["2nd category"]),
+        "adjusted_amount": rng.gamma(2.0, 20.0, rows).round(2),
+    })
+
+
+def best_time(func, repeat: int) -> float:
+    """Run func repeat times and return the fastest wall time in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark_groupbys(rows: int, repeat: int) -> list:
+    """
+    Time the dashboard groupbys on text (before) vs categorical (after) columns.
+
+    Args:
+        rows: Number of rows in the dataset
+        repeat: Runs per measurement (the fastest is reported)
+
+    Returns:
+        List of result dictionaries
+    """
+    text_df = make_processed_frame(rows)
+    cat_df = encode_categoricals(text_df, CATEGORY_VOCABULARIES)
+
+    results = [{
+        "benchmark": "memory_mb",
+        "before": text_df[CATEGORICAL_COLUMNS].memory_usage(deep=True).sum() / 1e6,
+        "after": cat_df[CATEGORICAL_COLUMNS].memory_usage(deep=True).sum() / 1e6,
+    }]
+
+    for keys in GROUPBY_KEYS:
+        results.append({
+            "benchmark": f"groupby {' + '.join(keys)}",
+            "before": best_time(lambda: text_df.groupby(keys)["adjusted_amount"].sum(), repeat),
+            "after": best_time(
+                lambda: cat_df.groupby(keys, observed=True)["adjusted_amount"].sum(), repeat
+            ),
+        })
+
+    return results
+
+
+def _legacy_card_resolution(last4: pd.Series, cards: pd.Series) -> pd.Series:
+    """Card resolution as done before card_resolver (string round trip + map)."""
+    numbers = last4.astype(str).str.strip().replace("", np.nan)
+    numbers = pd.to_numeric(numbers, errors="coerce").fillna(-1).astype(int)
+    return numbers.map(CARD_MAPPING).fillna(cards)
+
+
+def benchmark_card_resolution(rows: int, repeat: int) -> list:
+    """
+    Time parsing and resolving raw card numbers (string round trip vs card_resolver).
+
+    Args:
+        rows: Number of rows
+        repeat: Runs per measurement (the fastest is reported)
+
+    Returns:
+        List with one result dictionary
+    """
+    rng = np.random.default_rng(0)
+    numbers = np.array(["0829", "6334", "9264", "8529", "1234", ""], dtype=object)
+    last4 = pd.Series(numbers[rng.integers(0, len(numbers), rows)])
+    cards = pd.Series(rng.choice(["Curve", "Debit"], rows)).astype("category")
+
+    return [{
+        "benchmark": "card resolution",
+        "before": best_time(lambda: _legacy_card_resolution(last4, cards), repeat),
+        "after": best_time(lambda: resolve_card_names(parse_card_last4(last4), cards), repeat),
+    }]
+
+
+def benchmark_pipeline(rows: int, repeat: int, seed: int = 0) -> list:
+    """
+    Time process_transactions, every AI tool and format_data_for_llm on a synthetic export.
+
+    The export is generated once per size and seed and reused by later runs.
+
+    Args:
+        rows: Rows in the synthetic export
+        repeat: Runs per measurement (the fastest is reported)
+        seed: Seed of the synthetic export
+
+    Returns:
+        List of result dictionaries with the time in seconds
+    """
+    csv_path = generate_curve_csv(synthetic_csv_path(BENCHMARK_DIR / "data", rows, seed), rows, seed=seed)
+
+    df = None
+
+    def run_pipeline():
+        nonlocal df
+        df = process_transactions(str(csv_path), verbose=False, cache=False, profile=False)
+
+    results = [{"benchmark": "process_transactions", "seconds": best_time(run_pipeline, repeat)}]
+
+    for name, tool in TOOL_REGISTRY.items():
+        kwargs = TOOL_ARGS.get(name, {})
+        results.append({
+            "benchmark": f"tool {name}",
+            "seconds": best_time(lambda: tool(df, **kwargs), repeat),
+        })
+
+    results.append({
+        "benchmark": "format_data_for_llm",
+        "seconds": best_time(lambda: format_data_for_llm(df), repeat),
+    })
+
+    for result in results:
+        result["rows"] = rows
+        result["processed_rows"] = len(df)
+    return results
+
+
+def _git_commit() -> str:
+    """Get the current git commit (empty if not in a git checkout)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_results(path: Path = BENCHMARK_RESULTS_PATH) -> list:
+    """
+    Load the recorded benchmark results.
+
+    Args:
+        path: Results file (one JSON record per line)
+
+    Returns:
+        List of result records, oldest first
+    """
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_results(results: list, path: Path = BENCHMARK_RESULTS_PATH) -> list:
+    """
+    Append the results of a run to the results file.
+
+    Args:
+        results: Result dictionaries of this run
+        path: Results file (one JSON record per line)
+
+    Returns:
+        The records as written (with run metadata)
+    """
+    run = {
+        "run": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+    records = [{**run, **result} for result in results]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return records
+
+
+def previous_times(history: list) -> dict:
+    """
+    Get the latest recorded time of every benchmark and size.
+
+    Args:
+        history: Records from load_results
+
+    Returns:
+        Dictionary of (benchmark, rows) -> seconds
+    """
+    return {(record["benchmark"], record["rows"]): record["seconds"] for record in history}
+
+
+def main():
+    """Run the benchmarks and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", choices=["micro", "pipeline", "all"], default="micro",
+                        help="micro: groupby/card benchmarks; pipeline: synthetic exports end to end")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows in the micro benchmark dataset")
+    parser.add_argument("--sizes", default="10k,100k,1M",
+                        help="Comma-separated export sizes of the pipeline suite (e.g. 10k,100k,1M,10M)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic exports")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--no-record", action="store_true", help="Do not append pipeline results to the results file")
+    args = parser.parse_args()
+
+    if args.suite in ("micro", "all"):
+        print(f"Benchmarking with {args.rows:,} rows (best of {args.repeat})")
+        print(f"{'benchmark':<36} {'before':>10} {'after':>10} {'speedup':>8}")
+
+        results = benchmark_groupbys(args.rows, args.repeat) + benchmark_card_resolution(args.rows, args.repeat)
+        for result in results:
+            speedup = result["before"] / result["after"] if result["after"] else float("inf")
+            print(f"{result['benchmark']:<36} {result['before']:>10.3f} {result['after']:>10.3f} {speedup:>7.1f}x")
+
+    if args.suite in ("pipeline", "all"):
+        previous = previous_times(load_results())
+        regressions = 0
+
+        print(f"Pipeline benchmarks (best of {args.repeat}, seconds)")
+        print(f"{'benchmark':<36} {'rows':>6} {'seconds':>10} {'previous':>10} {'change':>8}")
+
+        results = []
+        for size in args.sizes.split(","):
+            rows = parse_row_count(size)
+            for result in benchmark_pipeline(rows, args.repeat, seed=args.seed):
+                results.append(result)
+                before = previous.get((result["benchmark"], rows))
+                line = f"{result['benchmark']:<36} {format_row_count(rows):>6} {result['seconds']:>10.4f}"
+                if before:
+                    change = result["seconds"] / before - 1
+                    flag = "  REGRESSION" if change > REGRESSION_THRESHOLD else ""
+                    regressions += bool(flag)
+                    line += f" {before:>10.4f} {change:>+7.0%}{flag}"
+                print(line)
+
+        if not args.no_record:
+            record_results(results)
+            print(f"Results appended to {BENCHMARK_RESULTS_PATH}")
+        if regressions:
+            print(f"{regressions} benchmark(s) more than {REGRESSION_THRESHOLD:.0%} slower than the previous run")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
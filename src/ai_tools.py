@@ -7,23 +7,20 @@ from datetime import datetime, date
 from typing import Any, Dict, List, Optional, Tuple
 import pandas as pd
 
+from src.schema import combine_date_time
+
 
 # -------------------------
 # Helpers
 # -------------------------
 
 def ensure_dt(df: pd.DataFrame) -> pd.DataFrame:
-    """Create a reliable datetime column 'dt' from date (+ optional time)."""
-    df = df.copy()
-
-    d = pd.to_datetime(df.get("date"), errors="coerce")
-    if "time" in df.columns:
-        # time might be 'HH:MM:SS' or missing; safe parse to timedelta
-        t = pd.to_timedelta(df["time"].astype(str), errors="coerce").fillna(pd.Timedelta(0))
-        df["dt"] = d + t
-    else:
-        df["dt"] = d
+    """Return df with the datetime column 'dt' (computed by the pipeline; rebuilt only if missing)."""
+    if "dt" in df.columns and pd.api.types.is_datetime64_any_dtype(df["dt"]):
+        return df.copy(deep=False)
 
+    df = df.copy()
+    df["dt"] = combine_date_time(df.get("date"), df["time"] if "time" in df.columns else None)
     return df
 
 
@@ -186,7 +183,7 @@ def tool_group_by_month(df: pd.DataFrame, start_date: Optional[str] = None, end_
         field = "category"
 
     df["ym"] = df["dt"].dt.to_period("M").astype(str)
-    grp = df.groupby(["ym", field], dropna=False)[amount_col].sum().reset_index()
+    grp = df.groupby(["ym", field], dropna=False, observed=True)[amount_col].sum().reset_index()
     # per month take top_k
     rows = []
     for ym, g in grp.groupby("ym"):
@@ -228,7 +225,7 @@ def tool_recurring_merchants(df: pd.DataFrame, months: int = 6, min_count: int =
     sub = df[df["dt"] >= start].copy()
     sub["ym"] = sub["dt"].dt.to_period("M").astype(str)
 
-    g = sub.groupby(["merchant"], dropna=False).agg(
+    g = sub.groupby(["merchant"], dropna=False, observed=True).agg(
         txn_count=(amount_col, "count"),
         sum_eur=(amount_col, "sum"),
         months_active=("ym", "nunique"),
@@ -262,7 +259,7 @@ def tool_merchant_breakdown(df: pd.DataFrame, merchant_substr: str, by: str = "c
     m = df["merchant"].astype(str).str.contains(merchant_substr, case=False, na=False)
     sub = df[m].copy()
 
-    g = sub.groupby(by, dropna=False)[amount_col].sum().reset_index().sort_values(amount_col, ascending=False)
+    g = sub.groupby(by, dropna=False, observed=True)[amount_col].sum().reset_index().sort_values(amount_col, ascending=False)
     rows = [{"by": by, "value": r[by], "sum_eur": float(r[amount_col])} for _, r in g.head(20).iterrows()]
     return {
         "summary": {"label": "merchant_breakdown", "merchant_substr": merchant_substr, "by": by, "start_date": start_date, "end_date": end_date, **basic_stats(sub)},
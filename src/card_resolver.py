@@ -0,0 +1,102 @@
+"""Card number parsing and card name resolution through a dense lookup array."""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+from .config import CARD_MAPPING
+
+# Last 4 digits are 0-9999: one lookup slot per possible value
+CARD_NUMBER_SLOTS = 10_000
+
+
+def compile_card_lookup(mapping: dict) -> Tuple[np.ndarray, List[str]]:
+    """
+    Compile a card mapping into a dense last4 -> card id array.
+
+    Args:
+        mapping: Dictionary of card_last4 -> card name (e.g. CARD_MAPPING)
+
+    Returns:
+        Tuple of (int16 array of CARD_NUMBER_SLOTS card ids, -1 = unmapped;
+        list of card names indexed by card id)
+    """
+    names = sorted(set(mapping.values()))
+    lookup = np.full(CARD_NUMBER_SLOTS, -1, dtype=np.int16)
+    for last4, name in mapping.items():
+        lookup[int(last4)] = names.index(name)
+    return lookup, names
+
+
+CARD_LOOKUP, CARD_NAMES = compile_card_lookup(CARD_MAPPING)
+
+
+def parse_card_last4(values: pd.Series) -> pd.Series:
+    """
+    Parse card numbers to a nullable Int16 column.
+
+    Numeric input is converted directly. Text input is parsed per unique
+    value only, so no per-row strings are created. Missing, non-numeric and
+    out-of-range values become <NA>.
+
+    Args:
+        values: Raw card_last4 column (text or numeric)
+
+    Returns:
+        Int16 Series aligned with values
+    """
+    if isinstance(values.dtype, pd.Int16Dtype):
+        return values
+
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        codes, uniques = pd.factorize(values)
+        parsed = pd.to_numeric(pd.Series(uniques, dtype=object).astype(str).str.strip(), errors="coerce")
+        # Missing values have code -1: append NaN so they index it
+        numbers = np.append(parsed.to_numpy(dtype=np.float64), np.nan)[codes]
+
+    valid = (numbers >= 0) & (numbers < CARD_NUMBER_SLOTS) & (numbers == np.floor(numbers))
+    data = np.where(valid, numbers, 0).astype(np.int16)
+    return pd.Series(pd.arrays.IntegerArray(data, ~valid), index=values.index)
+
+
+def resolve_card_names(
+    last4: pd.Series,
+    cards: pd.Series,
+    mapping: Optional[dict] = None
+) -> pd.Series:
+    """
+    Replace card names with the CARD_MAPPING name of their card number.
+
+    Works on integer codes only: the card ids come from the lookup array and
+    the result is built as a Categorical. Rows whose number is not mapped
+    keep their current card name.
+
+    Args:
+        last4: Parsed card numbers (see parse_card_last4)
+        cards: Current card names
+        mapping: Card mapping to use. If None, uses CARD_MAPPING
+
+    Returns:
+        Categorical Series of card names
+    """
+    if mapping is None:
+        lookup, names = CARD_LOOKUP, CARD_NAMES
+    else:
+        lookup, names = compile_card_lookup(mapping)
+
+    numbers = parse_card_last4(last4).to_numpy(dtype=np.int32, na_value=-1)
+    ids = np.full(len(numbers), -1, dtype=np.int32)
+    in_range = numbers >= 0
+    ids[in_range] = lookup[numbers[in_range]]
+
+    current = cards if isinstance(cards.dtype, pd.CategoricalDtype) else cards.astype("category")
+    categories = current.cat.categories.union(pd.Index(names), sort=False)
+
+    codes = categories.get_indexer(current.cat.categories)[current.cat.codes.to_numpy()]
+    codes[current.cat.codes.to_numpy() < 0] = -1
+    mapped = ids >= 0
+    codes[mapped] = categories.get_indexer(names)[ids[mapped]]
+
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=cards.index)
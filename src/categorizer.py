@@ -1,14 +1,61 @@
 """Module for category assignment, translation, and 2nd category rules."""
 
+import numpy as np
 import pandas as pd
 from .config import (
+    CARD_MAPPING,
     CATEGORY_MAPPING,
     CATEGORY_EN_TO_FI,
     SUBCATEGORY_EN_TO_FI,
     EMPTY_2ND_CATEGORY_RULES,
     GENERAL_2ND_CATEGORIES,
+    SECOND_CATEGORY_OVERRIDES,
+    GENERAL_SUBCATEGORY_NAMES,
+    PREFIXED_SUBCATEGORY_CATEGORIES,
+    CATEGORY_PREFIXED_SUBCATEGORIES,
+    CATEGORY_PREFIX_EXCLUDE,
     CHECK_CATEGORIES
 )
+from .schema import encode_categoricals
+
+
+def compile_second_category_lookup(mapping: dict) -> pd.Series:
+    """
+    Flatten a category mapping into a (category, note) -> subcategory lookup.
+    
+    Args:
+        mapping: Mapping of main category -> {note abbreviation: subcategory}
+        
+    Returns:
+        Series of subcategories indexed by a (category, note) MultiIndex
+    """
+    keys = [(category, note) for category, notes in mapping.items() for note in notes]
+    values = [subcategory for notes in mapping.values() for subcategory in notes.values()]
+    
+    if keys:
+        index = pd.MultiIndex.from_tuples(keys, names=["category", "notes"])
+    else:
+        index = pd.MultiIndex.from_arrays([[], []], names=["category", "notes"])
+    
+    return pd.Series(values, index=index, dtype=object)
+
+
+# Compiled once at import; see add_second_category
+SECOND_CATEGORY_LOOKUP = compile_second_category_lookup(CATEGORY_MAPPING)
+
+
+def _normalized_text(series: pd.Series, title: bool = False) -> np.ndarray:
+    """
+    Normalise a column the same way get_second_category does (str, strip,
+    optionally title-case, missing -> ''), working on unique values only.
+    """
+    codes, uniques = pd.factorize(series)
+    normalized = pd.Index(uniques, dtype=object).astype(str).str.strip()
+    if title:
+        normalized = normalized.str.title()
+    
+    # Code -1 marks missing values, which map to the appended ''
+    return np.append(normalized.to_numpy(dtype=object), '')[codes]
 
 
 def get_second_category(row: pd.Series) -> str:
@@ -31,22 +78,29 @@ def get_second_category(row: pd.Series) -> str:
     return ''  # Return empty string if combination not found
 
 
-def add_second_category(df: pd.DataFrame) -> pd.DataFrame:
+def add_second_category(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Add second category column based on notes and main category.
     
     Args:
         df: Input DataFrame with 'notes' and 'category' columns
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with '2nd category' column added
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "notes" not in df.columns or "category" not in df.columns:
         return df
     
-    df['2nd category'] = df.apply(get_second_category, axis=1)
+    # Vectorised equivalent of df.apply(get_second_category, axis=1)
+    keys = pd.MultiIndex.from_arrays([
+        _normalized_text(df['category'], title=True),
+        _normalized_text(df['notes'])
+    ])
+    df['2nd category'] = SECOND_CATEGORY_LOOKUP.reindex(keys).fillna('').to_numpy(dtype=object)
     
     return df
 
@@ -77,20 +131,24 @@ def translate_second_category(value: str) -> str:
     return SUBCATEGORY_EN_TO_FI.get(value.strip(), value)
 
 
-def translate_categories(df: pd.DataFrame) -> pd.DataFrame:
+def translate_categories(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Translate category and 2nd category columns to Finnish.
     
     Args:
         df: Input DataFrame with 'category' and '2nd category' columns
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with translated categories
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "category" in df.columns:
-        df['category'] = df['category'].apply(translate_category)
+        # A categorical column (see schema.CURVE_COLUMNS) is translated per
+        # category; the result is kept as text like the other category columns
+        df['category'] = df['category'].apply(translate_category).astype(object)
     
     if "2nd category" in df.columns:
         df['2nd category'] = df['2nd category'].apply(translate_second_category)
@@ -98,105 +156,180 @@ def translate_categories(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def apply_empty_2nd_category_rules(df: pd.DataFrame) -> pd.DataFrame:
+def _is_empty(value) -> bool:
+    """Check whether a 2nd category value counts as empty."""
+    return pd.isna(value) or str(value).strip() == ""
+
+
+def resolve_second_category(category, subcategory, fill: bool = True, rename: bool = True):
     """
-    Apply rules to fill empty 2nd categories based on main category.
+    Apply the 2nd category rules from config to a single (category, 2nd category) pair.
     
     Args:
-        df: Input DataFrame
+        category: Main category (Finnish)
+        subcategory: Current 2nd category (may be empty or NaN)
+        fill: If True, fill empty 2nd categories and apply SECOND_CATEGORY_OVERRIDES
+        rename: If True, apply the display-name rules (Yleinen names and prefixes)
         
     Returns:
-        DataFrame with filled 2nd categories
+        Resulting 2nd category
+    """
+    if fill:
+        if _is_empty(subcategory) and category in EMPTY_2ND_CATEGORY_RULES:
+            subcategory = EMPTY_2ND_CATEGORY_RULES[category]
+        
+        subcategory = SECOND_CATEGORY_OVERRIDES.get((category, subcategory), subcategory)
+        
+        if _is_empty(subcategory) and category in GENERAL_2ND_CATEGORIES:
+            subcategory = "Yleinen"
+    
+    if rename:
+        if subcategory == "Yleinen" and category in GENERAL_SUBCATEGORY_NAMES:
+            subcategory = GENERAL_SUBCATEGORY_NAMES[category]
+        
+        if category in PREFIXED_SUBCATEGORY_CATEGORIES:
+            prefix = PREFIXED_SUBCATEGORY_CATEGORIES[category]
+            if pd.isna(subcategory):
+                pass
+            elif not (isinstance(subcategory, str) and subcategory.startswith(prefix)):
+                subcategory = f"{prefix}{subcategory}"
+        elif (
+            category not in CATEGORY_PREFIX_EXCLUDE
+            and subcategory in CATEGORY_PREFIXED_SUBCATEGORIES
+        ):
+            subcategory = np.nan if pd.isna(category) else f"{category}: {subcategory}"
+    
+    return subcategory
+
+
+def compile_category_vocabularies() -> dict:
+    """
+    Collect every category value the config can produce.
+    
+    Used as the stable category vocabularies of the categorical output
+    columns (see schema.encode_categoricals).
+    
+    Returns:
+        Dictionary of column -> sorted known values
+    """
+    categories = set(CATEGORY_EN_TO_FI.values())
+    pairs = {(category, "") for category in categories}
+    
+    for name, abbreviations in CATEGORY_MAPPING.items():
+        category = translate_category(name)
+        categories.add(category)
+        pairs.add((category, ""))
+        pairs.update(
+            (category, translate_second_category(subcategory))
+            for subcategory in abbreviations.values()
+        )
+    
+    second_categories = {
+        resolve_second_category(category, subcategory)
+        for category, subcategory in pairs
+    }
+    
+    return {
+        "category": sorted(categories),
+        "2nd category": sorted(value for value in second_categories if not _is_empty(value)),
+        "card": sorted(set(CARD_MAPPING.values())),
+    }
+
+
+def _factorize_with_missing(series: pd.Series):
+    """Factorize a column; missing values get the last slot of the values array."""
+    codes, uniques = pd.factorize(series)
+    values = np.append(np.asarray(uniques, dtype=object), np.nan)
+    # Code -1 (missing) wraps around to the appended NaN slot
+    return codes % len(values), values
+
+
+CATEGORY_VOCABULARIES = compile_category_vocabularies()
+
+
+def _apply_second_category_rules(df: pd.DataFrame, fill: bool, rename: bool) -> pd.DataFrame:
     """
-    df = df.copy()
+    Evaluate the 2nd category rules in one pass over the frame.
     
+    The rules only depend on the (category, 2nd category) pair, so they are
+    evaluated once per distinct pair of codes and the results are gathered
+    back to the rows. Adding a rule only grows the per-pair evaluation.
+    """
     if "2nd category" not in df.columns or "category" not in df.columns:
         return df
     
-    # Define empty 2nd category
-    empty_2nd = (
-        df["2nd category"].isna() |
-        df["2nd category"].astype(str).str.strip().eq("")
-    )
+    category_codes, category_values = _factorize_with_missing(df["category"])
+    sub_codes, sub_values = _factorize_with_missing(df["2nd category"])
     
-    # Apply rules for specific categories
-    df.loc[
-        empty_2nd & df["category"].isin(EMPTY_2ND_CATEGORY_RULES),
-        "2nd category"
-    ] = df.loc[
-        empty_2nd & df["category"].isin(EMPTY_2ND_CATEGORY_RULES),
-        "category"
-    ].map(EMPTY_2ND_CATEGORY_RULES)
-    
-    # Special rule: Shopping + Kids -> Perhe
-    df.loc[
-        (df["category"] == "Ostokset") &
-        (df["2nd category"] == "Lapset"),
-        "2nd category"
-    ] = "Perhe"
-    
-    # Apply "Yleinen" for categories that should always have it when empty
-    empty_2nd = (
-        df["2nd category"].isna() |
-        df["2nd category"].astype(str).str.strip().eq("")
-    )
+    width = len(sub_values)
+    pair_codes, unique_pairs = pd.factorize(category_codes.astype(np.int64) * width + sub_codes)
     
-    df.loc[
-        empty_2nd & df["category"].isin(GENERAL_2ND_CATEGORIES),
-        "2nd category"
-    ] = "Yleinen"
+    resolved = np.empty(len(unique_pairs), dtype=object)
+    for i, pair in enumerate(unique_pairs):
+        resolved[i] = resolve_second_category(
+            category_values[pair // width], sub_values[pair % width], fill=fill, rename=rename
+        )
+    
+    df["2nd category"] = resolved[pair_codes]
     
     return df
 
 
-def customize_general_subcategory_names(df: pd.DataFrame) -> pd.DataFrame:
+def apply_empty_2nd_category_rules(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """
+    Apply rules to fill empty 2nd categories based on main category.
+    
+    Args:
+        df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
+        
+    Returns:
+        DataFrame with filled 2nd categories
+    """
+    if copy:
+        df = df.copy()
+    
+    return _apply_second_category_rules(df, fill=True, rename=False)
+
+
+def customize_general_subcategory_names(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
-     Customize subcategory names based on main category.
-    Adds prefix "Pääkategoria: " to "Yleinen", "Perhe", and "Henkilökohtainen" subcategories.
+    Customize subcategory names based on main category.
+    Adds the category prefix to "Yleinen", "Perhe", and "Henkilökohtainen"
+    subcategories and to all Ostokset subcategories (see config).
     Excludes "Autoilu & Liikkuminen" category from renaming.
     
     Args:
         df: Input DataFrame with 'category' and '2nd category' columns
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with customized subcategory names
     """
-    df = df.copy()
-    
-    if "2nd category" not in df.columns or "category" not in df.columns:
-        return df
-    
-    # Exclude Autoilu & Liikkuminen from renaming
-    exclude_category = "Autoilu & Liikkuminen"
-    
-    # Customize "Yleinen" based on main category
-    mask_harrastukset = (df["category"] == "Harrastukset") & (df["2nd category"] == "Yleinen")
-    df.loc[mask_harrastukset, "2nd category"] = "Harrastukset: Yleinen"
-    
-    mask_ruokakauppa = (df["category"] == "Ruokakauppa") & (df["2nd category"] == "Yleinen")
-    df.loc[mask_ruokakauppa, "2nd category"] = "Ruokakauppa: Yleinen"
-    
-    mask_striimaus = (df["category"] == "Striimaus & Palvelut") & (df["2nd category"] == "Yleinen")
-    df.loc[mask_striimaus, "2nd category"] = "Striimaus & Palvelut: Yleinen"
+    if copy:
+        df = df.copy()
     
-    mask_koulutus = (df["category"] == "Koulutus, Kirjallisuus & Kehittäminen") & (df["2nd category"] == "Yleinen")
-    df.loc[mask_koulutus, "2nd category"] = "Koul.,Kirj.&Keh:Yleinen"
-    
-    # Customize all Ostokset subcategories with "Ostokset: " prefix
-    mask_ostokset = df["category"] == "Ostokset"
-    ostokset_subcats = df.loc[mask_ostokset, "2nd category"]
-    # Only rename if it doesn't already start with "Ostokset: "
-    mask_ostokset_not_prefixed = mask_ostokset & (~ostokset_subcats.str.startswith("Ostokset: ", na=False))
-    df.loc[mask_ostokset_not_prefixed, "2nd category"] = "Ostokset: " + df.loc[mask_ostokset_not_prefixed, "2nd category"]
+    return _apply_second_category_rules(df, fill=False, rename=True)
+
+
+def apply_second_category_rules(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """
+    Fill empty 2nd categories and customize their names in a single pass.
     
-    # Customize "Perhe" and "Henkilökohtainen" with category prefix (excluding Autoilu & Liikkuminen and Ostokset, as it's already handled above)
-    mask_perhe = (df["category"] != exclude_category) & (df["category"] != "Ostokset") & (df["2nd category"] == "Perhe")
-    df.loc[mask_perhe, "2nd category"] = df.loc[mask_perhe, "category"] + ": Perhe"
+    Equivalent to apply_empty_2nd_category_rules followed by
+    customize_general_subcategory_names.
     
-    mask_henkilokohtainen = (df["category"] != exclude_category) & (df["category"] != "Ostokset") & (df["2nd category"] == "Henkilökohtainen")
-    df.loc[mask_henkilokohtainen, "2nd category"] = df.loc[mask_henkilokohtainen, "category"] + ": Henkilökohtainen"
+    Args:
+        df: Input DataFrame with 'category' and '2nd category' columns
+        copy: If False, modify df in place instead of working on a copy
+        
+    Returns:
+        DataFrame with final 2nd categories
+    """
+    if copy:
+        df = df.copy()
     
-    return df
+    return _apply_second_category_rules(df, fill=True, rename=True)
 
 
 def validate_categories(df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
@@ -235,22 +368,25 @@ def validate_categories(df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
     return df
 
 
-def categorize_data(df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
+def categorize_data(df: pd.DataFrame, verbose: bool = True, copy: bool = True) -> pd.DataFrame:
     """
     Complete categorization pipeline.
     
     Args:
         df: Input DataFrame
         verbose: If True, print validation results
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
-        DataFrame with categories assigned and translated
+        DataFrame with categories assigned and translated, and the
+        low-cardinality text columns encoded as Categoricals
     """
-    df = add_second_category(df)
-    df = translate_categories(df)
-    df = apply_empty_2nd_category_rules(df)
-    df = customize_general_subcategory_names(df)
+    # Only the first step copies; the later ones own its result
+    df = add_second_category(df, copy=copy)
+    df = translate_categories(df, copy=False)
+    df = apply_second_category_rules(df, copy=False)
     df = validate_categories(df, verbose=verbose)
+    df = encode_categoricals(df, CATEGORY_VOCABULARIES, copy=False)
     
     return df
 
@@ -16,6 +16,12 @@ DATA_DIR = BASE_DIR / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 VECTOR_DB_PATH = PROCESSED_DATA_DIR / "vector_db"
+TRANSACTION_STORE_DIR = PROCESSED_DATA_DIR / "transactions"
+STAGE_CACHE_DIR = PROCESSED_DATA_DIR / ".stage_cache"
+PROFILE_REPORT_PATH = PROCESSED_DATA_DIR / "pipeline_profile.json"
+EMBEDDING_CACHE_DIR = PROCESSED_DATA_DIR / ".embedding_cache"
+BENCHMARK_DIR = DATA_DIR / "benchmarks"
+BENCHMARK_RESULTS_PATH = BENCHMARK_DIR / "results.jsonl"
 
 # Default file paths (loaded from environment variables or None)
 # Set these in .env file or as environment variables
@@ -115,6 +121,28 @@ GENERAL_2ND_CATEGORIES = [
     "Striimaus & Palvelut",
 ]
 
+# Fixed 2nd category replacements: (category, 2nd category) -> 2nd category
+SECOND_CATEGORY_OVERRIDES = {
+    ("Ostokset", "Lapset"): "Perhe",
+}
+
+# Display names for the "Yleinen" 2nd category per main category
+GENERAL_SUBCATEGORY_NAMES = {
+    "Harrastukset": "Harrastukset: Yleinen",
+    "Ruokakauppa": "Ruokakauppa: Yleinen",
+    "Striimaus & Palvelut": "Striimaus & Palvelut: Yleinen",
+    "Koulutus, Kirjallisuus & Kehittäminen": "Koul.,Kirj.&Keh:Yleinen",
+}
+
+# Categories whose every 2nd category gets a prefix (category -> prefix)
+PREFIXED_SUBCATEGORY_CATEGORIES = {
+    "Ostokset": "Ostokset: ",
+}
+
+# 2nd categories renamed to "<category>: <2nd category>" in other categories
+CATEGORY_PREFIXED_SUBCATEGORIES = ["Perhe", "Henkilökohtainen"]
+CATEGORY_PREFIX_EXCLUDE = ["Autoilu & Liikkuminen"]
+
 # Categories to check for empty 2nd category
 CHECK_CATEGORIES = [
     "Autoilu & Liikkuminen",
@@ -126,6 +154,59 @@ CHECK_CATEGORIES = [
 # Date filtering
 DEFAULT_START_DATE = '2025-01-01'
 
+# CSV parser engine: "pyarrow" (falls back to "c" if pyarrow is not installed)
+CSV_ENGINE = os.getenv("CSV_ENGINE", "pyarrow")
+
+# Worker processes used by process_files / process_new_files (1 = process files one at a time)
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+
+# auto_process watcher: seconds a file's size must stay unchanged before it is
+# processed, queue poll interval, and max seconds a ready batch waits for a burst to settle
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2"))
+WATCH_POLL_SECONDS = 0.5
+WATCH_BATCH_MAX_WAIT_SECONDS = 30.0
+
+# Stage cache: reuse stage results of unchanged inputs (process_transactions)
+STAGE_CACHE_ENABLED = os.getenv("STAGE_CACHE", "1") == "1"
+STAGE_CACHE_MAX_BYTES = int(os.getenv("STAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Stage profiler: record per-stage timings and write PROFILE_REPORT_PATH (keeping the newest runs)
+PIPELINE_PROFILE = os.getenv("PIPELINE_PROFILE", "0") == "1"
+PROFILE_REPORT_MAX_RUNS = 50
+
+# Transaction store: newest change segments kept for incremental reloads (older readers reload fully)
+STORE_SEGMENT_RETENTION = 50
+
+# Embedding backend of the vector store: "openai" (the API, EMBEDDING_MODEL) or
+# "local" (offline hashed character n-grams, no API key or network needed)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+LOCAL_EMBEDDING_DIM = 1024
+LOCAL_EMBEDDING_NGRAMS = (2, 4)
+
+# Vector index of the vector store: "chroma" (ChromaDB) or "numpy" (in-process,
+# memory-mapped float32 vectors; partitioned into IVF lists from
+# VECTOR_INDEX_IVF_MIN_ROWS vectors up, searching VECTOR_INDEX_IVF_PROBES lists per query)
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "chroma")
+VECTOR_INDEX_IVF_MIN_ROWS = 100_000
+VECTOR_INDEX_IVF_PROBES = 16
+
+# Embeddings: model used for the vector store and the on-disk cache of its vectors
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "1") == "1"
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Embedding requests: inputs and estimated tokens per request, concurrent
+# requests, retries of failed requests, and API base URL (e.g. a local stub server)
+EMBEDDING_BATCH_SIZE = 512
+EMBEDDING_BATCH_MAX_TOKENS = 100_000
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = 5
+EMBEDDING_BASE_URL = os.getenv("EMBEDDING_BASE_URL") or None
+
+# Streaming ingest: rows read per CSV chunk and max cleaned rows buffered per yielded batch
+CSV_CHUNK_SIZE = 100_000
+CSV_BUFFER_ROWS = 100_000
+
 # Data cleaning filters
 EXCLUDE_TYPES = ["REFUNDED"]
 EXCLUDE_NOTES = [" del"]
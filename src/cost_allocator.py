@@ -4,6 +4,11 @@ import pandas as pd
 import re
 from typing import Tuple
 
+# "text/50%" -> 50 (first occurrence anywhere in the notes)
+ALLOCATION_PATTERN = re.compile(r'/(\d+)%')
+# Allocation suffix removed from the end of the notes
+ALLOCATION_SUFFIX_PATTERN = re.compile(r'/\d+%$')
+
 
 def extract_cost_allocation(notes: str) -> Tuple[float, str]:
     """
@@ -20,33 +25,43 @@ def extract_cost_allocation(notes: str) -> Tuple[float, str]:
         - cleaned_notes: Notes string with percentage removed
     """
     notes_str = str(notes)
-    match = re.search(r'/(\d+)%', notes_str)  # Extract only the percentage
+    match = ALLOCATION_PATTERN.search(notes_str)  # Extract only the percentage
     
     if match:
         percentage = float(match.group(1)) / 100
-        cleaned_notes = re.sub(r'/\d+%$', '', notes_str)  # Remove percentage from notes
+        cleaned_notes = ALLOCATION_SUFFIX_PATTERN.sub('', notes_str)  # Remove percentage from notes
         return percentage, cleaned_notes
     
     return 1.0, notes_str  # Default to 100% if no percentage found
 
 
-def apply_cost_allocation(df: pd.DataFrame) -> pd.DataFrame:
+def apply_cost_allocation(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Extract cost allocation from notes and calculate adjusted_amount.
     
     Args:
         df: Input DataFrame with 'notes' and 'amount' columns
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with 'cost_allocation' and 'adjusted_amount' columns added
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "notes" not in df.columns or "amount" not in df.columns:
         return df
     
-    # Apply extraction function
-    df["cost_allocation"], df["notes"] = zip(*df["notes"].apply(extract_cost_allocation))
+    # Vectorised equivalent of extract_cost_allocation for every row. Notes
+    # repeat a lot, so the patterns only run once per distinct notes string.
+    codes, unique_notes = pd.factorize(df["notes"].astype(str))
+    unique_notes = pd.Series(unique_notes, dtype=object)
+    percentage = unique_notes.str.extract(ALLOCATION_PATTERN, expand=False)
+    allocation = (percentage.astype(float) / 100).fillna(1.0)
+    cleaned = unique_notes.str.replace(ALLOCATION_SUFFIX_PATTERN, '', regex=True)
+    
+    df["cost_allocation"] = allocation.to_numpy()[codes]
+    df["notes"] = cleaned.to_numpy(dtype=object)[codes]
     
     # Calculate adjusted amount
     df["adjusted_amount"] = df["amount"] * df["cost_allocation"]
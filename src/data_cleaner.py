@@ -1,44 +1,143 @@
 """Module for data cleaning, deduplication, and filtering."""
 
+import numpy as np
 import pandas as pd
 from typing import Optional
 from .config import (
+    EXCLUDE_TYPES,
+    EXCLUDE_NOTES,
     EXCLUDE_CURRENCIES,
     EXCLUDE_CARD_LAST4,
     DEFAULT_START_DATE
 )
+from .dedup_index import DEDUP_KEY_COLUMNS, hash_keys, latest_positions, time_seconds
+from .schema import combine_date_time, parse_date_column, select_rows
 
 
-def convert_date_column(df: pd.DataFrame) -> pd.DataFrame:
+def _strip_quotes(values: pd.Series) -> pd.Series:
+    """Normalize notes as initial_cleanup does (quotes removed)."""
+    return values.astype(str).str.replace('"', '', regex=False)
+
+
+def _parse_card_number(values: pd.Series) -> pd.Series:
+    """Normalize card numbers as process_card_numbers does (stripped, numeric)."""
+    return pd.to_numeric(values.astype(str).str.strip(), errors="coerce")
+
+
+def compile_exclusion_filter() -> list:
+    """
+    Compile the exclusion lists in config into one filter.
+    
+    Each rule names the raw and the standardized column it applies to, a
+    normalizer for raw values and the excluded (normalized) values.
+    
+    Returns:
+        List of (raw column, standardized column, normalizer, excluded values)
+    """
+    return [
+        ("Type", "txn_type", None, list(EXCLUDE_TYPES)),
+        ("Notes", "notes", _strip_quotes, list(EXCLUDE_NOTES)),
+        ("Txn Currency (Funding Card)", "currency", None, list(EXCLUDE_CURRENCIES)),
+        ("Card Last 4 Digits", "card_last4", _parse_card_number, list(EXCLUDE_CARD_LAST4)),
+    ]
+
+
+EXCLUSION_FILTER = compile_exclusion_filter()
+
+
+def exclusion_mask(df: pd.DataFrame, rules: Optional[list] = None) -> np.ndarray:
+    """
+    Evaluate the exclusion filter as a single boolean mask.
+    
+    Works on raw (CSV) or standardized column names. Only the unique values
+    (or categories) of a column are normalized and matched with isin; the
+    result is gathered back to the rows by code.
+    
+    Args:
+        df: Input DataFrame
+        rules: Compiled filter. If None, uses EXCLUSION_FILTER
+        
+    Returns:
+        Boolean array, True for rows to exclude
+    """
+    if rules is None:
+        rules = EXCLUSION_FILTER
+    
+    mask = np.zeros(len(df), dtype=bool)
+    
+    for raw_col, std_col, normalize, excluded in rules:
+        col = raw_col if raw_col in df.columns else std_col
+        if not excluded or col not in df.columns:
+            continue
+        
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = values.cat.codes.to_numpy(), pd.Series(values.cat.categories)
+        else:
+            codes, uniques = pd.factorize(values)
+            uniques = pd.Series(uniques)
+        
+        if normalize is not None:
+            uniques = normalize(uniques)
+        
+        # Missing values have code -1 and are never excluded
+        matched = np.append(uniques.isin(excluded).to_numpy(), False)
+        mask |= matched[codes]
+    
+    return mask
+
+
+def drop_excluded_rows(df: pd.DataFrame, rules: Optional[list] = None) -> pd.DataFrame:
+    """
+    Remove the rows matched by the exclusion filter.
+    
+    Args:
+        df: Input DataFrame
+        rules: Compiled filter. If None, uses EXCLUSION_FILTER
+        
+    Returns:
+        DataFrame without excluded rows (df itself if nothing matches)
+    """
+    mask = exclusion_mask(df, rules)
+    if mask.any():
+        df = select_rows(df, ~mask)
+    return df
+
+
+def convert_date_column(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Convert date column to datetime format.
     
     Args:
         df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with converted date column
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"])
+        df["date"] = parse_date_column(df["date"])
     
     return df
 
 
-def filter_by_date(df: pd.DataFrame, start_date: Optional[str] = None) -> pd.DataFrame:
+def filter_by_date(df: pd.DataFrame, start_date: Optional[str] = None, copy: bool = True) -> pd.DataFrame:
     """
     Filter DataFrame by date range.
     
     Args:
         df: Input DataFrame
         start_date: Start date string (YYYY-MM-DD format). If None, uses DEFAULT_START_DATE
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         Filtered DataFrame
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "date" not in df.columns:
         return df
@@ -46,24 +145,26 @@ def filter_by_date(df: pd.DataFrame, start_date: Optional[str] = None) -> pd.Dat
     if start_date is None:
         start_date = DEFAULT_START_DATE
     
-    df = df.loc[df['date'] >= start_date]
+    df = select_rows(df, df['date'] >= start_date)
     
     return df
 
 
-def remove_duplicates(df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
+def remove_duplicates(df: pd.DataFrame, verbose: bool = True, copy: bool = True) -> pd.DataFrame:
     """
     Remove duplicate transactions based on merchant, date, and amount.
-    Keeps the last occurrence (by time).
+    Keeps the last occurrence (by time; equal times keep the later row).
     
     Args:
         df: Input DataFrame
         verbose: If True, print deleted rows
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with duplicates removed
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     # Check required columns
     required_cols = ['merchant', 'date', 'amount', 'time']
@@ -71,69 +172,64 @@ def remove_duplicates(df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
     if missing_cols:
         return df
     
-    # Sort by time to ensure last time is kept
-    df_sorted = df.sort_values('time')
-    
-    # Identify duplicates based on 'merchant', 'date', and 'amount', keeping the last occurrence
-    duplicates_mask = df_sorted.duplicated(subset=['merchant', 'date', 'amount'], keep='last')
+    # Keep the latest row per key in one hash pass (no sort of the whole frame)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[latest_positions(hash_keys(df), time_seconds(df['time']))] = True
     
     # Get the rows that will be deleted
-    deleted_rows = df_sorted[duplicates_mask][['merchant', 'date', 'amount']]
+    deleted_rows = df.loc[~keep, DEDUP_KEY_COLUMNS]
     
     # Print deleted rows if verbose
     if verbose and not deleted_rows.empty:
         print("Deleted rows:")
         print(deleted_rows)
     
-    # Create new dataframe keeping only the non-duplicate rows (last occurrence)
-    df_clean = df_sorted[~duplicates_mask].reset_index(drop=True)
-    
-    # Sort by date and time
-    df_clean = df_clean.sort_values(by=['date', 'time'])
+    # Keep only the last occurrence of every key, sorted by date and time
+    df_clean = select_rows(df, keep)
+    df_clean.index = pd.RangeIndex(len(df_clean))
+    df_clean = df_clean.sort_values(by=['date', 'time'], kind='stable')
     
     return df_clean
 
 
-def apply_filters(df: pd.DataFrame) -> pd.DataFrame:
+def apply_filters(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Apply various filters to exclude unwanted rows.
     
     Args:
         df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         Filtered DataFrame
     """
-    df = df.copy()
-    
-    # Filter out excluded currencies
-    if "currency" in df.columns:
-        for currency in EXCLUDE_CURRENCIES:
-            df = df[df["currency"] != currency]
+    if copy:
+        df = df.copy()
     
-    # Filter out excluded card numbers
-    if "card_last4" in df.columns:
-        for card_num in EXCLUDE_CARD_LAST4:
-            df = df[df["card_last4"] != card_num]
+    # Filter out excluded types, notes, currencies and card numbers in one
+    # pass (no-op for frames already filtered by initial_cleanup)
+    df = drop_excluded_rows(df)
     
     # Drop txn_type column if it exists
     if "txn_type" in df.columns:
-        df = df.drop(columns=["txn_type"])
+        del df["txn_type"]
     
     return df
 
 
-def add_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+def add_date_columns(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Add year and month columns from date.
     
     Args:
         df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with year and month columns
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "date" in df.columns:
         df["year"] = df["date"].dt.year
@@ -142,23 +238,57 @@ def add_date_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def clean_data(df: pd.DataFrame, start_date: Optional[str] = None, verbose: bool = True) -> pd.DataFrame:
+def add_datetime_column(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """
+    Add the combined 'dt' timestamp column (date + time).
+    
+    Downstream code (AI tools, recurring expenses) sorts and filters on 'dt'
+    instead of parsing the time strings again.
+    
+    Args:
+        df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
+        
+    Returns:
+        DataFrame with a datetime64 'dt' column
+    """
+    if copy:
+        df = df.copy()
+    
+    if "date" in df.columns:
+        df["dt"] = combine_date_time(df["date"], df["time"] if "time" in df.columns else None)
+    
+    return df
+
+
+def clean_data(
+    df: pd.DataFrame,
+    start_date: Optional[str] = None,
+    verbose: bool = True,
+    copy: bool = True
+) -> pd.DataFrame:
     """
     Complete data cleaning pipeline.
     
+    The input is copied at most once (the first step); the later steps own
+    their input and work in place. Filtering steps build their result with
+    select_rows, so at most two frames are alive at a time.
+    
     Args:
         df: Input DataFrame
         start_date: Start date for filtering (YYYY-MM-DD format)
         verbose: If True, print information about cleaning operations
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         Cleaned DataFrame
     """
-    df = convert_date_column(df)
-    df = filter_by_date(df, start_date)
-    df = apply_filters(df)
-    df = remove_duplicates(df, verbose=verbose)
-    df = add_date_columns(df)
+    df = convert_date_column(df, copy=copy)
+    df = filter_by_date(df, start_date, copy=False)
+    df = apply_filters(df, copy=False)
+    df = remove_duplicates(df, verbose=verbose, copy=False)
+    df = add_date_columns(df, copy=False)
+    df = add_datetime_column(df, copy=False)
     
     return df
 
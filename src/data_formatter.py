@@ -45,7 +45,7 @@ def format_data_for_llm(df: pd.DataFrame) -> Dict[str, Any]:
     
     # Spending by category
     if 'category' in df.columns:
-        category_totals = df.groupby('category')[amount_col].sum().sort_values(ascending=False)
+        category_totals = df.groupby('category', observed=True)[amount_col].sum().sort_values(ascending=False)
         json_summary['by_category'] = {
             cat: float(amount) for cat, amount in category_totals.items()
         }
@@ -60,7 +60,7 @@ def format_data_for_llm(df: pd.DataFrame) -> Dict[str, Any]:
     
     # Spending by subcategory (2nd category)
     if '2nd category' in df.columns:
-        subcat_totals = df.groupby(['category', '2nd category'])[amount_col].sum().sort_values(ascending=False)
+        subcat_totals = df.groupby(['category', '2nd category'], observed=True)[amount_col].sum().sort_values(ascending=False)
         json_summary['by_subcategory'] = {
             f"{cat} - {subcat}": float(amount)
             for (cat, subcat), amount in subcat_totals.head(20).items()  # Top 20
@@ -68,7 +68,7 @@ def format_data_for_llm(df: pd.DataFrame) -> Dict[str, Any]:
     
     # Top merchants
     if 'merchant' in df.columns:
-        merchant_totals = df.groupby('merchant')[amount_col].sum().sort_values(ascending=False)
+        merchant_totals = df.groupby('merchant', observed=True)[amount_col].sum().sort_values(ascending=False)
         json_summary['top_merchants'] = {
             merchant: float(amount)
             for merchant, amount in merchant_totals.head(20).items()  # Top 20
@@ -149,18 +149,15 @@ def format_transactions_for_embedding(df: pd.DataFrame) -> List[str]:
     # Use adjusted_amount if available, otherwise amount
     amount_col = 'adjusted_amount' if 'adjusted_amount' in df.columns else 'amount'
     
-    transaction_texts = []
-    
-    for idx, row in df.iterrows():
-        date = str(row.get('date', '')) if 'date' in df.columns else ''
-        merchant = str(row.get('merchant', '')) if 'merchant' in df.columns else ''
-        amount = float(row.get(amount_col, 0))
-        category = str(row.get('category', '')) if 'category' in df.columns else ''
-        subcategory = str(row.get('2nd category', '')) if '2nd category' in df.columns else ''
-        
-        # Format: "2025-01-01 Prisma €50.00 Ruokakauppa Yleinen"
-        transaction_text = f"{date} {merchant} €{amount:.2f} {category} {subcategory}".strip()
-        transaction_texts.append(transaction_text)
-    
-    return transaction_texts
+    # Column values as lists (no per-row Series, so 100k rows format in well under a second)
+    def values(col, default=''):
+        return df[col].tolist() if col in df.columns else [default] * len(df)
+    
+    # Format: "2025-01-01 Prisma €50.00 Ruokakauppa Yleinen"
+    return [
+        f"{date} {merchant} €{float(amount):.2f} {category} {subcategory}".strip()
+        for date, merchant, amount, category, subcategory in zip(
+            values('date'), values('merchant'), values(amount_col, 0), values('category'), values('2nd category')
+        )
+    ]
 
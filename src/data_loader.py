@@ -1,16 +1,87 @@
 """Module for loading CSV files and initial data cleaning."""
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, List, Optional
 
+from .config import CSV_ENGINE, CSV_CHUNK_SIZE, CSV_BUFFER_ROWS
+from .card_resolver import parse_card_last4, resolve_card_names
+from .data_cleaner import drop_excluded_rows
+from .profiler import StageProfiler
+from .schema import (
+    DATE_COLUMN,
+    NA_VALUES,
+    UNUSED_COLUMNS,
+    arrow_types,
+    concat_frames,
+    pandas_dtypes,
+    parse_date_column,
+    restore_missing_values,
+    select_columns
+)
 
-def load_transactions_csv(file_path: str) -> pd.DataFrame:
+
+def _read_header(file_path) -> List[str]:
+    """Read only the header row of a CSV file (rewinds file objects)."""
+    columns = list(pd.read_csv(file_path, delimiter=',', quotechar='"', encoding='utf-8', nrows=0).columns)
+    if hasattr(file_path, "seek"):
+        file_path.seek(0)
+    return columns
+
+
+def _read_csv_arrow(file_path, usecols: List[str]) -> pd.DataFrame:
+    """Read the declared columns of a CSV file with the pyarrow CSV reader."""
+    import pyarrow.csv as pa_csv
+    
+    table = pa_csv.read_csv(
+        file_path,
+        parse_options=pa_csv.ParseOptions(delimiter=',', quote_char='"'),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types=arrow_types(usecols),
+            null_values=NA_VALUES,
+            strings_can_be_null=True
+        )
+    )
+    return restore_missing_values(table.to_pandas())
+
+
+def _read_csv_pandas(file_path, usecols: Optional[List[str]], nrows: Optional[int] = None) -> pd.DataFrame:
+    """Read the declared columns of a CSV file with the pandas C parser."""
+    return pd.read_csv(
+        file_path,
+        delimiter=',',
+        quotechar='"',
+        encoding='utf-8',
+        usecols=usecols,
+        dtype=pandas_dtypes(usecols) if usecols else None,
+        nrows=nrows
+    )
+
+
+def _finish_loaded_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Strip column names and parse the date column of a freshly read frame."""
+    # Strip any leading/trailing whitespace from column names
+    df.columns = [col.strip() for col in df.columns]
+    
+    if DATE_COLUMN in df.columns:
+        df[DATE_COLUMN] = parse_date_column(df[DATE_COLUMN])
+    
+    return df
+
+
+def load_transactions_csv(file_path: str, nrows: Optional[int] = None) -> pd.DataFrame:
     """
     Load transaction data from CSV file.
     
+    Only the columns declared in schema.CURVE_COLUMNS are read, with their
+    declared dtypes. The pyarrow reader is used when CSV_ENGINE is "pyarrow"
+    and pyarrow is installed; otherwise the pandas C parser is used.
+    
     Args:
-        file_path: Path to the CSV file
+        file_path: Path to the CSV file (or a file-like object)
+        nrows: Number of rows to read (None reads the whole file)
         
     Returns:
         DataFrame with loaded transaction data
@@ -19,32 +90,126 @@ def load_transactions_csv(file_path: str) -> pd.DataFrame:
         Exception: If file cannot be loaded
     """
     try:
-        # Use comma as delimiter, handle quoted strings, and specify UTF-8 encoding
-        df = pd.read_csv(file_path, delimiter=',', quotechar='"', encoding='utf-8')
+        usecols = select_columns(_read_header(file_path)) or None
+        
+        df = None
+        if CSV_ENGINE == "pyarrow" and usecols and nrows is None:
+            try:
+                df = _read_csv_arrow(file_path, usecols)
+            except ImportError:
+                pass
+            except Exception:
+                # Values the Arrow reader cannot convert; retry with the C parser
+                if hasattr(file_path, "seek"):
+                    file_path.seek(0)
         
-        # Strip any leading/trailing whitespace from column names
-        df.columns = [col.strip() for col in df.columns]
+        if df is None:
+            df = _read_csv_pandas(file_path, usecols, nrows=nrows)
         
         # Optionally, display full column content for long fields (like Merchant)
         pd.set_option('display.max_colwidth', None)
         
-        return df
+        return _finish_loaded_frame(df)
+        
+    except Exception as e:
+        raise Exception(f"Error loading CSV file: {e}")
+
+
+def iter_transactions_csv(file_path: str, chunksize: int = CSV_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Load transaction data from CSV file in fixed-size chunks.
+    
+    Args:
+        file_path: Path to the CSV file
+        chunksize: Number of rows read per chunk
+        
+    Yields:
+        DataFrames of at most chunksize rows
         
+    Raises:
+        Exception: If file cannot be loaded
+    """
+    try:
+        usecols = select_columns(_read_header(file_path)) or None
+        reader = pd.read_csv(
+            file_path,
+            delimiter=',',
+            quotechar='"',
+            encoding='utf-8',
+            usecols=usecols,
+            dtype=pandas_dtypes(usecols) if usecols else None,
+            chunksize=chunksize
+        )
+        with reader:
+            for chunk in reader:
+                yield _finish_loaded_frame(chunk)
+                
     except Exception as e:
         raise Exception(f"Error loading CSV file: {e}")
 
 
-def initial_cleanup(df: pd.DataFrame) -> pd.DataFrame:
+def iter_cleaned_chunks(
+    file_path: str,
+    chunksize: int = CSV_CHUNK_SIZE,
+    buffer_rows: int = CSV_BUFFER_ROWS,
+    profiler: Optional[StageProfiler] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV file through load and initial_cleanup one chunk at a time.
+    
+    Cleaned rows are collected into a buffer and yielded in batches of
+    buffer_rows, so at most one raw chunk and one buffer are held in memory.
+    
+    Args:
+        file_path: Path to the CSV file
+        chunksize: Number of raw rows read per chunk
+        buffer_rows: Maximum number of cleaned rows per yielded batch
+        profiler: Records the 'load' and 'initial_cleanup' stages (accumulated
+            over all chunks)
+        
+    Yields:
+        Cleaned DataFrames of at most buffer_rows rows
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    buffer = []
+    buffered = 0
+    
+    chunks = profiler.iterate("load", iter_transactions_csv(file_path, chunksize=chunksize))
+    for chunk in chunks:
+        chunk = profiler.run("initial_cleanup", initial_cleanup, chunk, copy=False)
+        if chunk.empty:
+            continue
+        buffer.append(chunk)
+        buffered += len(chunk)
+        
+        while buffered >= buffer_rows:
+            merged = concat_frames(buffer)
+            # A frame of its own (not a slice of merged): the caller owns it
+            yield merged.take(np.arange(buffer_rows))
+            rest = merged.iloc[buffer_rows:]
+            buffer = [rest] if not rest.empty else []
+            buffered = len(rest)
+    
+    if buffer:
+        yield concat_frames(buffer)
+
+
+def initial_cleanup(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Perform initial data cleanup: remove quotes, filter rows, drop columns.
     
     Args:
         df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         Cleaned DataFrame
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
+    
+    # Remove excluded rows (config EXCLUDE_* lists) before the string operations
+    df = drop_excluded_rows(df)
     
     # Remove quotes from Merchant and Notes columns
     if "Merchant" in df.columns:
@@ -52,36 +217,32 @@ def initial_cleanup(df: pd.DataFrame) -> pd.DataFrame:
     if "Notes" in df.columns:
         df["Notes"] = df["Notes"].str.replace('"', '', regex=False)
     
-    # Remove rows where 'Type' is 'REFUNDED'
-    if "Type" in df.columns:
-        df = df[df["Type"] != "REFUNDED"]
-    
-    # Remove rows where Notes is " del"
-    if "Notes" in df.columns:
-        df = df[df["Notes"] != " del"]
-    
-    # Drop unnecessary columns
-    columns_to_drop = ["Export Format", "Txn Amount (Foreign Spend)"]
-    df = df.drop(columns=[col for col in columns_to_drop if col in df.columns])
+    # Drop unnecessary columns (not read by load_transactions_csv, but may
+    # be present in frames loaded elsewhere)
+    for col in UNUSED_COLUMNS:
+        if col in df.columns:
+            del df[col]
     
     return df
 
 
-def standardize_column_names(df: pd.DataFrame) -> pd.DataFrame:
+def standardize_column_names(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Standardize column names: rename and convert to lowercase with underscores.
     
     Args:
         df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with standardized column names
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     # Rename Date column
     if "Date (YYYY-MM-DD as UTC)" in df.columns:
-        df = df.rename(columns={"Date (YYYY-MM-DD as UTC)": "date"})
+        df.rename(columns={"Date (YYYY-MM-DD as UTC)": "date"}, inplace=True)
     
     # Convert all column names to lowercase and replace spaces with underscores
     df.columns = df.columns.str.lower().str.replace(" ", "_")
@@ -99,58 +260,120 @@ def standardize_column_names(df: pd.DataFrame) -> pd.DataFrame:
         "notes": "notes"
     }
     
-    df = df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns})
+    df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns}, inplace=True)
     
     return df
 
 
-def process_card_numbers(df: pd.DataFrame) -> pd.DataFrame:
+def process_card_numbers(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Clean and process card_last4 column, then map to card names.
     
     Args:
         df: Input DataFrame
+        copy: If False, modify df in place instead of working on a copy
         
     Returns:
         DataFrame with processed card information
     """
-    import numpy as np
-    from .config import CARD_MAPPING
-    
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     if "card_last4" not in df.columns:
         return df
     
-    # Clean 'card_last4' column
-    df["card_last4"] = df["card_last4"].astype(str).str.strip()
-    df["card_last4"] = df["card_last4"].replace("", np.nan)  # Convert empty strings to NaN
-    df["card_last4"] = pd.to_numeric(df["card_last4"], errors="coerce")  # Convert valid numbers, NaN otherwise
-    
-    # Fill NaN values with -1 (placeholder that does not match actual card numbers)
-    df["card_last4"] = df["card_last4"].fillna(-1).astype(int)
+    # Parse 'card_last4' to nullable Int16 (<NA> for missing or invalid numbers)
+    df["card_last4"] = parse_card_last4(df["card_last4"])
     
     # Map card numbers to card names
     if "card" in df.columns:
-        df["card"] = df["card_last4"].astype(int).map(CARD_MAPPING).fillna(df["card"])
+        df["card"] = resolve_card_names(df["card_last4"], df["card"])
     
     return df
 
 
-def load_and_prepare_data(file_path: str) -> pd.DataFrame:
+def iter_prepared_chunks(
+    file_path: str,
+    chunksize: int = CSV_CHUNK_SIZE,
+    buffer_rows: int = CSV_BUFFER_ROWS,
+    profiler: Optional[StageProfiler] = None
+) -> Iterator[pd.DataFrame]:
     """
-    Complete data loading and initial preparation pipeline.
+    Streaming version of load_and_prepare_data.
     
     Args:
         file_path: Path to the CSV file
+        chunksize: Number of raw rows read per chunk
+        buffer_rows: Maximum number of rows per yielded batch
+        profiler: Records the load, initial_cleanup, standardize and cards
+            stages (accumulated over all chunks)
+        
+    Yields:
+        Prepared DataFrames of at most buffer_rows rows
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    
+    for chunk in iter_cleaned_chunks(file_path, chunksize=chunksize, buffer_rows=buffer_rows, profiler=profiler):
+        chunk = profiler.run("standardize", standardize_column_names, chunk, copy=False)
+        chunk = profiler.run("cards", process_card_numbers, chunk, copy=False)
+        yield chunk
+
+
+def prepare_dataframe(
+    df: pd.DataFrame,
+    copy: bool = True,
+    profiler: Optional[StageProfiler] = None
+) -> pd.DataFrame:
+    """
+    Prepare a loaded export: initial cleanup, column names and card numbers.
+    
+    Args:
+        df: DataFrame with the original Curve column names
+        copy: If False, modify df in place instead of working on a copy
+        profiler: Records the initial_cleanup, standardize and cards stages
         
     Returns:
         Prepared DataFrame
     """
-    df = load_transactions_csv(file_path)
-    df = initial_cleanup(df)
-    df = standardize_column_names(df)
-    df = process_card_numbers(df)
+    profiler = profiler or StageProfiler(enabled=False)
+    
+    # Only the first step copies; the later ones own its result
+    df = profiler.run("initial_cleanup", initial_cleanup, df, copy=copy)
+    df = profiler.run("standardize", standardize_column_names, df, copy=False)
+    df = profiler.run("cards", process_card_numbers, df, copy=False)
     
     return df
 
+
+def load_and_prepare_data(
+    file_path: str,
+    chunksize: Optional[int] = None,
+    profiler: Optional[StageProfiler] = None
+) -> pd.DataFrame:
+    """
+    Complete data loading and initial preparation pipeline.
+    
+    Args:
+        file_path: Path to the CSV file
+        chunksize: If set, stream the file in chunks of this many rows so that
+            dropped rows and columns are never held in memory for the whole file
+        profiler: Records the load, initial_cleanup, standardize and cards stages
+        
+    Returns:
+        Prepared DataFrame
+    """
+    profiler = profiler or StageProfiler(enabled=False)
+    
+    if chunksize:
+        chunks = list(iter_prepared_chunks(
+            file_path, chunksize=chunksize, buffer_rows=chunksize, profiler=profiler
+        ))
+        if chunks:
+            return concat_frames(chunks)
+        # Nothing survived cleanup; keep the columns of the header
+        df = load_transactions_csv(file_path, nrows=0)
+    else:
+        df = profiler.run("load", load_transactions_csv, None, file_path)
+    
+    # The freshly loaded frame is owned here, so no step needs to copy it
+    return prepare_dataframe(df, copy=False, profiler=profiler)
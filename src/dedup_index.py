@@ -0,0 +1,227 @@
+"""Hash-based deduplication of transactions by (merchant, date, amount)."""
+
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Optional
+
+# Columns identifying a transaction; duplicates keep the latest time
+DEDUP_KEY_COLUMNS = ['merchant', 'date', 'amount']
+
+# Seconds value of a missing time: sorts after every valid time, as NaN does in sort_values
+MISSING_TIME = 24 * 60 * 60
+
+DEDUP_INDEX_FILE = "_dedup_index.npz"
+
+
+def hash_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash the dedup key of every row.
+
+    Args:
+        df: DataFrame with the DEDUP_KEY_COLUMNS
+
+    Returns:
+        uint64 array with one hash per row
+    """
+    return pd.util.hash_pandas_object(df[DEDUP_KEY_COLUMNS], index=False).to_numpy()
+
+
+def time_seconds(times: pd.Series) -> np.ndarray:
+    """
+    Convert HH:MM:SS times to seconds since midnight.
+
+    Only the unique values are parsed. Missing or unparseable times become
+    MISSING_TIME.
+
+    Args:
+        times: Series of time strings
+
+    Returns:
+        int64 array of seconds
+    """
+    codes, uniques = pd.factorize(times)
+    seconds = pd.to_timedelta(pd.Series(uniques, dtype=object), errors='coerce').dt.total_seconds()
+    seconds = seconds.fillna(MISSING_TIME).to_numpy(dtype=np.int64)
+    # Missing values have code -1: append MISSING_TIME so they index it
+    return np.append(seconds, MISSING_TIME)[codes]
+
+
+def latest_positions(keys: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """
+    Find the row to keep for every key: the latest time wins.
+
+    Equal times go to the later row, so a batch that follows older rows
+    replaces them. Runs in O(n) with a hash groupby instead of a sort.
+
+    Args:
+        keys: Key hash of every row
+        times: Time in seconds of every row
+
+    Returns:
+        Sorted positions of the rows to keep
+    """
+    n = len(keys)
+    if n == 0:
+        return np.array([], dtype=np.int64)
+
+    score = times.astype(np.int64) * n + np.arange(n, dtype=np.int64)
+    best = pd.Series(score).groupby(keys, sort=False).max().to_numpy()
+    return np.sort(best % n)
+
+
+def drop_duplicate_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remove duplicate transactions, keeping the last occurrence by time.
+
+    Args:
+        df: DataFrame with the DEDUP_KEY_COLUMNS and a 'time' column
+
+    Returns:
+        DataFrame with one row per key, in the original row order
+    """
+    positions = latest_positions(hash_keys(df), time_seconds(df['time']))
+    return df.iloc[positions]
+
+
+class DedupIndex:
+    """
+    Persistent map of key hash -> latest time of the stored transactions.
+
+    Every key also records the source its row was written from (a file
+    path, "" for rows written without a source such as uploads, None if
+    unknown: the index was rebuilt from the stored rows) and whether the
+    row was edited in the app.
+    """
+
+    def __init__(
+        self,
+        keys: Optional[np.ndarray] = None,
+        times: Optional[np.ndarray] = None,
+        sources: Optional[np.ndarray] = None,
+        edited: Optional[np.ndarray] = None
+    ):
+        """
+        Create an index.
+
+        Args:
+            keys: uint64 key hashes (unique)
+            times: Latest time in seconds of every key
+            sources: Source of every key (None = unknown)
+            edited: Whether the row of every key was edited
+        """
+        if keys is None:
+            keys = np.array([], dtype=np.uint64)
+            times = np.array([], dtype=np.int64)
+        index = pd.Index(keys, dtype=np.uint64)
+        if sources is None:
+            sources = [None] * len(index)
+        if edited is None:
+            edited = np.zeros(len(index), dtype=bool)
+        self.times = pd.Series(times, index=index, dtype=np.int64)
+        self.sources = pd.Series(sources, index=index, dtype=object)
+        self.edited = pd.Series(edited, index=index, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "DedupIndex":
+        """Build an index from deduplicated transactions (sources unknown)."""
+        if df.empty:
+            return cls()
+        return cls(hash_keys(df), time_seconds(df['time']))
+
+    @classmethod
+    def load(cls, path: Path) -> "DedupIndex":
+        """Load an index written by save."""
+        with np.load(path) as data:
+            if "source_codes" not in data.files:
+                # Written before sources were recorded
+                return cls(data["keys"], data["times"])
+            names = np.append(data["source_names"].astype(object), None)
+            return cls(data["keys"], data["times"], names[data["source_codes"]], data["edited"])
+
+    def save(self, path: Path):
+        """Write the index atomically."""
+        codes, names = pd.factorize(self.sources)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=self.times.index.to_numpy(),
+                times=self.times.to_numpy(),
+                # Missing sources have code -1, which indexes the None appended by load
+                source_codes=codes.astype(np.int32),
+                source_names=np.asarray(names, dtype=str),
+                edited=self.edited.to_numpy()
+            )
+        os.replace(tmp_path, path)
+
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        """Check which keys are stored."""
+        return pd.Index(keys, dtype=np.uint64).isin(self.times.index)
+
+    def source_of(self, keys: np.ndarray) -> np.ndarray:
+        """Sources of keys (None for unknown or missing keys)."""
+        sources = self.sources.reindex(keys).to_numpy(dtype=object)
+        sources[pd.isna(sources)] = None
+        return sources
+
+    def is_edited(self, keys: np.ndarray) -> np.ndarray:
+        """Check which keys have an edited row."""
+        return self.edited.reindex(keys, fill_value=False).to_numpy(dtype=bool)
+
+    def edited_keys(self) -> np.ndarray:
+        """Keys of the edited rows."""
+        return self.edited.index[self.edited.to_numpy()].to_numpy()
+
+    def filter_new(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drop the rows of a deduplicated batch that lose against stored rows.
+
+        A row is kept if its key is new or its time is at least the stored
+        time (it then replaces the stored row), unless the stored row was
+        edited: edits always win over ingested rows. Runs in O(len(df)).
+
+        Args:
+            df: Batch with one row per key
+
+        Returns:
+            Rows that are new or replace a stored transaction
+        """
+        if df.empty or len(self) == 0:
+            return df
+
+        keys = hash_keys(df)
+        stored = self.times.reindex(keys).to_numpy()
+        keep = (np.isnan(stored) | (time_seconds(df['time']) >= stored)) & ~self.is_edited(keys)
+        return df[keep]
+
+    def update(self, df: pd.DataFrame, sources: Optional[np.ndarray] = None):
+        """
+        Record the keys, times and sources of rows written to the store.
+
+        Args:
+            df: Rows written to the store
+            sources: Source of every row. If None, the rows have source ""
+        """
+        if df.empty:
+            return
+        keys = hash_keys(df)
+        times = time_seconds(df['time'])
+        positions = latest_positions(keys, times)
+        keys = keys[positions]
+        sources = [""] * len(keys) if sources is None else np.asarray(sources, dtype=object)[positions]
+
+        index = pd.Index(keys, dtype=np.uint64)
+        rest = ~self.times.index.isin(index)
+        self.times = pd.concat([self.times[rest], pd.Series(times[positions], index=index)]).astype(np.int64)
+        self.sources = pd.concat([self.sources[rest], pd.Series(sources, index=index, dtype=object)])
+        self.edited = pd.concat([self.edited[rest], pd.Series(False, index=index)]).astype(bool)
+
+    def mark_edited(self, keys: np.ndarray):
+        """Mark the stored rows of keys as edited (unknown keys are ignored)."""
+        self.edited[self.edited.index.isin(keys)] = True
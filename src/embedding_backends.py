@@ -0,0 +1,168 @@
+"""Embedding backends of the vector store: the OpenAI API or offline hashed character n-grams."""
+
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from .config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_DIM,
+    LOCAL_EMBEDDING_NGRAMS
+)
+
+# Local backend: bytes of a text used (longer texts are truncated) and texts vectorized at a time
+LOCAL_MAX_TEXT_BYTES = 256
+LOCAL_CHUNK_ROWS = 2048
+
+_HASH_MULTIPLIER = np.uint64(1099511628211)
+_HASH_MIX = np.uint64(0xBF58476D1CE4E5B9)
+
+
+class EmbeddingBackend(ABC):
+    """
+    Base class of embedding backends (subclasses implement model and embed).
+
+    Attributes:
+        name: Backend name (the EMBEDDING_BACKEND value that selects it)
+        requires_api_key: Whether embed needs an OpenAI API key
+        cacheable: Whether vectors are worth keeping in the embedding cache
+    """
+    name = ""
+    requires_api_key = False
+    cacheable = False
+
+    @property
+    @abstractmethod
+    def model(self) -> str:
+        """Identifier of the vector space (vectors of different models never mix)."""
+
+    @abstractmethod
+    def embed(self, texts: List[str], api_key: Optional[str] = None) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+            api_key: OpenAI API key (if requires_api_key)
+
+        Returns:
+            float32 array of shape (len(texts), dimension)
+        """
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """Embeddings from the OpenAI API (batched and concurrent, see embedding_client)."""
+    name = "openai"
+    requires_api_key = True
+    cacheable = True
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self._model = model
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    def embed(self, texts: List[str], api_key: Optional[str] = None) -> np.ndarray:
+        if not api_key:
+            raise ValueError("API key is required")
+
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        from .embedding_client import embed
+
+        try:
+            return np.asarray(embed(texts, api_key, model=self.model), dtype=np.float32)
+        except ImportError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error creating embeddings: {str(e)}")
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Offline embeddings: hashed character n-gram counts.
+
+    Every n-gram of the lowercased text (padded with a space at both ends)
+    is hashed into one of dim buckets; bucket counts are log-scaled and the
+    vector is L2-normalized, so dot products are cosine similarities.
+    Vectors need no fitted vocabulary: the same text always gets the same
+    vector, and indexed texts and queries never go out of sync.
+    """
+    name = "local"
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM, ngrams: Tuple[int, int] = LOCAL_EMBEDDING_NGRAMS):
+        self.dim = dim
+        self.ngrams = ngrams
+
+    @property
+    def model(self) -> str:
+        return f"hash-ngram-{self.dim}-{self.ngrams[0]}-{self.ngrams[1]}"
+
+    def embed(self, texts: List[str], api_key: Optional[str] = None) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), LOCAL_CHUNK_ROWS):
+            chunk = texts[start:start + LOCAL_CHUNK_ROWS]
+            vectors[start:start + len(chunk)] = self._embed_chunk(chunk)
+        return vectors
+
+    def _embed_chunk(self, texts: List[str]) -> np.ndarray:
+        """Vectorize one chunk of texts (all n-grams of all texts at once)."""
+        encoded = [f" {text.lower()} ".encode("utf-8")[:LOCAL_MAX_TEXT_BYTES] for text in texts]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+        width = int(lengths.max()) if len(encoded) else 0
+        codes = np.frombuffer(
+            b"".join(data.ljust(width, b"\0") for data in encoded), dtype=np.uint8
+        ).reshape(len(encoded), width).astype(np.uint64)
+
+        rows = np.arange(len(encoded), dtype=np.int64)[:, None]
+        cells = [np.empty(0, dtype=np.int64)]
+        for n in range(self.ngrams[0], self.ngrams[1] + 1):
+            positions = width - n + 1
+            if positions <= 0:
+                continue
+
+            # Polynomial hash of every n-gram (seeded by n), then mixed
+            hashes = np.full((len(encoded), positions), n, dtype=np.uint64)
+            for offset in range(n):
+                hashes = hashes * _HASH_MULTIPLIER + codes[:, offset:offset + positions]
+            hashes ^= hashes >> np.uint64(31)
+            hashes *= _HASH_MIX
+            hashes ^= hashes >> np.uint64(29)
+
+            # Bucket = high 32 bits scaled to [0, dim) (no modulo)
+            buckets = ((hashes >> np.uint64(32)) * np.uint64(self.dim)) >> np.uint64(32)
+            valid = np.arange(positions)[None, :] < (lengths - n + 1)[:, None]
+            cells.append((rows * self.dim + buckets.astype(np.int64))[valid])
+
+        counts = np.bincount(np.concatenate(cells), minlength=len(encoded) * self.dim)
+        vectors = np.log1p(counts.astype(np.float32)).reshape(len(encoded), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, np.float32(1e-12))
+
+
+EMBEDDING_BACKENDS = {
+    OpenAIEmbeddingBackend.name: OpenAIEmbeddingBackend,
+    HashingEmbeddingBackend.name: HashingEmbeddingBackend,
+}
+
+
+def get_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """
+    Get an embedding backend by name.
+
+    Args:
+        name: Backend name (key of EMBEDDING_BACKENDS). If None, uses EMBEDDING_BACKEND
+
+    Returns:
+        Embedding backend
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    name = name or EMBEDDING_BACKEND
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (choose from {', '.join(EMBEDDING_BACKENDS)})")
+    return EMBEDDING_BACKENDS[name]()
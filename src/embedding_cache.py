@@ -0,0 +1,281 @@
+"""On-disk cache of text embeddings, keyed by (model, SHA-256 of the text)."""
+
+import hashlib
+import os
+import numpy as np
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from .config import EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_BYTES
+from .file_lock import file_lock
+
+INDEX_FILE = "index.npz"
+LOCK_FILE = "cache.lock"
+
+# Vectors file of caches written before the index named its vectors file
+LEGACY_VECTORS_FILE = "vectors.f32"
+
+
+def text_key(text: str) -> str:
+    """Get the cache key (SHA-256 hex digest) of a text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _model_dir_name(model: str) -> str:
+    """Get a file-system safe directory name for a model."""
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in model)
+    return f"{safe}-{hashlib.sha256(model.encode('utf-8')).hexdigest()[:8]}"
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors of one model, stored as float32 rows of a memory-mapped file.
+
+    The vectors file is append-only; an index maps text keys to rows,
+    records when each row was last used and names the vectors file. When
+    the file grows beyond max_bytes, the least recently used rows are
+    copied to a new vectors file, and replacing the index switches to it,
+    so the index and its vectors always stay a matching pair.
+
+    Writers (put_many, save, evict) hold an exclusive lock on the cache
+    directory and merge the index on disk first, so caches opened by
+    several threads or processes do not overwrite each other's entries.
+    """
+
+    def __init__(self, model: str, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """
+        Open (or create) the cache of a model.
+
+        Args:
+            model: Embedding model name (vectors of different models never mix)
+            cache_dir: Cache root directory. If None, uses EMBEDDING_CACHE_DIR
+            max_bytes: Size limit of the vectors file. If None, uses EMBEDDING_CACHE_MAX_BYTES
+        """
+        self.model = model
+        self.directory = Path(cache_dir or EMBEDDING_CACHE_DIR) / _model_dir_name(model)
+        self.max_bytes = EMBEDDING_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._load_index()
+
+    @property
+    def vectors_path(self) -> Optional[Path]:
+        return self.directory / self.vectors_file if self.vectors_file else None
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / INDEX_FILE
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _reset(self):
+        """Set the state of an empty cache."""
+        self.dim = None
+        self.vectors_file = None
+        self.generation = 0
+        self.rows = {}  # key -> row
+        self.last_used = {}  # key -> tick
+        self.tick = 0
+        self._vectors = None
+
+    def _load_index(self):
+        """Read the index (an unreadable or inconsistent cache starts empty)."""
+        self._reset()
+        if not self.index_path.exists():
+            return
+        try:
+            with np.load(self.index_path) as data:
+                keys, rows, last_used = data["keys"], data["rows"], data["last_used"]
+                dim = int(data["dim"])
+                vectors_file = str(data["vectors"]) if "vectors" in data.files else LEGACY_VECTORS_FILE
+                generation = int(data["generation"]) if "generation" in data.files else 0
+        except Exception:
+            return
+        if not (self.directory / vectors_file).exists():
+            return
+
+        self.dim = dim
+        self.vectors_file = vectors_file
+        self.generation = generation
+        valid = rows < self._file_rows()
+        self.rows = dict(zip(keys[valid].tolist(), rows[valid].tolist()))
+        self.last_used = dict(zip(keys[valid].tolist(), last_used[valid].tolist()))
+        self.tick = int(last_used.max()) if len(last_used) else 0
+
+    def _lock(self):
+        """Exclusive lock of the cache directory (held by writers)."""
+        return file_lock(self.directory / LOCK_FILE)
+
+    def _sync(self):
+        """Reload the index on disk, keeping the newer use ticks of this instance (lock held)."""
+        last_used = self.last_used
+        tick = self.tick
+        self._load_index()
+        for key, used in last_used.items():
+            if key in self.last_used and used > self.last_used[key]:
+                self.last_used[key] = used
+        self.tick = max(self.tick, tick)
+
+    def _file_rows(self) -> int:
+        """Number of complete rows in the vectors file."""
+        if self.dim is None or self.vectors_path is None or not self.vectors_path.exists():
+            return 0
+        return self.vectors_path.stat().st_size // (self.dim * 4)
+
+    def _matrix(self) -> Optional[np.memmap]:
+        """Memory-map the vectors file (read-only)."""
+        rows = self._file_rows()
+        if rows == 0:
+            return None
+        if self._vectors is None or self._vectors.shape[0] != rows:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._vectors
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the vectors of texts.
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            List aligned with texts: float32 vector, or None for a miss
+        """
+        keys = [text_key(text) for text in texts]
+        positions = [i for i, key in enumerate(keys) if key in self.rows]
+        result = [None] * len(texts)
+        if not positions:
+            return result
+
+        try:
+            matrix = self._matrix()
+        except FileNotFoundError:
+            # Compacted by another writer since the index was read
+            self._load_index()
+            return self.get_many(texts)
+        rows = np.array([self.rows[keys[i]] for i in positions], dtype=np.int64)
+        vectors = np.asarray(matrix[rows])
+
+        self.tick += 1
+        for i, vector in zip(positions, vectors):
+            result[i] = vector
+            self.last_used[keys[i]] = self.tick
+        return result
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """
+        Add vectors to the cache (texts already cached are skipped).
+
+        Args:
+            texts: Embedded texts
+            vectors: Their embedding vectors (all of the same dimension)
+        """
+        new = {}
+        for text, vector in zip(texts, vectors):
+            key = text_key(text)
+            if key not in self.rows and key not in new:
+                new[key] = vector
+        if not new:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._lock():
+            self._sync()
+            new = {key: vector for key, vector in new.items() if key not in self.rows}
+            if not new:
+                self._save_locked()
+                return
+
+            matrix = np.asarray(list(new.values()), dtype=np.float32)
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match the cache ({self.dim})")
+            if self.vectors_file is None:
+                self.vectors_file = self._vectors_name(self.generation)
+
+            row_bytes = self.dim * 4
+            with open(self.vectors_path, "ab") as f:
+                # Rows go after the last complete row (a crashed writer may have left part of one)
+                first, partial = divmod(f.seek(0, os.SEEK_END), row_bytes)
+                if partial:
+                    f.truncate(first * row_bytes)
+                f.write(matrix.tobytes())
+
+            self.tick += 1
+            for offset, key in enumerate(new):
+                self.rows[key] = first + offset
+                self.last_used[key] = self.tick
+
+            if self._file_rows() * row_bytes > self.max_bytes:
+                self._evict_locked()
+            else:
+                self._save_locked()
+
+    def evict(self):
+        """Keep the most recently used rows that fit in max_bytes, in a new vectors file."""
+        if self.dim is None:
+            return
+        with self._lock():
+            self._sync()
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """Body of evict (lock held)."""
+        if self.dim is None:
+            return
+        capacity = max(self.max_bytes // (self.dim * 4), 0)
+        keep = sorted(self.rows, key=self.last_used.get, reverse=True)[:capacity]
+        keep.sort(key=self.rows.get)
+
+        matrix = self._matrix()
+        rows = np.array([self.rows[key] for key in keep], dtype=np.int64)
+        kept = np.asarray(matrix[rows]) if len(rows) else np.empty((0, self.dim), dtype=np.float32)
+        self._vectors = None
+
+        # The new vectors file is only used once the index names it
+        self.generation += 1
+        vectors_file = self._vectors_name(self.generation)
+        tmp_path = self.directory / (vectors_file + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(kept.astype(np.float32).tobytes())
+        os.replace(tmp_path, self.directory / vectors_file)
+
+        self.vectors_file = vectors_file
+        self.rows = {key: row for row, key in enumerate(keep)}
+        self.last_used = {key: self.last_used[key] for key in keep}
+        self._save_locked()
+
+        for stale in self.directory.glob("vectors*.f32"):
+            if stale.name != self.vectors_file:
+                stale.unlink(missing_ok=True)
+
+    @staticmethod
+    def _vectors_name(generation: int) -> str:
+        return f"vectors-{generation:08d}.f32"
+
+    def save(self):
+        """Write the index atomically (merged with the index on disk)."""
+        if self.dim is None:
+            return
+        with self._lock():
+            self._sync()
+            self._save_locked()
+
+    def _save_locked(self):
+        """Write the index of this instance atomically (lock held)."""
+        if self.dim is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        keys = list(self.rows)
+        tmp_path = self.index_path.with_name(INDEX_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.array(keys, dtype="U64"),
+                rows=np.array([self.rows[key] for key in keys], dtype=np.int64),
+                last_used=np.array([self.last_used[key] for key in keys], dtype=np.int64),
+                dim=np.int64(self.dim),
+                vectors=np.str_(self.vectors_file),
+                generation=np.int64(self.generation)
+            )
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,156 @@
+"""Batched, concurrent client for the OpenAI embeddings API."""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from .config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+    EMBEDDING_BASE_URL
+)
+
+# Backoff of retried requests: base * 2^attempt seconds (plus jitter), capped
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 20.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def split_batches(
+    texts: List[str],
+    max_count: int = EMBEDDING_BATCH_SIZE,
+    max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS
+) -> List[Tuple[int, int]]:
+    """
+    Split texts into request batches by input count and estimated tokens.
+
+    A single text over max_tokens gets a batch of its own.
+
+    Args:
+        texts: Texts to embed
+        max_count: Maximum inputs per request
+        max_tokens: Maximum estimated tokens per request
+
+    Returns:
+        List of (start, end) ranges covering texts in order
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        size = estimate_tokens(text)
+        if i > start and (i - start >= max_count or tokens + size > max_tokens):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += size
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+@lru_cache(maxsize=8)
+def get_client(api_key: str, base_url: Optional[str] = None):
+    """
+    Get a shared OpenAI client (one per API key and base URL).
+
+    Args:
+        api_key: OpenAI API key
+        base_url: API base URL (None = the OpenAI API)
+
+    Returns:
+        OpenAI client (safe to share between threads)
+    """
+    try:
+        from openai import OpenAI
+    except ImportError:
+        raise ImportError(
+            "OpenAI package is not installed. Install it with: pip install openai"
+        )
+
+    # Retries are handled per batch here
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Check if a failed request should be retried (rate limit, timeout, server error)."""
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in (408, 409, 429)
+
+
+def embed_batch(
+    client,
+    texts: List[str],
+    model: str = EMBEDDING_MODEL,
+    max_retries: int = EMBEDDING_MAX_RETRIES
+) -> List[List[float]]:
+    """
+    Embed one batch, retrying transient failures with exponential backoff.
+
+    Args:
+        client: OpenAI client
+        texts: Texts of the batch
+        model: Embedding model
+        max_retries: Retries after the first attempt
+
+    Returns:
+        Embedding vectors in the order of texts
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = client.embeddings.create(model=model, input=texts)
+            # The API returns an index per input: do not rely on the response order
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            delay = min(RETRY_BASE_SECONDS * 2 ** attempt, RETRY_MAX_SECONDS)
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+
+def embed(
+    texts: List[str],
+    api_key: str,
+    model: str = EMBEDDING_MODEL,
+    base_url: Optional[str] = EMBEDDING_BASE_URL,
+    concurrency: int = EMBEDDING_CONCURRENCY
+) -> List[List[float]]:
+    """
+    Embed texts in batches sent concurrently.
+
+    Args:
+        texts: Texts to embed
+        api_key: OpenAI API key
+        model: Embedding model
+        base_url: API base URL (e.g. a local stub server). None = the OpenAI API
+        concurrency: Maximum requests in flight
+
+    Returns:
+        Embedding vectors in the order of texts
+    """
+    if not texts:
+        return []
+
+    client = get_client(api_key, base_url)
+    batches = split_batches(texts)
+
+    if concurrency <= 1 or len(batches) == 1:
+        results = [embed_batch(client, texts[start:end], model) for start, end in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+            futures = [executor.submit(embed_batch, client, texts[start:end], model) for start, end in batches]
+            results = [future.result() for future in futures]
+
+    return [vector for batch in results for vector in batch]
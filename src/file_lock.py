@@ -0,0 +1,45 @@
+"""Exclusive locks shared between processes and threads, held on a lock file."""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Hold an exclusive lock on a lock file.
+
+    Blocks until no other process or thread holds it. The lock is an OS
+    file lock (flock, or msvcrt on Windows), so it is released even if the
+    holder crashes. It is not reentrant: do not nest locks on the same file.
+
+    Args:
+        path: Lock file (created if missing)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # Retries for about 10 seconds, then raises
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -2,24 +2,47 @@
 
 import pandas as pd
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import io
 import json
+import os
 from datetime import datetime
 
-from .data_loader import (
-    load_and_prepare_data, 
-    load_transactions_csv, 
-    initial_cleanup,
-    standardize_column_names,
-    process_card_numbers
-)
+from .data_loader import load_and_prepare_data, prepare_dataframe
 from .data_cleaner import clean_data
 from .cost_allocator import apply_cost_allocation
 from .categorizer import categorize_data
+from .dedup_index import drop_duplicate_keys
+from .schema import CURVE_COLUMNS, UNUSED_COLUMNS, concat_frames
+from .profiler import StageProfiler
+from .stage_cache import hash_source
+from .stage_graph import LazyPipeline, Stage, StageGraph
+from .transaction_store import SOURCE_COLUMN, load_transactions, write_edits, write_transactions
 from .config import (
     RAW_DATA_DIR,
     PROCESSED_DATA_DIR,
-    DEFAULT_CSV_PATH
+    DEFAULT_CSV_PATH,
+    PIPELINE_WORKERS,
+    STAGE_CACHE_ENABLED,
+    PIPELINE_PROFILE,
+    CARD_MAPPING,
+    CATEGORY_MAPPING,
+    CATEGORY_EN_TO_FI,
+    SUBCATEGORY_EN_TO_FI,
+    EMPTY_2ND_CATEGORY_RULES,
+    GENERAL_2ND_CATEGORIES,
+    SECOND_CATEGORY_OVERRIDES,
+    GENERAL_SUBCATEGORY_NAMES,
+    PREFIXED_SUBCATEGORY_CATEGORIES,
+    CATEGORY_PREFIXED_SUBCATEGORIES,
+    CATEGORY_PREFIX_EXCLUDE,
+    DEFAULT_START_DATE,
+    EXCLUDE_TYPES,
+    EXCLUDE_NOTES,
+    EXCLUDE_CURRENCIES,
+    EXCLUDE_CARD_LAST4
 )
 
 
@@ -41,21 +64,102 @@ def load_processed_files_log() -> dict:
 
 
 def save_processed_files_log(log: dict):
-    """Save the log of processed files."""
+    """Save the log of processed files (atomically, via a temporary file)."""
     log_file = get_processed_files_log()
     PROCESSED_DATA_DIR.mkdir(parents=True, exist_ok=True)
-    with open(log_file, 'w') as f:
+    tmp_file = log_file.with_name(log_file.name + ".tmp")
+    with open(tmp_file, 'w') as f:
         json.dump(log, f, indent=2)
+    os.replace(tmp_file, log_file)
 
 
-def get_file_info(file_path: Path) -> dict:
-    """Get file modification time and size."""
+def get_file_info(file_path: Path, scan: Optional[dict] = None) -> dict:
+    """Get file modification time and size (plus the ingested prefix from scan_file)."""
     stat = file_path.stat()
-    return {
+    info = {
         "modified_time": stat.st_mtime,
         "size": stat.st_size,
         "processed_time": datetime.now().isoformat()
     }
+    if scan is not None:
+        info.update({
+            "offset": scan["offset"],
+            "row_count": scan["row_count"],
+            "prefix_sha256": scan["prefix_sha256"]
+        })
+    return info
+
+
+def scan_file(file_path: Path, previous_offset: int = 0, block_size: int = 1 << 20) -> dict:
+    """
+    Hash the complete lines of a file in one pass.
+    
+    Args:
+        file_path: Path to the CSV file
+        previous_offset: Byte offset of a previously ingested prefix whose
+            hash should be reported as well
+        block_size: Bytes read per block
+        
+    Returns:
+        Dictionary with:
+        - offset: Bytes up to and including the last newline
+        - row_count: Data rows (excluding the header) in that prefix
+        - prefix_sha256: SHA-256 of the first offset bytes
+        - previous_prefix_sha256: SHA-256 of the first previous_offset bytes
+          (None if the file no longer has that many complete bytes)
+    """
+    hasher = hashlib.sha256()
+    previous_hash = None
+    position = 0
+    newlines = 0
+    pending = b""
+    
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            
+            data = pending + block
+            cut = data.rfind(b"\n") + 1
+            complete, pending = data[:cut], data[cut:]
+            
+            if previous_hash is None and 0 < previous_offset <= position + len(complete):
+                split = previous_offset - position
+                hasher.update(complete[:split])
+                previous_hash = hasher.copy().hexdigest()
+                hasher.update(complete[split:])
+            else:
+                hasher.update(complete)
+            
+            position += len(complete)
+            newlines += complete.count(b"\n")
+    
+    return {
+        "offset": position,
+        "row_count": max(newlines - 1, 0),
+        "prefix_sha256": hasher.hexdigest(),
+        "previous_prefix_sha256": previous_hash
+    }
+
+
+def read_file_tail(file_path: Path, start: int, end: int) -> io.BytesIO:
+    """
+    Read the header line and the bytes [start, end) of a CSV file.
+    
+    Args:
+        file_path: Path to the CSV file
+        start: Offset of the first appended byte (start of a line)
+        end: Offset just past the last complete line
+        
+    Returns:
+        In-memory CSV with the header and the appended rows
+    """
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        f.seek(start)
+        tail = f.read(end - start)
+    return io.BytesIO(header + tail)
 
 
 def is_file_new_or_updated(file_path: Path, processed_log: dict) -> bool:
@@ -111,18 +215,124 @@ def detect_new_files(directory: Optional[Path] = None) -> List[Path]:
     return new_files
 
 
+def _load_stage(source, options: dict) -> pd.DataFrame:
+    """Root stage: load and prepare a CSV path/file, or prepare a loaded DataFrame."""
+    if isinstance(source, pd.DataFrame):
+        # The caller's frame: only initial_cleanup copies it
+        return prepare_dataframe(source, profiler=options["profiler"])
+    return load_and_prepare_data(source, chunksize=options.get("chunksize"), profiler=options["profiler"])
+
+
+def _clean_stage(df: pd.DataFrame, options: dict) -> pd.DataFrame:
+    """Clean stage: duplicates, filters and date columns."""
+    return clean_data(df, start_date=options.get("start_date"), verbose=options.get("verbose", False), copy=False)
+
+
+def _allocate_stage(df: pd.DataFrame, options: dict) -> pd.DataFrame:
+    """Allocate stage: cost allocation from the notes."""
+    return apply_cost_allocation(df, copy=False)
+
+
+def _categorize_stage(df: pd.DataFrame, options: dict) -> pd.DataFrame:
+    """Categorize stage: 2nd category, translations and categoricals."""
+    return categorize_data(df, verbose=options.get("verbose", False), copy=False)
+
+
+# The transaction pipeline. process_transactions and process_dataframe both
+# compile from it; outputs are named after the stage that produces them
+TRANSACTION_GRAPH = StageGraph([
+    Stage(
+        "load", _load_stage,
+        config=(
+            CURVE_COLUMNS, UNUSED_COLUMNS, CARD_MAPPING,
+            EXCLUDE_TYPES, EXCLUDE_NOTES, EXCLUDE_CURRENCIES, EXCLUDE_CARD_LAST4
+        ),
+        profile=False,
+        message="Loaded {rows} rows"
+    ),
+    Stage(
+        "clean", _clean_stage, upstream="load",
+        key_options=("start_date",),
+        config=(EXCLUDE_CURRENCIES, EXCLUDE_CARD_LAST4),
+        message="After cleaning: {rows} rows"
+    ),
+    Stage("allocate", _allocate_stage, upstream="clean"),
+    Stage(
+        "categorize", _categorize_stage, upstream="allocate",
+        config=(
+            CATEGORY_MAPPING, CATEGORY_EN_TO_FI, SUBCATEGORY_EN_TO_FI,
+            EMPTY_2ND_CATEGORY_RULES, GENERAL_2ND_CATEGORIES, SECOND_CATEGORY_OVERRIDES,
+            GENERAL_SUBCATEGORY_NAMES, PREFIXED_SUBCATEGORY_CATEGORIES,
+            CATEGORY_PREFIXED_SUBCATEGORIES, CATEGORY_PREFIX_EXCLUDE
+        )
+    ),
+])
+
+
+def compile_transactions(
+    source,
+    start_date: Optional[str] = None,
+    verbose: bool = True,
+    chunksize: Optional[int] = None,
+    cache: bool = STAGE_CACHE_ENABLED,
+    profiler: Optional[StageProfiler] = None
+) -> LazyPipeline:
+    """
+    Bind the transaction pipeline to a source without running any stage.
+    
+    Request outputs with get(): e.g. get("clean") loads and cleans only,
+    and a later get("categorize") continues from the cleaned result.
+    
+    Args:
+        source: Path to CSV file, a file-like object, or a DataFrame loaded
+            from an export (original column names)
+        start_date: Start date for filtering (YYYY-MM-DD format)
+        verbose: If True, print processing information
+        chunksize: If set, load and prepare a CSV in streamed chunks of
+            this many rows (see CSV_CHUNK_SIZE) to cap peak memory
+        cache: If True, use the on-disk stage cache (see STAGE_CACHE_DIR).
+            Only file sources are cached
+        profiler: Records the stages that run
+        
+    Returns:
+        LazyPipeline with the stages load, clean, allocate and categorize
+    """
+    source_key = None
+    if cache and not isinstance(source, pd.DataFrame):
+        source_key = hash_source(source)
+    
+    options = {
+        "start_date": start_date or DEFAULT_START_DATE,
+        "verbose": verbose,
+        "chunksize": chunksize,
+    }
+    return TRANSACTION_GRAPH.compile(source, options, source_key=source_key, profiler=profiler)
+
+
 def process_transactions(
     csv_path: str,
     start_date: Optional[str] = None,
-    verbose: bool = True
+    verbose: bool = True,
+    chunksize: Optional[int] = None,
+    cache: bool = STAGE_CACHE_ENABLED,
+    profile: bool = PIPELINE_PROFILE
 ) -> pd.DataFrame:
     """
     Complete transaction processing pipeline.
     
+    With the stage cache enabled, the pipeline resumes from the last stage
+    whose result is cached for this input and config, and caches the result
+    of every stage it runs.
+    
     Args:
-        csv_path: Path to CSV file
+        csv_path: Path to CSV file (or a file-like object)
         start_date: Start date for filtering (YYYY-MM-DD format)
         verbose: If True, print processing information
+        chunksize: If set, load and prepare the CSV in streamed chunks of
+            this many rows (see CSV_CHUNK_SIZE) to cap peak memory
+        cache: If True, use the on-disk stage cache (see STAGE_CACHE_DIR)
+        profile: If True, record per-stage timings and add them as a JSON report to
+            PROFILE_REPORT_PATH
         
     Returns:
         Processed DataFrame
@@ -130,23 +340,15 @@ def process_transactions(
     if verbose:
         print(f"Loading data from: {csv_path}")
     
-    # Load and prepare data
-    df = load_and_prepare_data(csv_path)
+    profiler = StageProfiler(enabled=profile, source=str(csv_path))
+    pipeline = compile_transactions(
+        csv_path, start_date=start_date, verbose=verbose, chunksize=chunksize,
+        cache=cache, profiler=profiler
+    )
+    df = pipeline.get("categorize")
     
-    if verbose:
-        print(f"Loaded {len(df)} rows")
-    
-    # Clean data
-    df = clean_data(df, start_date=start_date, verbose=verbose)
-    
-    if verbose:
-        print(f"After cleaning: {len(df)} rows")
-    
-    # Apply cost allocation
-    df = apply_cost_allocation(df)
-    
-    # Categorize data
-    df = categorize_data(df, verbose=verbose)
+    if profile:
+        profiler.save()
     
     if verbose:
         print(f"Final dataset: {len(df)} rows")
@@ -158,19 +360,22 @@ def process_transactions(
 def process_dataframe(
     df: pd.DataFrame,
     start_date: Optional[str] = None,
-    verbose: bool = True
+    verbose: bool = True,
+    profile: bool = PIPELINE_PROFILE
 ) -> pd.DataFrame:
     """
     Process DataFrame through the complete pipeline (for uploaded files).
     
     This function processes a DataFrame that has already been loaded from CSV,
-    applying the same transformations as process_transactions but without
-    needing a file path.
+    running the same stage graph as process_transactions but without needing
+    a file path. The stage cache is not used.
     
     Args:
         df: Input DataFrame (already loaded from CSV, with original column names)
         start_date: Start date for filtering (YYYY-MM-DD format)
         verbose: If True, print processing information
+        profile: If True, record per-stage timings and add them as a JSON report to
+            PROFILE_REPORT_PATH
         
     Returns:
         Processed DataFrame
@@ -178,30 +383,12 @@ def process_dataframe(
     if verbose:
         print(f"Processing DataFrame with {len(df)} rows")
     
-    # Apply the same transformations as load_and_prepare_data
-    # 1. Initial cleanup
-    df = initial_cleanup(df)
-    
-    if verbose:
-        print(f"After initial cleanup: {len(df)} rows")
-    
-    # 2. Standardize column names
-    df = standardize_column_names(df)
+    profiler = StageProfiler(enabled=profile, source="DataFrame")
+    pipeline = compile_transactions(df, start_date=start_date, verbose=verbose, cache=False, profiler=profiler)
+    df = pipeline.get("categorize")
     
-    # 3. Process card numbers
-    df = process_card_numbers(df)
-    
-    # 4. Clean data (remove duplicates, filter dates, etc.)
-    df = clean_data(df, start_date=start_date, verbose=verbose)
-    
-    if verbose:
-        print(f"After cleaning: {len(df)} rows")
-    
-    # 5. Apply cost allocation
-    df = apply_cost_allocation(df)
-    
-    # 6. Categorize data
-    df = categorize_data(df, verbose=verbose)
+    if profile:
+        profiler.save()
     
     if verbose:
         print(f"Final dataset: {len(df)} rows")
@@ -211,6 +398,41 @@ def process_dataframe(
     return df
 
 
+def save_processed_data(
+    df: pd.DataFrame,
+    replace: bool = False,
+    superseded: Optional[List[str]] = None
+) -> int:
+    """
+    Save processed transactions to the persistent transaction store.
+    
+    Args:
+        df: Processed DataFrame
+        replace: If True, df replaces all stored transactions; otherwise it
+            is merged into the stored months
+        superseded: Files whose stored rows df replaces (see write_transactions)
+        
+    Returns:
+        Number of month partitions written
+    """
+    return write_transactions(df, replace=replace, superseded=superseded)
+
+
+def save_edited_data(df: pd.DataFrame) -> int:
+    """
+    Save all transactions after edits in the app (see write_edits).
+    
+    Edited rows are kept when their export is ingested again.
+    
+    Args:
+        df: All stored transactions, with the edits applied
+        
+    Returns:
+        Number of month partitions written
+    """
+    return write_edits(df)
+
+
 def save_to_excel(df: pd.DataFrame, excel_path: Optional[str] = None):
     """
     Save DataFrame to Excel file (deprecated - data now stored in session state).
@@ -223,47 +445,258 @@ def save_to_excel(df: pd.DataFrame, excel_path: Optional[str] = None):
     pass
 
 
+def ingest_file(
+    csv_path: str,
+    previous: Optional[dict] = None,
+    start_date: Optional[str] = None,
+    verbose: bool = True,
+    chunksize: Optional[int] = None
+) -> Tuple[pd.DataFrame, dict, bool]:
+    """
+    Process a CSV file without touching the transaction store or the log.
+    
+    If the already ingested bytes recorded in previous are unchanged (same
+    prefix hash), only the rows appended since then are processed.
+    Otherwise the whole file is processed; if it had been ingested before,
+    rows may have been edited or deleted, so the result supersedes what the
+    store holds from the file instead of adding to it.
+    
+    Args:
+        csv_path: Path to CSV file
+        previous: The file's entry in the processed files log (if any)
+        start_date: Start date for filtering (YYYY-MM-DD format)
+        verbose: If True, print processing information
+        chunksize: If set, stream the CSV in chunks of this many rows
+        
+    Returns:
+        Tuple of (processed DataFrame, new processed files log entry, whether
+        the DataFrame supersedes previously ingested rows of the file)
+    """
+    csv_file = Path(csv_path)
+    previous = previous or {}
+    previous_offset = previous.get("offset", 0)
+    
+    scan = scan_file(csv_file, previous_offset)
+    supersedes = False
+    
+    if previous.get("prefix_sha256") and scan["previous_prefix_sha256"] == previous["prefix_sha256"]:
+        # Already ingested prefix is unchanged: only the appended rows are new
+        if scan["offset"] == previous_offset:
+            df = pd.DataFrame()
+            if verbose:
+                print(f"No new rows in: {csv_path}")
+        else:
+            if verbose:
+                print(f"Processing {scan['row_count'] - previous.get('row_count', 0)} appended row(s) of: {csv_path}")
+            tail = read_file_tail(csv_file, previous_offset, scan["offset"])
+            # A tail is seen once: caching its stages would only fill the cache
+            df = process_transactions(tail, start_date=start_date, verbose=verbose, chunksize=chunksize, cache=False)
+    else:
+        # New file, or the ingested part changed: full reprocess
+        supersedes = previous_offset > 0
+        if supersedes and verbose:
+            print(f"Previously ingested rows changed, reprocessing: {csv_path}")
+        df = process_transactions(csv_path, start_date=start_date, verbose=verbose, chunksize=chunksize)
+    
+    return df, get_file_info(csv_file, scan), supersedes
+
+
+def _ingest_file_worker(
+    csv_path: str,
+    previous: Optional[dict],
+    start_date: Optional[str],
+    chunksize: Optional[int]
+) -> Tuple[bytes, dict, bool]:
+    """Run ingest_file in a worker process and return the result as Parquet bytes."""
+    df, info, supersedes = ingest_file(csv_path, previous, start_date=start_date, verbose=False, chunksize=chunksize)
+    
+    if df.empty:
+        return b"", info, supersedes
+    
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue(), info, supersedes
+
+
+def _ingest_files(
+    csv_files: List[Path],
+    processed_log: dict,
+    start_date: Optional[str],
+    verbose: bool,
+    chunksize: Optional[int],
+    workers: int
+) -> Tuple[List[pd.DataFrame], dict, List[str]]:
+    """
+    Run ingest_file on every file, in worker processes if workers > 1.
+    
+    The rows of every file get its path in the SOURCE_COLUMN.
+    
+    Args:
+        csv_files: CSV files to process
+        processed_log: Processed files log (the previous entry of each file)
+        start_date: Start date for filtering (YYYY-MM-DD format)
+        verbose: If True, print processing information
+        chunksize: If set, stream each CSV in chunks of this many rows
+        workers: Number of worker processes
+        
+    Returns:
+        Tuple of (non-empty processed DataFrames in file order, new log entry
+        per file, files whose result supersedes their previously ingested rows)
+    """
+    dfs = []
+    file_infos = {}
+    superseded = []
+    
+    if workers > 1 and len(csv_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(csv_files))) as executor:
+            futures = {
+                str(csv_file): executor.submit(
+                    _ingest_file_worker,
+                    str(csv_file),
+                    processed_log.get(str(csv_file)),
+                    start_date,
+                    chunksize
+                )
+                for csv_file in csv_files
+            }
+            for file_str, future in futures.items():
+                payload, info, supersedes = future.result()
+                if payload:
+                    df = pd.read_parquet(io.BytesIO(payload))
+                    df[SOURCE_COLUMN] = file_str
+                    dfs.append(df)
+                file_infos[file_str] = info
+                if supersedes:
+                    superseded.append(file_str)
+                if verbose:
+                    print(f"Processed {file_str}: {len(dfs[-1]) if payload else 0} rows")
+    else:
+        for csv_file in csv_files:
+            df, info, supersedes = ingest_file(
+                str(csv_file),
+                processed_log.get(str(csv_file)),
+                start_date=start_date,
+                verbose=verbose,
+                chunksize=chunksize
+            )
+            if not df.empty:
+                df[SOURCE_COLUMN] = str(csv_file)
+                dfs.append(df)
+            file_infos[str(csv_file)] = info
+            if supersedes:
+                superseded.append(str(csv_file))
+    
+    return dfs, file_infos, superseded
+
+
 def process_file(
     csv_path: str,
     start_date: Optional[str] = None,
-    verbose: bool = True
+    verbose: bool = True,
+    chunksize: Optional[int] = None
 ) -> pd.DataFrame:
     """
     Process a single CSV file.
     
+    If the file was processed before and the already ingested bytes are
+    unchanged (same prefix hash in the processed files log), only the rows
+    appended since then are processed and merged into the store. If the
+    ingested bytes changed, the file's stored rows are replaced (see
+    process_files).
+    
     Args:
         csv_path: Path to CSV file
         start_date: Start date for filtering (YYYY-MM-DD format)
         verbose: If True, print processing information
+        chunksize: If set, stream the CSV in chunks of this many rows
         
     Returns:
-        Processed DataFrame
+        Processed DataFrame (only the appended rows for an incremental update)
     """
-    csv_file = Path(csv_path)
+    return process_files([Path(csv_path)], start_date=start_date, verbose=verbose, chunksize=chunksize, workers=1)
+
+
+def process_files(
+    files: List[Path],
+    start_date: Optional[str] = None,
+    verbose: bool = True,
+    chunksize: Optional[int] = None,
+    workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Process a batch of CSV files as one update of the transaction store.
+    
+    With more than one worker, each file is processed in its own process
+    and sent back as Parquet. The cross-file deduplication, the store write
+    and the processed files log update happen once, after all files.
+    
+    The store records which file every row came from. When rows an earlier
+    run ingested from a file were edited or deleted in the export, the
+    file's stored rows are replaced by its current rows; rows of other
+    files, uploaded rows and rows edited in the app are kept (see
+    write_transactions).
+    
+    Args:
+        files: CSV files to process (later files win duplicate ties)
+        start_date: Start date for filtering (YYYY-MM-DD format)
+        verbose: If True, print processing information
+        chunksize: If set, stream each CSV in chunks of this many rows
+        workers: Number of worker processes. If None, uses PIPELINE_WORKERS
+        
+    Returns:
+        Combined processed DataFrame from all files
+    """
+    csv_files = [Path(f) for f in files]
+    
+    if workers is None:
+        workers = PIPELINE_WORKERS
+    
+    processed_log = load_processed_files_log()
     
-    # Process the file
-    df = process_transactions(csv_path, start_date=start_date, verbose=verbose)
+    # Process all files
+    dfs, file_infos, superseded = _ingest_files(csv_files, processed_log, start_date, verbose, chunksize, workers)
     
-    # Update processed files log
+    combined_df = pd.DataFrame()
+    
+    # Combine all dataframes
+    if dfs:
+        combined_df = concat_frames(dfs)
+        
+        # Remove duplicates across files (last by time wins, later files win ties)
+        combined_df = drop_duplicate_keys(combined_df)
+        combined_df = combined_df.sort_values(by=['date', 'time'], kind='stable').reset_index(drop=True)
+    
+    # Persist into the transaction store (replacing the stored rows of changed files)
+    if dfs or superseded:
+        save_processed_data(combined_df, superseded=superseded)
+    
+    if SOURCE_COLUMN in combined_df.columns:
+        combined_df = combined_df.drop(columns=SOURCE_COLUMN)
+    
+    # Update processed files log once, after every file has been stored
     processed_log = load_processed_files_log()
-    processed_log[str(csv_file)] = get_file_info(csv_file)
+    processed_log.update(file_infos)
     save_processed_files_log(processed_log)
     
-    return df
+    return combined_df
 
 
 def process_new_files(
     directory: Optional[Path] = None,
     start_date: Optional[str] = None,
-    verbose: bool = True
+    verbose: bool = True,
+    chunksize: Optional[int] = None,
+    workers: Optional[int] = None
 ) -> pd.DataFrame:
     """
-    Detect and process all new or updated CSV files.
+    Detect and process all new or updated CSV files (see process_files).
     
     Args:
         directory: Directory to search for CSV files. If None, uses RAW_DATA_DIR
         start_date: Start date for filtering (YYYY-MM-DD format)
         verbose: If True, print processing information
+        chunksize: If set, stream each CSV in chunks of this many rows
+        workers: Number of worker processes. If None, uses PIPELINE_WORKERS
         
     Returns:
         Combined processed DataFrame from all new files
@@ -280,42 +713,23 @@ def process_new_files(
         for f in new_files:
             print(f"  - {f}")
     
-    # Process all new files
-    dfs = []
-    for csv_file in new_files:
-        df = process_file(
-            str(csv_file),
-            start_date=start_date,
-            verbose=verbose
-        )
-        dfs.append(df)
-    
-    # Combine all dataframes
-    if dfs:
-        combined_df = pd.concat(dfs, ignore_index=True)
-        
-        # Remove duplicates across files
-        combined_df = combined_df.sort_values(by=['date', 'time'])
-        combined_df = combined_df.drop_duplicates(
-            subset=['merchant', 'date', 'amount'],
-            keep='last'
-        ).reset_index(drop=True)
-        
-        return combined_df
-    
-    return pd.DataFrame()
+    return process_files(
+        new_files,
+        start_date=start_date,
+        verbose=verbose,
+        chunksize=chunksize,
+        workers=workers
+    )
 
 
 def load_processed_data(excel_path: Optional[str] = None) -> pd.DataFrame:
     """
-    Load processed data from Excel file (deprecated - data now stored in session state).
+    Load processed data from the persistent transaction store.
     
     Args:
-        excel_path: Path to Excel file (ignored)
+        excel_path: Ignored (kept for backwards compatibility)
         
     Returns:
-        Empty DataFrame (data is now stored in Streamlit session state)
+        All stored transactions (empty DataFrame if nothing has been processed)
     """
-    # Return empty DataFrame - data is now stored in Streamlit session state
-    return pd.DataFrame()
-
+    return load_transactions()
@@ -0,0 +1,244 @@
+"""Opt-in per-stage profiling of the processing pipeline."""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .config import PROFILE_REPORT_MAX_RUNS, PROFILE_REPORT_PATH
+from .file_lock import file_lock
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Get the peak resident set size of this process in MB (None if unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """
+    Record wall time, CPU time, peak RSS growth and row counts per named stage.
+
+    Stages that run several times (e.g. once per chunk when streaming) are
+    accumulated into one record. A disabled profiler only runs the stages.
+    """
+
+    def __init__(self, enabled: bool = True, source: Optional[str] = None):
+        """
+        Create a profiler.
+
+        Args:
+            enabled: If False, nothing is measured
+            source: Description of the input (e.g. the CSV path) for the report
+        """
+        self.enabled = enabled
+        self.source = source
+        self.records = {}
+        self.created = datetime.now().isoformat()
+
+    def _record(self, name: str) -> dict:
+        """Get the record of a stage, creating it on first use."""
+        if name not in self.records:
+            self.records[name] = {
+                "stage": name,
+                "calls": 0,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "peak_rss_delta_mb": 0.0,
+                "rows_in": None,
+                "rows_out": None,
+                "cached": False,
+            }
+        return self.records[name]
+
+    @staticmethod
+    def _add_rows(record: dict, key: str, rows: Optional[int]):
+        """Accumulate a row count into a record."""
+        if rows is not None:
+            record[key] = (record[key] or 0) + rows
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        """
+        Measure a block of code as (part of) a stage.
+
+        Args:
+            name: Stage name
+            rows_in: Rows entering the stage
+
+        Yields:
+            The stage record; set rows with add_rows_out
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        record = self._record(name)
+        self._add_rows(record, "rows_in", rows_in)
+        rss_before = _peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record["calls"] += 1
+            record["wall_s"] += time.perf_counter() - wall_start
+            record["cpu_s"] += time.process_time() - cpu_start
+            rss_after = _peak_rss_mb()
+            if rss_before is not None and rss_after is not None:
+                record["peak_rss_delta_mb"] += max(rss_after - rss_before, 0.0)
+
+    def run(self, name: str, func: Callable, df=None, *args, **kwargs):
+        """
+        Run func(df, *args, **kwargs) as a stage.
+
+        Args:
+            name: Stage name
+            func: Stage function
+            df: Input DataFrame (None for stages without input, e.g. loading)
+            *args: Further positional arguments of func
+            **kwargs: Keyword arguments of func
+
+        Returns:
+            Result of func
+        """
+        call_args = args if df is None else (df,) + args
+
+        if not self.enabled:
+            return func(*call_args, **kwargs)
+
+        with self.stage(name, rows_in=None if df is None else len(df)) as record:
+            result = func(*call_args, **kwargs)
+            self._add_rows(record, "rows_out", len(result) if hasattr(result, "__len__") else None)
+        return result
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """
+        Measure the production of every item of an iterable as a stage.
+
+        Args:
+            name: Stage name
+            iterable: Iterable of DataFrames (e.g. CSV chunks)
+
+        Yields:
+            The items of iterable
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as record:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    if record is not None:
+                        record["calls"] -= 1
+                    return
+                if record is not None:
+                    self._add_rows(record, "rows_out", len(item))
+            yield item
+
+    def mark_cached(self, name: str, rows_out: int):
+        """Record a stage whose result came from the stage cache."""
+        if not self.enabled:
+            return
+        record = self._record(name)
+        record["cached"] = True
+        self._add_rows(record, "rows_out", rows_out)
+
+    def report(self) -> dict:
+        """
+        Build the structured report.
+
+        Returns:
+            Dictionary with the source, timestamps, totals and per-stage records
+        """
+        stages = [dict(record) for record in self.records.values()]
+        for record in stages:
+            for key in ("wall_s", "cpu_s", "peak_rss_delta_mb"):
+                record[key] = round(record[key], 6)
+
+        return {
+            "source": self.source,
+            "created": self.created,
+            "pid": os.getpid(),
+            "total_wall_s": round(sum(record["wall_s"] for record in stages), 6),
+            "total_cpu_s": round(sum(record["cpu_s"] for record in stages), 6),
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": stages,
+        }
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        """
+        Add the report to the report file (atomically).
+
+        The file keeps the PROFILE_REPORT_MAX_RUNS newest runs. Profilers of
+        several processes (e.g. workers of process_files) add their reports
+        under a lock, each writing through its own temporary file.
+
+        Args:
+            path: Report file. If None, uses PROFILE_REPORT_PATH
+
+        Returns:
+            Path of the written report file
+        """
+        path = Path(path or PROFILE_REPORT_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(path.with_name(path.name + ".lock")):
+            runs = load_profile_reports(path)
+            runs.append(self.report())
+            runs = runs[-PROFILE_REPORT_MAX_RUNS:]
+            with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=path.name + ".",
+                                             suffix=".tmp", delete=False) as f:
+                json.dump({"runs": runs}, f, indent=2)
+            os.replace(f.name, path)
+        return path
+
+
+def load_profile_reports(path: Optional[Path] = None) -> List[dict]:
+    """
+    Load all saved profiling reports.
+
+    Args:
+        path: Report file. If None, uses PROFILE_REPORT_PATH
+
+    Returns:
+        Reports, oldest first (empty if no report exists)
+    """
+    path = Path(path or PROFILE_REPORT_PATH)
+    if not path.exists():
+        return []
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if isinstance(data, dict) and isinstance(data.get("runs"), list):
+        return data["runs"]
+    # Report file of a single run (written before reports were kept per run)
+    return [data] if isinstance(data, dict) and "stages" in data else []
+
+
+def load_profile_report(path: Optional[Path] = None) -> Optional[dict]:
+    """
+    Load the last saved profiling report.
+
+    Args:
+        path: Report file. If None, uses PROFILE_REPORT_PATH
+
+    Returns:
+        Report dictionary, or None if no report exists
+    """
+    runs = load_profile_reports(path)
+    return runs[-1] if runs else None
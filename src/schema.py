@@ -0,0 +1,285 @@
+"""Declared column schema for Curve CSV exports."""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+# Fixed formats of the date and time columns in the export
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M:%S"
+
+DATE_COLUMN = "Date (YYYY-MM-DD as UTC)"
+
+# Columns read from the export (stripped header name -> dtype).
+# The date column is read as text and parsed with DATE_FORMAT afterwards.
+CURVE_COLUMNS = {
+    "Date (YYYY-MM-DD as UTC)": "object",
+    "Time (HH:MM:SS)": "object",
+    "Merchant": "object",
+    "Txn Amount (Funding Card)": "float64",
+    "Txn Currency (Funding Card)": "category",
+    "Txn Currency (Foreign Spend)": "category",
+    "Card Name": "category",
+    "Card Last 4 Digits": "object",
+    "Type": "category",
+    "Category": "category",
+    "Notes": "object",
+}
+
+# Columns present in the export that the pipeline never uses
+UNUSED_COLUMNS = ["Export Format", "Txn Amount (Foreign Spend)"]
+
+# Low-cardinality text columns of the processed dataset, kept as pandas Categoricals
+CATEGORICAL_COLUMNS = ["category", "2nd category", "card", "currency", "foreign_currency", "merchant"]
+
+# Strings read as missing values (same as the pandas C parser defaults)
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+]
+
+
+def select_columns(columns: List[str]) -> List[str]:
+    """
+    Select the raw header names that are declared in CURVE_COLUMNS.
+
+    Args:
+        columns: Header names as they appear in the file (may contain whitespace)
+
+    Returns:
+        Header names to read, in file order
+    """
+    return [col for col in columns if col.strip() in CURVE_COLUMNS]
+
+
+def pandas_dtypes(columns: List[str]) -> dict:
+    """
+    Map raw header names to their declared pandas dtypes.
+
+    Args:
+        columns: Header names as they appear in the file
+
+    Returns:
+        Dictionary of header name -> dtype for read_csv
+    """
+    return {col: CURVE_COLUMNS[col.strip()] for col in columns if col.strip() in CURVE_COLUMNS}
+
+
+def arrow_types(columns: List[str]) -> dict:
+    """
+    Map raw header names to their declared Arrow types.
+
+    Args:
+        columns: Header names as they appear in the file
+
+    Returns:
+        Dictionary of header name -> pyarrow DataType
+    """
+    import pyarrow as pa
+
+    type_map = {
+        "object": pa.string(),
+        "float64": pa.float64(),
+        "category": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return {col: type_map[dtype] for col, dtype in pandas_dtypes(columns).items()}
+
+
+def parse_date_column(series: pd.Series) -> pd.Series:
+    """
+    Parse a date column with the fixed DATE_FORMAT.
+
+    Falls back to format inference if some value does not match the format.
+
+    Args:
+        series: Series of date strings (or already parsed dates)
+
+    Returns:
+        datetime64 Series
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    try:
+        return pd.to_datetime(series, format=DATE_FORMAT)
+    except (ValueError, TypeError):
+        return pd.to_datetime(series)
+
+
+def parse_time_column(series: pd.Series) -> pd.Series:
+    """
+    Parse a time column with the fixed TIME_FORMAT into offsets from midnight.
+    
+    Only the unique values are parsed. Values that do not match the format
+    fall back to to_timedelta; missing or unparseable times become zero.
+    
+    Args:
+        series: Series of time strings
+        
+    Returns:
+        timedelta64 Series aligned with series
+    """
+    codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    
+    parsed = pd.to_datetime(uniques, format=TIME_FORMAT, errors="coerce")
+    offsets = parsed - parsed.dt.normalize()
+    
+    unmatched = offsets.isna()
+    if unmatched.any():
+        offsets[unmatched] = pd.to_timedelta(uniques[unmatched].astype(str), errors="coerce")
+    
+    # Missing values have code -1: append a zero offset so they index it
+    values = np.append(offsets.fillna(pd.Timedelta(0)).to_numpy(), np.timedelta64(0, "ns"))
+    return pd.Series(values[codes], index=series.index)
+
+
+def combine_date_time(date: pd.Series, time: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Combine date and time columns into one datetime64 column.
+    
+    Args:
+        date: Parsed dates (or date strings)
+        time: Time strings (HH:MM:SS). If None, only the date is used
+        
+    Returns:
+        datetime64 Series (NaT where the date is missing)
+    """
+    if not pd.api.types.is_datetime64_any_dtype(date):
+        date = pd.to_datetime(date, errors="coerce")
+    
+    if time is None:
+        return date
+    
+    return date + parse_time_column(time)
+
+
+def select_rows(df: pd.DataFrame, mask) -> pd.DataFrame:
+    """
+    Select the rows where mask is True, as a new frame owned by the caller.
+
+    Unlike df[mask], the result is not tracked as a slice of df, so stages
+    can add and replace its columns in place (no SettingWithCopyWarning).
+
+    Args:
+        df: Input DataFrame
+        mask: Boolean mask aligned with the rows of df
+
+    Returns:
+        DataFrame with the selected rows (index labels kept)
+    """
+    return df.take(np.flatnonzero(np.asarray(mask, dtype=bool)))
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate DataFrames and keep categorical columns categorical.
+
+    pd.concat falls back to object dtype when the categories of the inputs
+    differ, which is the normal case for independently read chunks.
+
+    Args:
+        frames: DataFrames with the same columns
+
+    Returns:
+        Concatenated DataFrame with a fresh RangeIndex
+    """
+    categorical = [
+        col for col, dtype in frames[0].dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    ]
+    df = pd.concat(frames, ignore_index=True)
+
+    for col in categorical:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    return df
+
+
+def restore_missing_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Replace None with NaN in text columns, as the pandas C parser would.
+
+    Args:
+        df: DataFrame read through Arrow
+
+    Returns:
+        The same DataFrame with NaN as the missing value marker
+    """
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def _sorted_values(values) -> list:
+    """Sort category values like a groupby on the text column would."""
+    try:
+        return sorted(values)
+    except TypeError:
+        return sorted(values, key=str)
+
+
+def encode_categoricals(
+    df: pd.DataFrame,
+    vocabularies: Optional[dict] = None,
+    copy: bool = True
+) -> pd.DataFrame:
+    """
+    Encode the CATEGORICAL_COLUMNS as pandas Categoricals.
+    
+    The categories of a column are the sorted union of its vocabulary and
+    the values present, so groupbys on the column order groups as on the
+    text column. Codes are therefore only stable for columns whose values
+    all come from the vocabulary (e.g. category): a value outside it (any
+    merchant) shifts the codes of the values sorted after it. Compare
+    values, not codes, across frames.
+    
+    Args:
+        df: Input DataFrame
+        vocabularies: Dictionary of column -> known values
+        copy: If False, modify df in place instead of working on a copy
+        
+    Returns:
+        DataFrame with categorical columns
+    """
+    if copy:
+        df = df.copy()
+    
+    vocabularies = vocabularies or {}
+    
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            present = values.cat.categories
+        else:
+            present = values.dropna().unique()
+        
+        categories = _sorted_values(set(vocabularies.get(col, ())) | set(present))
+        df[col] = pd.Categorical(values, categories=categories)
+    
+    return df
+
+
+def set_value(df: pd.DataFrame, index, column: str, value):
+    """
+    Set one cell, adding the value to the categories of a categorical column.
+    
+    Args:
+        df: DataFrame to modify in place
+        index: Row label
+        column: Column name
+        value: New value
+    """
+    if (
+        isinstance(df[column].dtype, pd.CategoricalDtype)
+        and pd.notna(value)
+        and value not in df[column].cat.categories
+    ):
+        df[column] = df[column].cat.add_categories([value])
+    df.loc[index, column] = value
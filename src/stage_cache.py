@@ -0,0 +1,149 @@
+"""On-disk, content-addressed cache for pipeline stage results."""
+
+import hashlib
+import os
+import pandas as pd
+from pathlib import Path
+from typing import Any, Optional
+
+from .config import STAGE_CACHE_DIR, STAGE_CACHE_MAX_BYTES
+
+# Bump when a stage's code changes in a way that changes its output
+STAGE_CACHE_VERSION = 5
+
+
+def hash_source(source: Any, block_size: int = 1 << 20) -> str:
+    """
+    Hash the content of a file path or file-like object.
+
+    Args:
+        source: Path to a file, or a seekable binary file-like object
+        block_size: Bytes read per block
+
+    Returns:
+        SHA-256 hex digest of the content
+    """
+    hasher = hashlib.sha256()
+
+    if hasattr(source, "read"):
+        source.seek(0)
+        for block in iter(lambda: source.read(block_size), b""):
+            hasher.update(block)
+        source.seek(0)
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+def stage_key(stage: str, input_key: str, *config: Any) -> str:
+    """
+    Build the cache key of a stage result.
+
+    The input key is the content hash of the source file (first stage) or
+    the key of the previous stage, so a key identifies the input data by
+    content. config holds the config.py values the stage depends on.
+
+    Args:
+        stage: Stage name
+        input_key: Key of the stage input
+        *config: Config values used by the stage
+
+    Returns:
+        SHA-256 hex digest
+    """
+    payload = repr((STAGE_CACHE_VERSION, stage, input_key, config))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str, cache_dir: Optional[Path] = None) -> Path:
+    """Get the file of a cache entry."""
+    return Path(cache_dir or STAGE_CACHE_DIR) / f"{key}.pkl"
+
+
+def cache_get(key: str, cache_dir: Optional[Path] = None) -> Optional[pd.DataFrame]:
+    """
+    Load a cached stage result.
+
+    A hit refreshes the entry's modification time, which is what LRU
+    eviction orders by.
+
+    Args:
+        key: Stage key
+        cache_dir: Cache directory. If None, uses STAGE_CACHE_DIR
+
+    Returns:
+        Cached DataFrame, or None on a miss
+    """
+    path = _entry_path(key, cache_dir)
+    if not path.exists():
+        return None
+
+    try:
+        df = pd.read_pickle(path)
+    except Exception:
+        # Unreadable entry (e.g. interrupted write): treat as a miss
+        return None
+
+    os.utime(path)
+    return df
+
+
+def cache_put(
+    key: str,
+    df: pd.DataFrame,
+    cache_dir: Optional[Path] = None,
+    max_bytes: int = STAGE_CACHE_MAX_BYTES
+):
+    """
+    Store a stage result and evict least recently used entries over the limit.
+
+    Args:
+        key: Stage key
+        df: Stage result
+        cache_dir: Cache directory. If None, uses STAGE_CACHE_DIR
+        max_bytes: Maximum total size of the cache directory
+    """
+    path = _entry_path(key, cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir: Optional[Path] = None, max_bytes: int = STAGE_CACHE_MAX_BYTES) -> int:
+    """
+    Delete least recently used entries until the cache fits in max_bytes.
+
+    Args:
+        cache_dir: Cache directory. If None, uses STAGE_CACHE_DIR
+        max_bytes: Maximum total size of the cache directory
+
+    Returns:
+        Number of entries deleted
+    """
+    directory = Path(cache_dir or STAGE_CACHE_DIR)
+    if not directory.exists():
+        return 0
+
+    entries = []
+    for path in directory.glob("*.pkl"):
+        stat = path.stat()
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        deleted += 1
+
+    return deleted
@@ -0,0 +1,218 @@
+"""Declarative stage graph with lazy, cached evaluation of pipeline outputs."""
+
+import pandas as pd
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .profiler import StageProfiler
+from .stage_cache import cache_get, cache_put, stage_key
+
+
+class Stage(NamedTuple):
+    """
+    One node of a stage graph.
+
+    Attributes:
+        name: Stage (and output) name
+        run: run(input, options) -> DataFrame. The input is the source for a
+            root stage and the upstream result otherwise. An upstream result
+            is owned by the stage, which may modify it in place; a root stage
+            must not modify the source
+        upstream: Name of the input stage (None for the root stage)
+        key_options: Run options the output depends on (part of the cache key)
+        config: Config values the output depends on (part of the cache key)
+        profile: If False, the stage is not measured as a whole (it records
+            its own sub-stages through options["profiler"])
+        message: Printed after the stage when verbose, formatted with {rows}
+    """
+    name: str
+    run: Callable[[Any, dict], pd.DataFrame]
+    upstream: Optional[str] = None
+    key_options: Tuple[str, ...] = ()
+    config: Tuple[Any, ...] = ()
+    profile: bool = True
+    message: Optional[str] = None
+
+
+class StageGraph:
+    """A set of stages where every stage has at most one upstream stage."""
+
+    def __init__(self, stages: List[Stage]):
+        """
+        Create a graph.
+
+        Args:
+            stages: Stages of the graph (upstream stages must be listed first)
+
+        Raises:
+            ValueError: If a stage name repeats or an upstream stage is unknown
+        """
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage: {stage.name}")
+            if stage.upstream is not None and stage.upstream not in self.stages:
+                raise ValueError(f"Unknown upstream stage of {stage.name}: {stage.upstream}")
+            self.stages[stage.name] = stage
+
+    def plan(self, target: str) -> List[Stage]:
+        """
+        Get the stages needed for an output, from the root to the target.
+
+        Args:
+            target: Name of the requested stage
+
+        Returns:
+            List of stages in run order
+
+        Raises:
+            KeyError: If target is not a stage of the graph
+        """
+        if target not in self.stages:
+            raise KeyError(f"Unknown stage: {target}")
+
+        plan = []
+        name = target
+        while name is not None:
+            stage = self.stages[name]
+            plan.append(stage)
+            name = stage.upstream
+        return plan[::-1]
+
+    def stage_keys(self, target: str, source_key: str, options: Optional[dict] = None) -> Dict[str, str]:
+        """
+        Build the cache keys of the stages needed for an output.
+
+        Each key chains the upstream key with the stage's key options and
+        config, so a config change only invalidates the stages that use it
+        and everything downstream of them.
+
+        Args:
+            target: Name of the requested stage
+            source_key: Content hash of the source
+            options: Run options
+
+        Returns:
+            Dictionary of stage name -> key, in run order
+        """
+        options = options or {}
+        keys = {}
+        input_key = source_key
+        for stage in self.plan(target):
+            values = tuple(options.get(option) for option in stage.key_options)
+            input_key = stage_key(stage.name, input_key, *values, *stage.config)
+            keys[stage.name] = input_key
+        return keys
+
+    def compile(
+        self,
+        source: Any,
+        options: Optional[dict] = None,
+        source_key: Optional[str] = None,
+        profiler: Optional[StageProfiler] = None
+    ) -> "LazyPipeline":
+        """
+        Bind the graph to a source without running anything.
+
+        Args:
+            source: Input of the root stage (e.g. a CSV path or a DataFrame)
+            options: Run options passed to every stage
+            source_key: Content hash of the source. If None, the stage cache
+                is not used
+            profiler: Records the stages that run
+
+        Returns:
+            LazyPipeline whose outputs are computed on request
+        """
+        return LazyPipeline(self, source, options, source_key, profiler)
+
+
+class LazyPipeline:
+    """A stage graph bound to one source; outputs are computed when requested."""
+
+    def __init__(
+        self,
+        graph: StageGraph,
+        source: Any,
+        options: Optional[dict] = None,
+        source_key: Optional[str] = None,
+        profiler: Optional[StageProfiler] = None
+    ):
+        """
+        Create a lazy pipeline (see StageGraph.compile).
+
+        Args:
+            graph: Stage graph
+            source: Input of the root stage
+            options: Run options passed to every stage
+            source_key: Content hash of the source (None disables the cache)
+            profiler: Records the stages that run
+        """
+        self.graph = graph
+        self.source = source
+        self.profiler = profiler or StageProfiler(enabled=False)
+        self.options = {**(options or {}), "profiler": self.profiler}
+        self.source_key = source_key
+        self.results: Dict[str, pd.DataFrame] = {}
+        self.ran: List[str] = []
+
+    def _say(self, text: str):
+        """Print progress if the verbose option is set."""
+        if self.options.get("verbose"):
+            print(text)
+
+    def get(self, target: str) -> pd.DataFrame:
+        """
+        Compute (or reuse) the output of a stage.
+
+        Only the stages between the target and the nearest available result
+        run: an output returned earlier, or, with a source key, a stage cache
+        entry. Results returned to the caller are kept and never modified;
+        stages after them get a copy of their own (stages work in place on
+        their input).
+
+        Args:
+            target: Name of the requested stage
+
+        Returns:
+            DataFrame output of the target stage
+        """
+        if target in self.results:
+            return self.results[target]
+
+        plan = self.graph.plan(target)
+        keys = (
+            self.graph.stage_keys(target, self.source_key, self.options)
+            if self.source_key is not None else {}
+        )
+
+        # Resume after the last stage with an available result
+        df = None
+        first = 0
+        for index in range(len(plan) - 1, -1, -1):
+            name = plan[index].name
+            if name in self.results:
+                df = self.results[name].copy()
+            elif keys:
+                df = cache_get(keys[name])
+                if df is not None:
+                    self.profiler.mark_cached(name, len(df))
+                    self._say(f"Using cached '{name}' stage result")
+            if df is not None:
+                first = index + 1
+                break
+
+        for stage in plan[first:]:
+            stage_input = self.source if stage.upstream is None else df
+            if stage.profile:
+                df = self.profiler.run(stage.name, stage.run, stage_input, self.options)
+            else:
+                df = stage.run(stage_input, self.options)
+            self.ran.append(stage.name)
+
+            if keys:
+                cache_put(keys[stage.name], df)
+            if stage.message:
+                self._say(stage.message.format(rows=len(df)))
+
+        self.results[target] = df
+        return df
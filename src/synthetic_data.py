@@ -0,0 +1,274 @@
+"""Deterministic synthetic Curve exports for benchmarks and load testing."""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Iterator
+
+from .config import (
+    CARD_MAPPING,
+    CATEGORY_MAPPING,
+    DEFAULT_START_DATE,
+    EXCLUDE_CARD_LAST4,
+    EXCLUDE_CURRENCIES,
+    EXCLUDE_NOTES,
+    EXCLUDE_TYPES
+)
+
+# Header of a Curve export, in file order
+SYNTHETIC_COLUMNS = [
+    "Date (YYYY-MM-DD as UTC)",
+    "Time (HH:MM:SS)",
+    "Merchant",
+    "Txn Amount (Funding Card)",
+    "Txn Currency (Funding Card)",
+    "Txn Amount (Foreign Spend)",
+    "Txn Currency (Foreign Spend)",
+    "Card Name",
+    "Card Last 4 Digits",
+    "Type",
+    "Category",
+    "Notes",
+    "Export Format",
+]
+
+# Rows are generated in blocks with their own seed, so the content of a
+# file only depends on (rows, seed) and not on how it is written
+SYNTHETIC_BLOCK_ROWS = 100_000
+
+# Share of rows that repeat an earlier transaction, are refunds, or are excluded otherwise
+DUPLICATE_RATE = 0.02
+REFUND_RATE = 0.03
+EXCLUDED_RATE = 0.01
+
+MERCHANT_NAMES = [
+    "Prisma", "K-Market", "Lidl", "S-Market", "Alepa", "Shell", "Neste", "ABC",
+    "Netflix", "Spotify", "Amazon", "Zalando", "VR", "HSL", "Finnair", "Apteekki",
+    "Tokmanni", "Clas Ohlson", "Motonet", "Hesburger", "McDonald's", "Wolt", "Foodora",
+    "IKEA", "Verkkokauppa.com", "Gigantti", "Stockmann", "Elisa", "DNA", "Telia",
+]
+MERCHANT_LOCATIONS = 60
+
+CARDS = [("Curve", number) for number in CARD_MAPPING] + [("Curve", None)]
+FOREIGN_CURRENCIES = {"SEK": 11.5, "USD": 1.08, "NOK": 11.6}
+
+
+def merchant_vocabulary() -> np.ndarray:
+    """
+    Build the merchant names used in synthetic exports.
+
+    Names include commas and quotes so that CSV quoting is exercised.
+
+    Returns:
+        Array of merchant names
+    """
+    names = []
+    for name in MERCHANT_NAMES:
+        names.append(name)
+        names.extend(f"{name} {location:02d}" for location in range(1, MERCHANT_LOCATIONS))
+    names.extend(['Kahvila "Paussi"', "Oy Esimerkki, Helsinki"])
+    return np.array(names, dtype=object)
+
+
+def notes_vocabulary(category: str) -> np.ndarray:
+    """
+    Build the notes used for a category: its subcategory codes, allocations and free text.
+
+    Args:
+        category: Main category (a CATEGORY_MAPPING key)
+
+    Returns:
+        Array of notes strings ('' = no notes)
+    """
+    codes = list(CATEGORY_MAPPING.get(category, {}))
+    notes = [""] * 4 + codes * 3
+    notes += [f"{code}/50%" for code in codes] + [f"{code}/30%" for code in codes]
+    notes += ["trip/50%", "shared/25%"]
+    return np.array(notes, dtype=object)
+
+
+def _random_times(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """Random HH:MM:SS strings, built from the unique seconds only."""
+    seconds = rng.integers(0, 24 * 60 * 60, rows)
+    uniques, codes = np.unique(seconds, return_inverse=True)
+    labels = np.array(
+        [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in uniques], dtype=object
+    )
+    return labels[codes]
+
+
+def generate_block(
+    rows: int,
+    seed: int = 0,
+    block: int = 0,
+    start_date: str = DEFAULT_START_DATE,
+    days: int = 730
+) -> pd.DataFrame:
+    """
+    Generate one block of a synthetic Curve export.
+
+    Args:
+        rows: Number of rows in the block
+        seed: Seed of the whole export
+        block: Block number (each block has its own random stream)
+        start_date: First transaction date. About 5% of rows fall before it
+        days: Number of days covered from start_date
+
+    Returns:
+        DataFrame with the SYNTHETIC_COLUMNS (all text except the amounts)
+    """
+    rng = np.random.default_rng([seed, block])
+    merchants = merchant_vocabulary()
+    categories = np.array(list(CATEGORY_MAPPING), dtype=object)
+    start = pd.Timestamp(start_date)
+
+    # Skewed popularity: a few merchants dominate, as in real data
+    merchant_weights = 1.0 / np.arange(1, len(merchants) + 1)
+    merchant_weights /= merchant_weights.sum()
+    category_ids = rng.integers(0, len(categories), rows)
+
+    offsets = rng.integers(-days // 20, days, rows)
+    dates = (start + pd.to_timedelta(offsets, unit="D")).strftime("%Y-%m-%d").to_numpy(dtype=object)
+    amounts = np.round(rng.lognormal(mean=3.0, sigma=1.0, size=rows), 2)
+
+    notes = np.empty(rows, dtype=object)
+    for category_id, category in enumerate(categories):
+        in_category = category_ids == category_id
+        vocabulary = notes_vocabulary(category)
+        notes[in_category] = vocabulary[rng.integers(0, len(vocabulary), in_category.sum())]
+    notes[notes == ""] = None
+
+    foreign = np.full(rows, "EUR", dtype=object)
+    foreign_amounts = amounts.copy()
+    is_foreign = rng.random(rows) < 0.1
+    currencies = np.array(list(FOREIGN_CURRENCIES), dtype=object)
+    foreign[is_foreign] = currencies[rng.integers(0, len(currencies), is_foreign.sum())]
+    rates = np.array([FOREIGN_CURRENCIES.get(c, 1.0) for c in foreign[is_foreign]])
+    foreign_amounts[is_foreign] = np.round(amounts[is_foreign] * rates, 2)
+
+    card_ids = rng.integers(0, len(CARDS), rows)
+    card_names = np.array([name for name, _ in CARDS], dtype=object)[card_ids]
+    card_numbers = np.array(
+        [None if number is None else f"{number:04d}" for _, number in CARDS], dtype=object
+    )[card_ids]
+
+    df = pd.DataFrame({
+        "Date (YYYY-MM-DD as UTC)": dates,
+        "Time (HH:MM:SS)": _random_times(rng, rows),
+        "Merchant": merchants[rng.choice(len(merchants), rows, p=merchant_weights)],
+        "Txn Amount (Funding Card)": amounts,
+        "Txn Currency (Funding Card)": "EUR",
+        "Txn Amount (Foreign Spend)": foreign_amounts,
+        "Txn Currency (Foreign Spend)": foreign,
+        "Card Name": card_names,
+        "Card Last 4 Digits": card_numbers,
+        "Type": "PURCHASE",
+        "Category": categories[category_ids],
+        "Notes": notes,
+        "Export Format": "v2",
+    })
+
+    # Rows the pipeline filters out
+    refunds = rng.random(rows) < REFUND_RATE
+    df.loc[refunds, "Type"] = EXCLUDE_TYPES[0]
+    excluded = np.flatnonzero(rng.random(rows) < EXCLUDED_RATE)
+    kinds = rng.integers(0, 3, len(excluded))
+    df.loc[excluded[kinds == 0], "Notes"] = EXCLUDE_NOTES[0]
+    df.loc[excluded[kinds == 1], "Txn Currency (Funding Card)"] = EXCLUDE_CURRENCIES[0]
+    df.loc[excluded[kinds == 2], "Card Last 4 Digits"] = f"{EXCLUDE_CARD_LAST4[0]:04d}"
+
+    # Duplicates: the same merchant, date and amount re-exported, sometimes at a later time
+    duplicates = np.flatnonzero(rng.random(rows) < DUPLICATE_RATE)
+    if len(duplicates):
+        sources = rng.integers(0, rows, len(duplicates))
+        key_columns = ["Date (YYYY-MM-DD as UTC)", "Merchant", "Txn Amount (Funding Card)", "Category", "Card Name"]
+        for column in key_columns:
+            df.iloc[duplicates, df.columns.get_loc(column)] = df[column].to_numpy()[sources]
+        same_time = rng.random(len(duplicates)) < 0.5
+        df.iloc[duplicates[same_time], df.columns.get_loc("Time (HH:MM:SS)")] = (
+            df["Time (HH:MM:SS)"].to_numpy()[sources[same_time]]
+        )
+
+    return df
+
+
+def iter_synthetic_blocks(rows: int, seed: int = 0, **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Generate a synthetic Curve export block by block.
+
+    Args:
+        rows: Total number of rows
+        seed: Random seed (the same rows and seed always give the same data)
+        **kwargs: Passed to generate_block (start_date, days)
+
+    Yields:
+        DataFrames of at most SYNTHETIC_BLOCK_ROWS rows
+    """
+    for block, start in enumerate(range(0, rows, SYNTHETIC_BLOCK_ROWS)):
+        yield generate_block(min(SYNTHETIC_BLOCK_ROWS, rows - start), seed=seed, block=block, **kwargs)
+
+
+def generate_curve_csv(
+    path: Path,
+    rows: int,
+    seed: int = 0,
+    overwrite: bool = False,
+    **kwargs
+) -> Path:
+    """
+    Write a synthetic Curve export CSV.
+
+    The file is written block by block, so memory use does not grow with the
+    number of rows. An existing file is reused unless overwrite is True.
+
+    Args:
+        path: Output CSV path
+        rows: Number of rows
+        seed: Random seed
+        overwrite: If True, regenerate an existing file
+        **kwargs: Passed to generate_block (start_date, days)
+
+    Returns:
+        Path of the CSV file
+    """
+    path = Path(path)
+    if path.exists() and not overwrite:
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for i, block in enumerate(iter_synthetic_blocks(rows, seed=seed, **kwargs)):
+            block.to_csv(f, index=False, header=(i == 0))
+    tmp_path.replace(path)
+    return path
+
+
+def synthetic_csv_path(directory: Path, rows: int, seed: int = 0) -> Path:
+    """Get the file name used for a synthetic export of a given size and seed."""
+    return Path(directory) / f"synthetic_{rows}_seed{seed}.csv"
+
+
+def parse_row_count(value: str) -> int:
+    """
+    Parse a row count such as "10k", "1M" or "250000".
+
+    Args:
+        value: Row count, optionally with a k/M suffix
+
+    Returns:
+        Number of rows
+    """
+    value = value.strip().lower().replace("_", "")
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def format_row_count(rows: int) -> str:
+    """Format a row count compactly (e.g. 1000000 -> "1M")."""
+    for suffix, size in (("M", 1_000_000), ("k", 1_000)):
+        if rows >= size and rows % size == 0:
+            return f"{rows // size}{suffix}"
+    return str(rows)
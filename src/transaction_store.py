@@ -0,0 +1,542 @@
+"""Persistent columnar store for processed transactions (Parquet partitioned by month)."""
+
+import json
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .config import TRANSACTION_STORE_DIR, STORE_SEGMENT_RETENTION
+from .data_cleaner import add_datetime_column
+from .file_lock import file_lock
+from .dedup_index import DEDUP_INDEX_FILE, DedupIndex, drop_duplicate_keys, hash_keys
+from .card_resolver import parse_card_last4, resolve_card_names
+from .categorizer import CATEGORY_VOCABULARIES
+from .schema import concat_frames, encode_categoricals
+
+
+# Lock file that serializes the writers of a store (e.g. auto_process and the app)
+STORE_LOCK_FILE = "_write.lock"
+
+# Optional column of rows passed to write_transactions: the file each row
+# came from (recorded in the dedup index, never written to the partitions)
+SOURCE_COLUMN = "_source"
+
+# Stands in for missing values when rows are compared (NaN != NaN)
+_MISSING = object()
+
+
+def _require_pyarrow():
+    """Raise a helpful ImportError if the Parquet engine is missing."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError(
+            "pyarrow package is not installed. Install it with: pip install pyarrow"
+        )
+
+
+def get_store_dir(store_dir: Optional[Path] = None) -> Path:
+    """Get the transaction store directory."""
+    return Path(store_dir) if store_dir is not None else TRANSACTION_STORE_DIR
+
+
+def partition_path(year: int, month: int, store_dir: Optional[Path] = None) -> Path:
+    """Get the Parquet file of one year/month partition."""
+    return get_store_dir(store_dir) / f"{int(year):04d}" / f"{int(year):04d}-{int(month):02d}.parquet"
+
+
+def list_partitions(store_dir: Optional[Path] = None) -> List[Path]:
+    """List all partition files in the store, oldest month first."""
+    directory = get_store_dir(store_dir)
+    if not directory.exists():
+        return []
+    return sorted(directory.glob("[0-9][0-9][0-9][0-9]/*.parquet"))
+
+
+def manifest_path(store_dir: Optional[Path] = None) -> Path:
+    """Get the manifest file listing the published segments."""
+    return get_store_dir(store_dir) / "manifest.json"
+
+
+def segment_path(version: int, store_dir: Optional[Path] = None) -> Path:
+    """Get the Parquet file of the segment published as a manifest version."""
+    return get_store_dir(store_dir) / "segments" / f"{int(version):08d}.parquet"
+
+
+def lock_path(store_dir: Optional[Path] = None) -> Path:
+    """Get the lock file of the store."""
+    return get_store_dir(store_dir) / STORE_LOCK_FILE
+
+
+@contextmanager
+def store_lock(store_dir: Optional[Path] = None):
+    """
+    Hold the exclusive write lock of the store (see file_lock).
+    
+    Args:
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+    """
+    with file_lock(lock_path(store_dir)):
+        yield
+
+
+def read_manifest(store_dir: Optional[Path] = None) -> dict:
+    """
+    Read the store manifest.
+    
+    Every write of the store publishes a new manifest version. A merge adds
+    an immutable segment with the rows it added; a replace starts over
+    (reset_version) without segments.
+    
+    Args:
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+        
+    Returns:
+        Dictionary with 'version', 'reset_version' and 'segments' (list of
+        {'version', 'file', 'rows', 'created'}, oldest first)
+    """
+    path = manifest_path(store_dir)
+    if path.exists():
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"version": 0, "reset_version": 0, "segments": []}
+
+
+def _publish_manifest(manifest: dict, store_dir: Optional[Path] = None):
+    """Publish a manifest atomically and delete segments it no longer lists."""
+    path = manifest_path(store_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+    
+    listed = {get_store_dir(store_dir) / segment["file"] for segment in manifest["segments"]}
+    segment_dir = get_store_dir(store_dir) / "segments"
+    if segment_dir.exists():
+        for stale in segment_dir.glob("*.parquet"):
+            if stale not in listed:
+                stale.unlink(missing_ok=True)
+
+
+def publish_segment(df: pd.DataFrame, store_dir: Optional[Path] = None) -> int:
+    """
+    Publish rows added to the store as a new segment.
+    
+    The segment file is written and renamed into place before the manifest
+    that lists it, so readers only ever see complete segments. Only the
+    newest STORE_SEGMENT_RETENTION segments are kept. The caller must hold
+    store_lock, or two writers could publish the same version.
+    
+    Args:
+        df: Rows added to the store
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+        
+    Returns:
+        New manifest version
+    """
+    manifest = read_manifest(store_dir)
+    version = manifest["version"] + 1
+    path = segment_path(version, store_dir)
+    _write_parquet_atomic(df.sort_values(by=['date', 'time'], kind='stable').reset_index(drop=True), path)
+    
+    segments = manifest["segments"] + [{
+        "version": version,
+        "file": path.relative_to(get_store_dir(store_dir)).as_posix(),
+        "rows": len(df),
+        "created": datetime.now().isoformat(),
+    }]
+    _publish_manifest({
+        "version": version,
+        "reset_version": manifest["reset_version"],
+        "segments": segments[-STORE_SEGMENT_RETENTION:],
+    }, store_dir)
+    return version
+
+
+def _publish_reset(store_dir: Optional[Path] = None) -> int:
+    """Publish a manifest version that invalidates all segments (after a replace)."""
+    version = read_manifest(store_dir)["version"] + 1
+    _publish_manifest({"version": version, "reset_version": version, "segments": []}, store_dir)
+    return version
+
+
+def _write_parquet_atomic(df: pd.DataFrame, path: Path):
+    """Write a Parquet file to a temporary name and rename it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _drop_source(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the SOURCE_COLUMN (if any) of rows about to be written."""
+    return df.drop(columns=SOURCE_COLUMN) if SOURCE_COLUMN in df.columns else df
+
+
+def _remove_partitions(paths):
+    """Delete partition files and the year directories left empty."""
+    for path in paths:
+        path.unlink(missing_ok=True)
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+
+def _read_partition(path: Path) -> pd.DataFrame:
+    """Read one partition, adding 'dt' to partitions written before it existed."""
+    df = pd.read_parquet(path)
+    if 'dt' not in df.columns and 'date' in df.columns:
+        df = add_datetime_column(df, copy=False)
+    return df
+
+
+def merge_transactions(existing: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge new transactions into existing ones.
+    
+    Uses the same cross-file deduplication as process_new_files: rows with the
+    same merchant, date and amount are duplicates and the last one by time
+    wins (new rows win ties).
+    
+    Args:
+        existing: Transactions already stored
+        new: Newly processed transactions
+        
+    Returns:
+        Merged DataFrame sorted by date and time
+    """
+    frames = [frame for frame in (existing, new) if not frame.empty]
+    if not frames:
+        return new
+    
+    combined = drop_duplicate_keys(concat_frames(frames))
+    combined = combined.sort_values(by=['date', 'time'], kind='stable').reset_index(drop=True)
+    
+    return combined
+
+
+def dedup_index_path(store_dir: Optional[Path] = None) -> Path:
+    """Get the dedup index file of the store."""
+    return get_store_dir(store_dir) / DEDUP_INDEX_FILE
+
+
+def load_dedup_index(store_dir: Optional[Path] = None) -> DedupIndex:
+    """
+    Load the dedup index of the store.
+    
+    The index is rebuilt from the stored transactions if it is missing or
+    unreadable (e.g. a store written before the index existed).
+    
+    Args:
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+        
+    Returns:
+        DedupIndex of the stored transactions
+    """
+    path = dedup_index_path(store_dir)
+    if path.exists():
+        try:
+            return DedupIndex.load(path)
+        except Exception:
+            pass
+    
+    index = DedupIndex.from_frame(load_transactions(store_dir))
+    if list_partitions(store_dir):
+        index.save(path)
+    return index
+
+
+def write_transactions(
+    df: pd.DataFrame,
+    store_dir: Optional[Path] = None,
+    replace: bool = False,
+    superseded: Optional[List[str]] = None
+) -> int:
+    """
+    Write processed transactions to the store.
+    
+    Rows that lose against an already stored duplicate are dropped through
+    the dedup index without reading the store. Only the year/month
+    partitions of the remaining rows are rewritten; each one is replaced
+    atomically so readers never see a half-written file. The written rows
+    are then published as a segment (see publish_segment), so running
+    readers can load just them. The whole read-modify-write of partitions,
+    dedup index and manifest runs under store_lock.
+    
+    The source of every row (its SOURCE_COLUMN value, "" without the
+    column) is recorded in the dedup index. Rows edited in the app (see
+    write_edits) are never overwritten by ingested rows.
+    
+    Args:
+        df: Processed transactions (must have a 'date' column)
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+        replace: If True, df replaces the whole store instead of being merged
+            into the existing partitions. The new partitions are written
+            first and the months missing from df are removed only after
+            that, so a failed replace never leaves the store empty
+        superseded: Sources (file paths) whose stored rows df replaces, e.g.
+            files whose already ingested rows changed. Their rows that df
+            does not have are removed; edited rows and the rows of other
+            sources are kept (see _supersede)
+        
+    Returns:
+        Number of partitions written
+    """
+    _require_pyarrow()
+    
+    with store_lock(store_dir):
+        edited = None
+        if superseded:
+            df, edited = _supersede(df, superseded, store_dir)
+            replace = True
+        return _write_transactions_locked(df, store_dir, replace, edited)
+
+
+def write_edits(df: pd.DataFrame, store_dir: Optional[Path] = None) -> int:
+    """
+    Replace the store with transactions edited in the app.
+    
+    Rows that differ from their stored version (or whose key is not stored)
+    are marked as edited, so re-ingesting their export never overwrites
+    them. Sources of stored keys are kept.
+    
+    Args:
+        df: All transactions, as loaded from the store and then edited
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+        
+    Returns:
+        Number of partitions written
+    """
+    _require_pyarrow()
+    
+    with store_lock(store_dir):
+        index = load_dedup_index(store_dir)
+        if df.empty or 'date' not in df.columns:
+            return _write_transactions_locked(df, store_dir, True)
+        
+        keys = hash_keys(df)
+        changed = _changed_rows(df, keys, load_transactions(store_dir))
+        sources = index.source_of(keys)
+        sources[~index.contains(keys)] = ""
+        
+        df = df.assign(**{SOURCE_COLUMN: sources})
+        edited = np.union1d(index.edited_keys(), keys[changed])
+        return _write_transactions_locked(df, store_dir, True, edited)
+
+
+def _changed_rows(df: pd.DataFrame, keys: np.ndarray, stored: pd.DataFrame) -> np.ndarray:
+    """Find the rows of df that are not stored, or differ from their stored version."""
+    if stored.empty:
+        return np.ones(len(df), dtype=bool)
+    
+    positions = pd.Index(hash_keys(stored)).get_indexer(keys)
+    found = positions >= 0
+    same = np.ones(found.sum(), dtype=bool)
+    
+    for col in df.columns.intersection(stored.columns):
+        values = []
+        for frame, rows in ((df, found), (stored, positions[found])):
+            column = frame[col].astype(object)
+            values.append(column.where(column.notna(), _MISSING).to_numpy()[rows])
+        same &= np.asarray(values[0] == values[1], dtype=bool)
+    
+    changed = ~found
+    changed[found] = ~same
+    return changed
+
+
+def _supersede(
+    df: pd.DataFrame,
+    superseded: List[str],
+    store_dir: Optional[Path]
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Combine df with the stored rows it does not supersede (store_lock held).
+    
+    Stored rows of the superseded sources are dropped, except edited rows:
+    those are kept and win over their re-ingested version. Rows of other
+    sources are kept and deduplicated with df as in a merge. Rows of unknown
+    source (stores written before sources were recorded) are kept as well,
+    with a warning, because rows deleted from the superseded files cannot be
+    told apart from them.
+    
+    Args:
+        df: Current rows of the superseded sources (and any other new rows)
+        superseded: Sources whose stored rows df replaces
+        store_dir: Store directory
+        
+    Returns:
+        Tuple of (all rows of the store after the write, edited keys)
+    """
+    stored = load_transactions(store_dir)
+    if stored.empty:
+        return df, np.array([], dtype=np.uint64)
+    
+    index = load_dedup_index(store_dir)
+    keys = hash_keys(stored)
+    sources = index.source_of(keys)
+    edited = index.is_edited(keys)
+    
+    unknown = pd.isna(sources) & ~edited
+    if unknown.any():
+        warnings.warn(
+            f"{int(unknown.sum())} stored transaction(s) have no recorded source file. They are kept, "
+            f"so rows deleted from {', '.join(superseded)} may remain in the transaction store."
+        )
+    
+    keep = ~pd.Series(sources).isin(superseded).to_numpy() | edited
+    kept = stored.take(np.flatnonzero(keep))
+    kept[SOURCE_COLUMN] = sources[keep]
+    
+    # Edited rows win over their re-ingested version, whatever its time
+    edited_keys = keys[edited]
+    if not df.empty:
+        df = df.take(np.flatnonzero(~np.isin(hash_keys(df), edited_keys)))
+        if SOURCE_COLUMN not in df.columns:
+            df[SOURCE_COLUMN] = ""
+    
+    frames = [frame for frame in (kept, df) if not frame.empty]
+    if not frames:
+        return df, edited_keys
+    
+    combined = drop_duplicate_keys(concat_frames(frames))
+    return combined.reset_index(drop=True), edited_keys
+
+
+def _write_transactions_locked(
+    df: pd.DataFrame,
+    store_dir: Optional[Path],
+    replace: bool,
+    edited: Optional[np.ndarray] = None
+) -> int:
+    """Body of write_transactions (the caller holds store_lock); edited keys are marked after a replace."""
+    if df.empty or 'date' not in df.columns:
+        if replace:
+            _remove_partitions(list_partitions(store_dir))
+            dedup_index_path(store_dir).unlink(missing_ok=True)
+            _publish_reset(store_dir)
+        return 0
+    
+    index = DedupIndex() if replace else load_dedup_index(store_dir)
+    if not replace:
+        df = index.filter_new(drop_duplicate_keys(df))
+        if df.empty:
+            return 0
+    
+    written = []
+    for (year, month), part in df.groupby([df['date'].dt.year, df['date'].dt.month]):
+        path = partition_path(year, month, store_dir)
+        part = _drop_source(part)
+        
+        if not replace and path.exists():
+            part = merge_transactions(_read_partition(path), part)
+        else:
+            part = part.sort_values(by=['date', 'time'], kind='stable').reset_index(drop=True)
+        
+        _write_parquet_atomic(part, path)
+        written.append(path)
+    
+    index.update(df, df[SOURCE_COLUMN].to_numpy(dtype=object) if SOURCE_COLUMN in df.columns else None)
+    if edited is not None:
+        index.mark_edited(edited)
+    index.save(dedup_index_path(store_dir))
+    
+    # The new months are in place: only now drop the months df does not have
+    if replace:
+        _remove_partitions(set(list_partitions(store_dir)) - set(written))
+    
+    # Readers of the store pick up the new rows from the segment (or reload after a replace)
+    if replace:
+        _publish_reset(store_dir)
+    else:
+        publish_segment(_drop_source(df), store_dir)
+    
+    return len(written)
+
+
+def load_transactions(store_dir: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Load all stored transactions.
+
+    Args:
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+
+    Returns:
+        DataFrame sorted by date and time (empty if the store is empty)
+    """
+    partitions = list_partitions(store_dir)
+    if not partitions:
+        return pd.DataFrame()
+
+    _require_pyarrow()
+
+    # Partitions are stored sorted and listed in month order
+    return _finish_loaded(concat_frames([_read_partition(path) for path in partitions]))
+
+
+def load_segments_since(
+    version: int,
+    store_dir: Optional[Path] = None
+) -> Tuple[Optional[pd.DataFrame], int]:
+    """
+    Load the rows published after a manifest version.
+    
+    Args:
+        version: Manifest version the caller's data is at
+        store_dir: Store directory. If None, uses TRANSACTION_STORE_DIR
+        
+    Returns:
+        Tuple of (new rows, or None if the caller must reload the whole store
+        because the store was replaced or segments were pruned; current version)
+    """
+    manifest = read_manifest(store_dir)
+    current = manifest["version"]
+    if current == version:
+        return pd.DataFrame(), current
+    
+    segments = [segment for segment in manifest["segments"] if segment["version"] > version]
+    reachable = (
+        current > version
+        and manifest["reset_version"] <= version
+        and segments
+        and segments[0]["version"] == version + 1
+    )
+    if not reachable:
+        return None, current
+    
+    _require_pyarrow()
+    
+    try:
+        frames = [_read_partition(get_store_dir(store_dir) / segment["file"]) for segment in segments]
+    except FileNotFoundError:
+        # Pruned by a concurrent writer
+        return None, current
+    
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(), current
+    return _finish_loaded(concat_frames(frames)), current
+
+
+def _finish_loaded(df: pd.DataFrame) -> pd.DataFrame:
+    """Re-resolve cards and restore the categoricals of rows read from the store."""
+    # Apply the current CARD_MAPPING, so cards added to it need no reprocess
+    if 'card_last4' in df.columns:
+        df['card_last4'] = parse_card_last4(df['card_last4'])
+        if 'card' in df.columns:
+            df['card'] = resolve_card_names(df['card_last4'], df['card'])
+
+    # Restore the category vocabularies (and encode partitions written as text)
+    df = encode_categoricals(df, CATEGORY_VOCABULARIES, copy=False)
+
+    return df
@@ -0,0 +1,447 @@
+"""In-process vector index: memory-mapped float32 vectors with a JSON metadata sidecar."""
+
+import json
+import os
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .config import VECTOR_INDEX_IVF_MIN_ROWS, VECTOR_INDEX_IVF_PROBES
+
+SIDECAR_FILE = "index.json"
+
+# Rows copied or scored at a time when the vectors file is rewritten
+REWRITE_CHUNK_ROWS = 65_536
+
+# IVF training: sample rows per list and k-means iterations
+IVF_SAMPLE_PER_LIST = 32
+IVF_ITERATIONS = 10
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """L2-normalize vectors (as float32), so dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.float32(1e-12))
+
+
+def train_ivf_centroids(vectors: np.ndarray, lists: int, seed: int = 0) -> np.ndarray:
+    """
+    Train IVF list centroids by spherical k-means on a sample of the vectors.
+
+    Args:
+        vectors: Normalized float32 vectors (may be a memmap)
+        lists: Number of lists (centroids)
+        seed: Random seed of the sample and the initial centroids
+
+    Returns:
+        Normalized float32 centroids of shape (lists, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), lists * IVF_SAMPLE_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, lists, replace=False)].copy()
+
+    for _ in range(IVF_ITERATIONS):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        filled = np.bincount(assignment, minlength=lists) > 0
+        # Lists that lost all their rows keep their previous centroid
+        centroids[filled] = normalize_rows(sums[filled])
+    return centroids
+
+
+def assign_ivf_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Assign every vector to the list of its most similar centroid (in chunks)."""
+    lists = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), REWRITE_CHUNK_ROWS):
+        block = np.asarray(vectors[start:start + REWRITE_CHUNK_ROWS])
+        lists[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return lists
+
+
+class NumpyVectorIndex:
+    """
+    Vector index of one collection, answering top-k queries by dot product.
+
+    Vectors are stored normalized in a .npy file that is memory-mapped for
+    queries; ids, documents and metadatas are kept in a JSON sidecar that
+    also names the current vectors file. Every upsert writes a new vectors
+    file and then the sidecar (each renamed into place), so readers always
+    see a consistent pair. Deleted rows are blanked in the sidecar and
+    dropped at the next upsert. Inside batch() the writes are published
+    together, as one new sidecar.
+
+    From ivf_min_rows vectors up the rows are grouped into IVF lists (about
+    sqrt(rows) / 2 k-means centroids) and stored list by list; a query only
+    scores the rows of the probes lists nearest to it.
+
+    The methods mirror the subset of the ChromaDB collection API that
+    vector_store uses (get, upsert, update, delete, query, count).
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ivf_min_rows: int = VECTOR_INDEX_IVF_MIN_ROWS,
+        probes: int = VECTOR_INDEX_IVF_PROBES
+    ):
+        """
+        Open (or create) an index.
+
+        Args:
+            directory: Index directory
+            ivf_min_rows: Row count from which the index is partitioned (IVF)
+            probes: IVF lists searched per query
+        """
+        self.directory = Path(directory)
+        self.ivf_min_rows = ivf_min_rows
+        self.probes = probes
+        self._sidecar_stat = None
+        self._batch_depth = 0
+        self._unpublished = False
+        self._reset()
+        self._refresh()
+
+    @property
+    def sidecar_path(self) -> Path:
+        return self.directory / SIDECAR_FILE
+
+    def _reset(self):
+        """Set the state of an empty index."""
+        self.version = 0
+        self.ids: List[Optional[str]] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[dict]] = []
+        self.vectors = None
+        self.vectors_file = None
+        self.centroids = None
+        self.centroids_file = None
+        self.list_offsets = None
+        self.trained_rows = 0
+        self._positions: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+
+    def _refresh(self):
+        """Reload the index if another writer published a new sidecar."""
+        if self._batch_depth:
+            # Keep the unpublished changes of the batch
+            return
+        try:
+            stat = self.sidecar_path.stat()
+        except FileNotFoundError:
+            if self._sidecar_stat is not None:
+                self._reset()
+                self._sidecar_stat = None
+            return
+        # The sidecar is replaced by rename: a new inode means a new version
+        if (stat.st_ino, stat.st_mtime_ns) == self._sidecar_stat:
+            return
+
+        with open(self.sidecar_path, 'r') as f:
+            sidecar = json.load(f)
+        self._reset()
+        self.version = sidecar["version"]
+        self.ids = sidecar["ids"]
+        self.documents = sidecar["documents"]
+        self.metadatas = sidecar["metadatas"]
+        self.trained_rows = sidecar.get("trained_rows", 0)
+        self.vectors_file = sidecar["vectors"]
+        self.centroids_file = sidecar["centroids"]
+        if self.vectors_file:
+            self.vectors = np.load(self.directory / self.vectors_file, mmap_mode="r")
+        if self.centroids_file:
+            self.centroids = np.load(self.directory / self.centroids_file)
+            self.list_offsets = np.asarray(sidecar["list_offsets"], dtype=np.int64)
+        self._positions = {entry_id: row for row, entry_id in enumerate(self.ids) if entry_id is not None}
+        self._alive = np.array([entry_id is not None for entry_id in self.ids], dtype=bool)
+        self._sidecar_stat = (stat.st_ino, stat.st_mtime_ns)
+
+    def _file_name(self, kind: str) -> str:
+        return f"{kind}-{self.version:08d}.npy"
+
+    def _publish(self):
+        """Write the sidecar atomically and delete files it no longer names."""
+        sidecar = {
+            "version": self.version,
+            "vectors": self.vectors_file,
+            "centroids": self.centroids_file,
+            "list_offsets": self.list_offsets.tolist() if self.list_offsets is not None else None,
+            "trained_rows": self.trained_rows,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.sidecar_path.with_name(SIDECAR_FILE + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(sidecar, f)
+        os.replace(tmp_path, self.sidecar_path)
+        stat = self.sidecar_path.stat()
+        self._sidecar_stat = (stat.st_ino, stat.st_mtime_ns)
+
+        for stale in self.directory.glob("*.npy"):
+            if stale.name not in (self.vectors_file, self.centroids_file):
+                stale.unlink(missing_ok=True)
+
+    def _changed(self):
+        """Publish a write now, or at the end of the current batch."""
+        if self._batch_depth:
+            self._unpublished = True
+        else:
+            self._publish()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group writes (delete, update, upsert) into one published version.
+
+        The sidecar is written once, when the outermost batch ends. If the
+        batch raises, its changes are discarded and the index reloads the
+        last published version.
+
+        Yields:
+            The index
+        """
+        self._refresh()
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._unpublished = False
+                self._sidecar_stat = None
+                self._reset()
+                self._refresh()
+            raise
+        self._batch_depth -= 1
+        if not self._batch_depth and self._unpublished:
+            self._unpublished = False
+            self._publish()
+
+    def count(self) -> int:
+        """Number of stored entries."""
+        self._refresh()
+        return len(self._positions)
+
+    def get(self, ids: Optional[Sequence[str]] = None, include: Optional[List[str]] = None) -> dict:
+        """
+        Get stored entries.
+
+        Args:
+            ids: Ids to get. If None, gets every entry
+            include: Ignored (documents and metadatas are always returned)
+
+        Returns:
+            Dictionary with 'ids', 'documents' and 'metadatas' lists
+        """
+        self._refresh()
+        rows = list(self._positions.values()) if ids is None else [
+            self._positions[entry_id] for entry_id in ids if entry_id in self._positions
+        ]
+        return {
+            'ids': [self.ids[row] for row in rows],
+            'documents': [self.documents[row] for row in rows],
+            'metadatas': [self.metadatas[row] for row in rows],
+        }
+
+    def delete(self, ids: Sequence[str]):
+        """Delete entries (their vectors are dropped at the next upsert)."""
+        self._refresh()
+        for entry_id in ids:
+            row = self._positions.pop(entry_id, None)
+            if row is not None:
+                self.ids[row] = self.documents[row] = self.metadatas[row] = None
+                self._alive[row] = False
+        self._changed()
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[dict]):
+        """Replace the metadata of stored entries (vectors are unchanged)."""
+        self._refresh()
+        for entry_id, metadata in zip(ids, metadatas):
+            row = self._positions.get(entry_id)
+            if row is not None:
+                self.metadatas[row] = metadata
+        self._changed()
+
+    def upsert(self, ids: Sequence[str], embeddings, documents: Sequence[str], metadatas: Sequence[dict]):
+        """
+        Add entries, replacing stored entries with the same id.
+
+        Writes a new vectors file holding the kept and the new rows (grouped
+        by IVF list when partitioned).
+
+        Args:
+            ids: Entry ids
+            embeddings: Vectors (all of the same dimension)
+            documents: Entry documents
+            metadatas: Entry metadatas
+        """
+        self._refresh()
+        if not len(ids):
+            return
+        new = normalize_rows(embeddings)
+        if self.vectors is not None and new.shape[1] != self.vectors.shape[1]:
+            raise ValueError(f"Embedding dimension {new.shape[1]} does not match the index ({self.vectors.shape[1]})")
+
+        # Last occurrence of a repeated id wins
+        latest = {entry_id: position for position, entry_id in enumerate(ids)}
+        new_rows = np.fromiter(latest.values(), dtype=np.int64, count=len(latest))
+        kept = np.array([
+            row for entry_id, row in self._positions.items() if entry_id not in latest
+        ], dtype=np.int64)
+        kept.sort()
+
+        sources = {
+            'ids': [self.ids[row] for row in kept] + [ids[i] for i in new_rows],
+            'documents': [self.documents[row] for row in kept] + [documents[i] for i in new_rows],
+            'metadatas': [self.metadatas[row] for row in kept] + [metadatas[i] for i in new_rows],
+        }
+        total = len(sources['ids'])
+
+        def gather(selection: np.ndarray) -> np.ndarray:
+            """Rows of the combined (kept + new) vectors."""
+            block = np.empty((len(selection), new.shape[1]), dtype=np.float32)
+            from_kept = selection < len(kept)
+            if from_kept.any():
+                block[from_kept] = self.vectors[kept[selection[from_kept]]]
+            block[~from_kept] = new[new_rows[selection[~from_kept] - len(kept)]]
+            return block
+
+        # Partition into IVF lists (retrained when the index has doubled since training)
+        order = np.arange(total)
+        centroids = None
+        list_offsets = None
+        if total >= self.ivf_min_rows:
+            centroids = self.centroids
+            if centroids is None or total >= 2 * self.trained_rows:
+                lists = max(int(np.sqrt(total) / 2), 1)
+                centroids = train_ivf_centroids(_Rows(gather, total, new.shape[1]), lists, seed=self.version)
+                self.trained_rows = total
+            assignment = assign_ivf_lists(_Rows(gather, total, new.shape[1]), centroids)
+            order = np.argsort(assignment, kind='stable')
+            list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))])
+        else:
+            self.trained_rows = 0
+
+        self.version += 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+        vectors_file = self._file_name("vectors")
+        tmp_path = self.directory / (vectors_file + ".tmp")
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(total, new.shape[1]))
+        for start in range(0, total, REWRITE_CHUNK_ROWS):
+            selection = order[start:start + REWRITE_CHUNK_ROWS]
+            out[start:start + len(selection)] = gather(selection)
+        out.flush()
+        del out
+        os.replace(tmp_path, self.directory / vectors_file)
+
+        centroids_file = None
+        if centroids is not None:
+            centroids_file = self._file_name("centroids")
+            np.save(self.directory / centroids_file, centroids)
+
+        self.ids = [sources['ids'][i] for i in order]
+        self.documents = [sources['documents'][i] for i in order]
+        self.metadatas = [sources['metadatas'][i] for i in order]
+        self.vectors_file = vectors_file
+        self.centroids = centroids
+        self.centroids_file = centroids_file
+        self.list_offsets = list_offsets
+        self._changed()
+
+        self.vectors = np.load(self.directory / vectors_file, mmap_mode="r")
+        self._positions = {entry_id: row for row, entry_id in enumerate(self.ids)}
+        self._alive = np.ones(total, dtype=bool)
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        """Rows to score for a query: all rows, or the rows of the nearest IVF lists."""
+        if self.centroids is None:
+            return None
+        probes = min(self.probes, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        return np.concatenate([
+            np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in np.sort(nearest)
+        ])
+
+    def query(self, query_embeddings, n_results: int = 10) -> dict:
+        """
+        Find the entries most similar to each query vector.
+
+        Args:
+            query_embeddings: Query vectors
+            n_results: Entries returned per query
+
+        Returns:
+            Dictionary with 'ids', 'documents', 'metadatas' and 'distances'
+            (cosine distance, 1 - similarity) lists, one list per query
+        """
+        self._refresh()
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        for query in normalize_rows(query_embeddings):
+            if self.vectors is None or not self._positions:
+                rows = np.zeros(0, dtype=np.int64)
+                scores = np.zeros(0, dtype=np.float32)
+            else:
+                candidates = self._candidates(query)
+                if candidates is None:
+                    scores = self.vectors @ query
+                    rows = np.arange(len(scores))
+                else:
+                    scores = self.vectors[candidates] @ query
+                    rows = candidates
+                alive = self._alive[rows]
+                rows, scores = rows[alive], scores[alive]
+
+            k = min(n_results, len(rows))
+            if k < len(rows):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(rows))
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+            results['ids'].append([self.ids[row] for row in rows[top]])
+            results['documents'].append([self.documents[row] for row in rows[top]])
+            results['metadatas'].append([self.metadatas[row] for row in rows[top]])
+            results['distances'].append((1.0 - scores[top]).astype(float).tolist())
+        return results
+
+
+class _Rows:
+    """Read-only row view over the vectors being written (for IVF training and assignment)."""
+
+    def __init__(self, gather, rows: int, dim: int):
+        self._gather = gather
+        self.shape = (rows, dim)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, selection) -> np.ndarray:
+        if isinstance(selection, slice):
+            selection = np.arange(*selection.indices(self.shape[0]))
+        return self._gather(np.asarray(selection, dtype=np.int64))
+
+
+_INDEXES: Dict[Path, NumpyVectorIndex] = {}
+
+
+def open_vector_index(directory: Path) -> NumpyVectorIndex:
+    """
+    Get the index of a directory (opened once per process and reused).
+
+    Args:
+        directory: Index directory
+
+    Returns:
+        NumpyVectorIndex (reloads itself when another process writes it)
+    """
+    directory = Path(directory).resolve()
+    if directory not in _INDEXES:
+        _INDEXES[directory] = NumpyVectorIndex(directory)
+    return _INDEXES[directory]
@@ -1,21 +1,44 @@
-"""Vector store module for RAG implementation using ChromaDB."""
+"""Vector store module for RAG implementation using ChromaDB (or the in-process numpy index)."""
 
+import numpy as np
 import pandas as pd
+from contextlib import nullcontext
 from typing import List, Dict, Optional
 from pathlib import Path
 import os
 
+from .config import EMBEDDING_MODEL, EMBEDDING_CACHE_ENABLED, VECTOR_INDEX_BACKEND
+from .embedding_backends import EmbeddingBackend, OpenAIEmbeddingBackend, get_embedding_backend
+from .embedding_cache import EmbeddingCache
+from .vector_index import NumpyVectorIndex, open_vector_index
 
-def initialize_vector_store(db_path: str):
+# Chroma clients by database path (opening a PersistentClient is slow)
+_CHROMA_CLIENTS = {}
+
+
+def initialize_vector_store(db_path: str, collection_name: str = "transactions"):
     """
-    Initialize Chroma vector database.
+    Initialize the vector database (VECTOR_INDEX_BACKEND).
+    
+    With the "numpy" backend the collection is a NumpyVectorIndex under
+    db_path/numpy/<collection_name> (no client, no chromadb needed). Clients
+    and indexes are opened once per process and reused.
     
     Args:
         db_path: Path to the database directory
+        collection_name: Name of the collection
         
     Returns:
-        Chroma client and collection
+        Chroma client (None for the numpy backend) and collection
+        
+    Raises:
+        ValueError: If VECTOR_INDEX_BACKEND is unknown
     """
+    if VECTOR_INDEX_BACKEND == "numpy":
+        return None, open_vector_index(Path(db_path) / "numpy" / collection_name)
+    if VECTOR_INDEX_BACKEND != "chroma":
+        raise ValueError(f"Unknown vector index backend: {VECTOR_INDEX_BACKEND} (choose from chroma, numpy)")
+    
     try:
         import chromadb
         from chromadb.config import Settings
@@ -27,11 +50,13 @@ def initialize_vector_store(db_path: str):
     # Create directory if it doesn't exist
     Path(db_path).mkdir(parents=True, exist_ok=True)
     
-    # Initialize Chroma client (persistent mode)
-    client = chromadb.PersistentClient(path=db_path)
+    # Initialize Chroma client (persistent mode, one per path)
+    key = str(Path(db_path).resolve())
+    if key not in _CHROMA_CLIENTS:
+        _CHROMA_CLIENTS[key] = chromadb.PersistentClient(path=db_path)
+    client = _CHROMA_CLIENTS[key]
     
     # Get or create collection
-    collection_name = "transactions"
     try:
         collection = client.get_collection(name=collection_name)
     except:
@@ -43,43 +68,161 @@ def initialize_vector_store(db_path: str):
     return client, collection
 
 
-def create_embeddings(texts: List[str], api_key: str) -> List[List[float]]:
+def create_embeddings(texts: List[str], api_key: str, model: str = EMBEDDING_MODEL) -> List[List[float]]:
     """
     Create embeddings using OpenAI API.
     
+    Texts are sent in batches of at most EMBEDDING_BATCH_SIZE inputs and
+    EMBEDDING_BATCH_MAX_TOKENS estimated tokens, EMBEDDING_CONCURRENCY at a
+    time, through a shared client (see embedding_client).
+    
     Args:
         texts: List of text strings to embed
         api_key: OpenAI API key
+        model: Embedding model (default: EMBEDDING_MODEL)
         
     Returns:
         List of embedding vectors
     """
-    try:
-        from openai import OpenAI
-    except ImportError:
-        raise ImportError(
-            "OpenAI package is not installed. Install it with: pip install openai"
-        )
-    
-    if not api_key:
-        raise ValueError("API key is required")
+    return OpenAIEmbeddingBackend(model).embed(texts, api_key).tolist()
+
+
+def embed_texts(
+    texts: List[str],
+    api_key: Optional[str],
+    backend: Optional[EmbeddingBackend] = None,
+    use_cache: bool = EMBEDDING_CACHE_ENABLED
+) -> np.ndarray:
+    """
+    Get embeddings from a backend, embedding only texts not in the embedding cache.
     
+    Args:
+        texts: List of text strings to embed
+        api_key: OpenAI API key (not needed by the local backend)
+        backend: Embedding backend. If None, uses the EMBEDDING_BACKEND one
+        use_cache: If True, read and fill the on-disk cache (EMBEDDING_CACHE_DIR)
+            for backends worth caching
+        
+    Returns:
+        float32 array of embedding vectors aligned with texts
+    """
+    backend = backend or get_embedding_backend()
     if not texts:
-        return []
+        return np.empty((0, 0), dtype=np.float32)
+    if not use_cache or not backend.cacheable:
+        return backend.embed(texts, api_key)
     
-    try:
-        client = OpenAI(api_key=api_key)
+    cache = EmbeddingCache(backend.model)
+    cached = cache.get_many(texts)
+    
+    # Embed every missing text once, even if it repeats
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+    if missing:
+        new_vectors = backend.embed(missing, api_key)
+        cache.put_many(missing, new_vectors)
+        by_text = dict(zip(missing, new_vectors))
+        cached = [by_text[text] if vector is None else vector for text, vector in zip(texts, cached)]
+    
+    cache.save()
+    return np.asarray(cached, dtype=np.float32)
+
+
+def backend_collection_name(collection_name: str, backend: EmbeddingBackend) -> str:
+    """
+    Get the collection holding the vectors of an embedding backend.
+    
+    Vectors of different backends have different dimensions and must not
+    mix; the OpenAI backend keeps the plain name used before backends existed.
+    
+    Args:
+        collection_name: Base name of the collection
+        backend: Embedding backend
         
-        # Use text-embedding-3-small (cheap and fast)
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts
-        )
+    Returns:
+        Collection name
+    """
+    if isinstance(backend, OpenAIEmbeddingBackend):
+        return collection_name
+    return f"{collection_name}-{backend.model}"
+
+
+# Columns identifying a transaction in the vector store (not the positional index)
+TRANSACTION_ID_COLUMNS = ['date', 'time', 'merchant', 'amount', 'card']
+
+
+def transaction_ids(df: pd.DataFrame) -> List[str]:
+    """
+    Create stable, content-derived ids for transactions.
+    
+    The id hashes the identifying columns, so it does not depend on row
+    order or the DataFrame index. Rows with identical identifying values get
+    an occurrence suffix ("-1", "-2", ...) in row order.
+    
+    Args:
+        df: DataFrame with transaction data
         
-        return [item.embedding for item in response.data]
+    Returns:
+        List of ids aligned with the rows of df
+    """
+    columns = [col for col in TRANSACTION_ID_COLUMNS if col in df.columns]
+    if not columns:
+        raise ValueError(f"DataFrame has none of the id columns {TRANSACTION_ID_COLUMNS}")
+    
+    hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    occurrence = pd.Series(hashes).groupby(hashes, sort=False).cumcount().to_numpy()
+    
+    return [
+        f"{h:016x}" if n == 0 else f"{h:016x}-{n}"
+        for h, n in zip(hashes.tolist(), occurrence.tolist())
+    ]
+
+
+def transaction_metadatas(df: pd.DataFrame) -> List[Dict]:
+    """
+    Build the Chroma metadata of every transaction.
+    
+    Args:
+        df: DataFrame with transaction data
         
-    except Exception as e:
-        raise Exception(f"Error creating embeddings: {str(e)}")
+    Returns:
+        List of metadata dictionaries aligned with the rows of df
+    """
+    amount_col = 'adjusted_amount' if 'adjusted_amount' in df.columns else 'amount'
+    
+    def text(col):
+        if col not in df.columns:
+            return [''] * len(df)
+        return df[col].astype(object).where(df[col].notna(), 'nan').astype(str).tolist()
+    
+    amounts = df[amount_col].fillna(0).astype(float).tolist() if amount_col in df.columns else [0.0] * len(df)
+    
+    return [
+        {
+            'date': date,
+            'time': time,
+            'merchant': merchant,
+            'amount': amount,
+            'category': category,
+            'subcategory': subcategory
+        }
+        for date, time, merchant, amount, category, subcategory in zip(
+            text('date'), text('time'), text('merchant'), amounts, text('category'), text('2nd category')
+        )
+    ]
+
+
+def _collection_embeddings(collection, vectors: np.ndarray):
+    """Pass vectors as the collection expects them (Chroma validates for lists)."""
+    if isinstance(collection, NumpyVectorIndex):
+        return vectors
+    return vectors.tolist()
+
+
+def _write_batch(collection):
+    """Group the writes of one sync (one published version of a NumpyVectorIndex)."""
+    if isinstance(collection, NumpyVectorIndex):
+        return collection.batch()
+    return nullcontext()
 
 
 def store_transactions(
@@ -87,78 +230,102 @@ def store_transactions(
     collection_name: str, 
     api_key: str, 
     db_path: str,
-    clear_existing: bool = True
-):
+    clear_existing: bool = False
+) -> Dict[str, int]:
     """
     Store transactions in vector database.
     
+    The collection is updated incrementally: rows are matched to stored
+    entries by their content-derived id (see transaction_ids), only new rows
+    and rows whose document changed are embedded, rows whose metadata alone
+    changed are updated without embedding, and stored rows that are no
+    longer in df are deleted. Storing an unchanged dataset again makes no
+    embedding calls.
+    
+    Vectors come from the EMBEDDING_BACKEND backend; each backend has its
+    own collection (see backend_collection_name).
+    
     Args:
         df: DataFrame with transaction data
         collection_name: Name of the collection
-        api_key: OpenAI API key
+        api_key: OpenAI API key (not needed by the local backend)
         db_path: Path to the database directory
-        clear_existing: If True, clear existing collection before adding new transactions
+        clear_existing: If True, delete every stored entry and embed all rows again
+        
+    Returns:
+        Dictionary with the number of 'added', 'updated', 'deleted' and
+        'unchanged' transactions
     """
+    stats = {'added': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
     if df.empty:
-        return
+        return stats
     
     # Initialize vector store
-    client, collection = initialize_vector_store(db_path)
-    
-    # Clear existing collection if requested
-    if clear_existing:
-        try:
-            # Get all existing IDs and delete them
-            existing_data = collection.get()
-            if existing_data and 'ids' in existing_data and existing_data['ids']:
-                collection.delete(ids=existing_data['ids'])
-        except Exception as e:
-            # If collection is empty or doesn't exist, that's fine
-            pass
+    backend = get_embedding_backend()
+    client, collection = initialize_vector_store(db_path, backend_collection_name(collection_name, backend))
+    
+    # Entries already stored: id -> (document, metadata)
+    existing = collection.get(include=['documents', 'metadatas'])
+    stored = {
+        entry_id: (document, metadata)
+        for entry_id, document, metadata in zip(
+            existing.get('ids') or [],
+            existing.get('documents') or [],
+            existing.get('metadatas') or []
+        )
+    }
     
     # Format transactions for embedding
     from src.data_formatter import format_transactions_for_embedding
     transaction_texts = format_transactions_for_embedding(df)
+    ids = transaction_ids(df)
+    metadatas = transaction_metadatas(df)
     
-    # Create embeddings
-    embeddings = create_embeddings(transaction_texts, api_key)
-    
-    # Prepare metadata and create unique IDs
-    amount_col = 'adjusted_amount' if 'adjusted_amount' in df.columns else 'amount'
-    
-    ids = []
-    metadatas = []
-    
-    for idx, row in df.iterrows():
-        # Create unique ID from transaction data (date + merchant + amount + time if available)
-        date_str = str(row.get('date', ''))
-        merchant_str = str(row.get('merchant', ''))
-        amount_val = float(row.get(amount_col, 0))
-        time_str = str(row.get('time', '')) if 'time' in df.columns else ''
+    # One write batch: the numpy index publishes the whole sync as one version
+    with _write_batch(collection):
+        if clear_existing and stored:
+            collection.delete(ids=list(stored))
+            stats['deleted'] = len(stored)
+            stored = {}
         
-        # Create unique ID: hash of date + merchant + amount + time
-        import hashlib
-        unique_string = f"{date_str}|{merchant_str}|{amount_val}|{time_str}|{idx}"
-        unique_id = hashlib.md5(unique_string.encode()).hexdigest()
-        ids.append(unique_id)
+        # Diff against the stored entries
+        to_embed = []
+        to_update = []
+        for position, entry_id in enumerate(ids):
+            previous = stored.get(entry_id)
+            if previous is None or previous[0] != transaction_texts[position]:
+                to_embed.append(position)
+            elif previous[1] != metadatas[position]:
+                to_update.append(position)
         
-        metadata = {
-            'date': date_str,
-            'merchant': merchant_str,
-            'amount': amount_val,
-            'category': str(row.get('category', '')),
-            'subcategory': str(row.get('2nd category', '')),
-            'index': int(idx)  # Store original index for reference
-        }
-        metadatas.append(metadata)
-    
-    # Store in Chroma
-    collection.add(
-        ids=ids,
-        embeddings=embeddings,
-        documents=transaction_texts,
-        metadatas=metadatas
-    )
+        vanished = list(stored.keys() - set(ids))
+        if vanished:
+            collection.delete(ids=vanished)
+            stats['deleted'] += len(vanished)
+        
+        if to_update:
+            collection.update(
+                ids=[ids[i] for i in to_update],
+                metadatas=[metadatas[i] for i in to_update]
+            )
+        
+        if to_embed:
+            # Create embeddings (only for new or changed documents, through the embedding cache)
+            embeddings = embed_texts([transaction_texts[i] for i in to_embed], api_key, backend)
+            
+            # Store in Chroma
+            collection.upsert(
+                ids=[ids[i] for i in to_embed],
+                embeddings=_collection_embeddings(collection, embeddings),
+                documents=[transaction_texts[i] for i in to_embed],
+                metadatas=[metadatas[i] for i in to_embed]
+            )
+    
+    stats['added'] = sum(1 for i in to_embed if ids[i] not in stored)
+    stats['updated'] = len(to_embed) - stats['added'] + len(to_update)
+    stats['unchanged'] = len(ids) - len(to_embed) - len(to_update)
+    
+    return stats
 
 
 def search_relevant_transactions(
@@ -174,7 +341,7 @@ def search_relevant_transactions(
     Args:
         query: User's question/query
         collection_name: Name of the collection
-        api_key: OpenAI API key
+        api_key: OpenAI API key (not needed by the local backend)
         db_path: Path to the database directory
         top_k: Number of results to return
         
@@ -182,17 +349,18 @@ def search_relevant_transactions(
         List of relevant transactions with metadata
     """
     # Initialize vector store
-    client, collection = initialize_vector_store(db_path)
+    backend = get_embedding_backend()
+    client, collection = initialize_vector_store(db_path, backend_collection_name(collection_name, backend))
     
     # Create query embedding
-    query_embeddings = create_embeddings([query], api_key)
+    query_embeddings = embed_texts([query], api_key, backend)
     
-    if not query_embeddings:
+    if not len(query_embeddings):
         return []
     
     # Search in Chroma
     results = collection.query(
-        query_embeddings=query_embeddings,
+        query_embeddings=_collection_embeddings(collection, query_embeddings),
         n_results=top_k
     )
     
@@ -0,0 +1,76 @@
+"""add_second_category must match the row-wise get_second_category path."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.categorizer import add_second_category, get_second_category
+from src.config import CATEGORY_MAPPING
+from src.synthetic_data import generate_block
+
+
+def _row_wise(df: pd.DataFrame) -> pd.Series:
+    """The old path: df.apply(get_second_category, axis=1)."""
+    return df.apply(get_second_category, axis=1)
+
+
+def _assert_matches_row_wise(df: pd.DataFrame):
+    expected = _row_wise(df)
+    result = add_second_category(df)
+
+    assert result['2nd category'].tolist() == expected.tolist()
+    assert '2nd category' not in df.columns
+
+
+def _edge_cases() -> pd.DataFrame:
+    """Mixed case, surrounding whitespace, missing and non-string values."""
+    category, mapping = next((name, notes) for name, notes in CATEGORY_MAPPING.items() if notes)
+    note = next(iter(mapping))
+    rows = [
+        (category, note),
+        (category.lower(), note),
+        (category.upper(), note),
+        (f"  {category}\t", f" {note} "),
+        (category, note.lower()),
+        (category, np.nan),
+        (np.nan, note),
+        (np.nan, np.nan),
+        (None, None),
+        (category, 1),
+        (category, 2.5),
+        (7, note),
+        (category, ''),
+        ('', note),
+        ('Not A Category', note),
+        (category, 'not a note'),
+    ]
+    return pd.DataFrame(rows, columns=['category', 'notes'])
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    """Category and notes columns of a synthetic export."""
+    raw = generate_block(20_000, seed=5)
+    return pd.DataFrame({'category': raw['Category'], 'notes': raw['Notes']})
+
+
+def test_matches_row_wise_on_synthetic_data(synthetic):
+    _assert_matches_row_wise(synthetic)
+
+
+def test_matches_row_wise_on_edge_cases():
+    _assert_matches_row_wise(_edge_cases())
+
+
+def test_matches_row_wise_on_categorical_input(synthetic):
+    df = pd.concat([synthetic, _edge_cases()], ignore_index=True)
+    df['category'] = df['category'].astype('category')
+    df['notes'] = df['notes'].astype(str).where(df['notes'].notna()).astype('category')
+
+    _assert_matches_row_wise(df)
+
+
+def test_missing_columns_are_left_alone():
+    df = pd.DataFrame({'category': ['Transport']})
+
+    assert '2nd category' not in add_second_category(df).columns
@@ -0,0 +1,62 @@
+"""Concurrent writers of the embedding cache."""
+
+import hashlib
+import threading
+
+import numpy as np
+
+from src.embedding_cache import INDEX_FILE, EmbeddingCache
+
+DIM = 8
+
+
+def _vector(text: str) -> np.ndarray:
+    """A vector that identifies its text."""
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed).random(DIM, dtype=np.float32)
+
+
+def _put(cache_dir, texts, batch: int = 5, max_bytes: int = 1 << 30):
+    """Add texts a few at a time, each batch through a new cache (as embed_texts does)."""
+    for start in range(0, len(texts), batch):
+        chunk = texts[start:start + batch]
+        cache = EmbeddingCache("stub-model", cache_dir, max_bytes=max_bytes)
+        cache.get_many(chunk)
+        cache.put_many(chunk, [_vector(text) for text in chunk])
+        cache.save()
+
+
+def _run_writers(cache_dir, writers: int = 8, per_writer: int = 60, **kwargs) -> list:
+    texts = [[f"writer {w} text {i}" for i in range(per_writer)] for w in range(writers)]
+    threads = [threading.Thread(target=_put, args=(cache_dir, chunk), kwargs=kwargs) for chunk in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [text for chunk in texts for text in chunk]
+
+
+def test_concurrent_writers_keep_keys_and_vectors_paired(tmp_path):
+    texts = _run_writers(tmp_path)
+
+    cache = EmbeddingCache("stub-model", tmp_path)
+    vectors = cache.get_many(texts)
+
+    assert len(cache) == len(texts)
+    for text, vector in zip(texts, vectors):
+        np.testing.assert_array_equal(vector, _vector(text))
+
+
+def test_eviction_under_concurrent_writers_never_mispairs(tmp_path):
+    capacity = 100
+    texts = _run_writers(tmp_path, max_bytes=capacity * DIM * 4)
+
+    cache = EmbeddingCache("stub-model", tmp_path)
+    vectors = cache.get_many(texts)
+    hits = [(text, vector) for text, vector in zip(texts, vectors) if vector is not None]
+
+    assert 0 < len(hits) <= capacity
+    for text, vector in hits:
+        np.testing.assert_array_equal(vector, _vector(text))
+    assert sorted(path.name for path in cache.directory.iterdir() if path.suffix == ".f32") == [cache.vectors_file]
+    assert (cache.directory / INDEX_FILE).exists()
@@ -0,0 +1,114 @@
+"""embedding_client against a local stub of the embeddings endpoint."""
+
+import base64
+import json
+import random
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import embedding_client
+from src.config import EMBEDDING_BATCH_MAX_TOKENS, EMBEDDING_BATCH_SIZE
+from src.embedding_client import embed, estimate_tokens, split_batches
+
+
+def _vector(text: str) -> list:
+    """The stub's embedding of a text: its number and length."""
+    return [float(text.split(":")[0]), float(len(text))]
+
+
+class StubEmbeddings(BaseHTTPRequestHandler):
+    """POST /v1/embeddings: shuffled response order, the first request gets a 429."""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append(len(body["input"]))
+            rate_limited = not server.rate_limited
+            server.rate_limited = True
+
+        if rate_limited:
+            self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+            return
+
+        data = []
+        for index, text in enumerate(body["input"]):
+            vector = _vector(text)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode()
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        random.Random(len(server.requests)).shuffle(data)
+
+        self._reply(200, {
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    def _reply(self, status: int, payload: dict):
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """Run the stub on a free local port; yields the server (its base URL in base_url)."""
+    pytest.importorskip("openai")
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+    monkeypatch.setattr(embedding_client, "RETRY_BASE_SECONDS", 0.0)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEmbeddings)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.rate_limited = False
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    embedding_client.get_client.cache_clear()
+
+
+def _texts(count: int, width: int = 0) -> list:
+    return [f"{i}:" + "x" * width for i in range(count)]
+
+
+@pytest.mark.parametrize("texts", [
+    pytest.param(_texts(2 * EMBEDDING_BATCH_SIZE + 100), id="split-by-count"),
+    pytest.param(_texts(600, width=1000), id="split-by-tokens"),
+])
+def test_embed_keeps_input_order_and_retries_429(stub_server, texts):
+    batches = split_batches(texts)
+    assert len(batches) > 1
+
+    vectors = embed(texts, "test-key", model="stub-model", base_url=stub_server.base_url, concurrency=4)
+
+    assert vectors == [_vector(text) for text in texts]
+    # Every batch once, plus the retry of the rate-limited one
+    assert len(stub_server.requests) == len(batches) + 1
+    assert sorted(set(stub_server.requests)) == sorted({end - start for start, end in batches})
+
+
+def test_split_batches_limits_count_and_tokens():
+    by_count = split_batches(_texts(2 * EMBEDDING_BATCH_SIZE + 100))
+    assert [end - start for start, end in by_count] == [EMBEDDING_BATCH_SIZE, EMBEDDING_BATCH_SIZE, 100]
+
+    long_texts = _texts(600, width=1000)
+    by_tokens = split_batches(long_texts)
+    assert len(by_tokens) > 1
+    for start, end in by_tokens:
+        assert end - start <= EMBEDDING_BATCH_SIZE
+        assert sum(estimate_tokens(text) for text in long_texts[start:end]) <= EMBEDDING_BATCH_MAX_TOKENS
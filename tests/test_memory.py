@@ -0,0 +1,64 @@
+"""Peak memory of the owned (copy-once) pipeline execution."""
+
+import io
+import threading
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from src.pipeline import process_dataframe
+from src.synthetic_data import generate_block
+
+
+@pytest.fixture(scope="module")
+def export_frame():
+    """A synthetic export as read from CSV (original column names and dtypes)."""
+    buffer = io.StringIO()
+    generate_block(50_000, seed=3).to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+
+def _peak_bytes(func, *args, **kwargs) -> int:
+    """Peak traced allocation while running func."""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_process_dataframe_peak_memory_near_2x_input(export_frame):
+    input_bytes = export_frame.memory_usage(deep=True).sum()
+
+    peak = _peak_bytes(process_dataframe, export_frame, verbose=False, profile=False)
+
+    assert peak <= 2 * input_bytes, f"peak {peak / 1e6:.1f} MB for {input_bytes / 1e6:.1f} MB input"
+
+
+def test_process_dataframe_leaves_input_and_options_untouched(export_frame):
+    before = export_frame.copy()
+
+    process_dataframe(export_frame, verbose=False, profile=False)
+
+    pd.testing.assert_frame_equal(export_frame, before)
+    assert pd.get_option("mode.copy_on_write") is False
+
+
+def test_concurrent_runs_match_a_single_run(export_frame):
+    expected = process_dataframe(export_frame, verbose=False, profile=False)
+    results = [None] * 2
+
+    def run(slot):
+        results[slot] = process_dataframe(export_frame, verbose=False, profile=False)
+
+    threads = [threading.Thread(target=run, args=(slot,)) for slot in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for result in results:
+        pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,82 @@
+"""Ingesting changed exports keeps uploaded and edited transactions."""
+
+import pandas as pd
+import pytest
+
+from src import pipeline, transaction_store
+from src.dedup_index import hash_keys
+from src.pipeline import process_dataframe, process_files, save_edited_data, save_processed_data
+from src.synthetic_data import generate_block
+from src.transaction_store import load_transactions
+
+pytest.importorskip("pyarrow")
+
+EDITED_NOTES = "edited in the app"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Point the processed files log and the transaction store at tmp_path."""
+    monkeypatch.setattr(pipeline, "PROCESSED_DATA_DIR", tmp_path)
+    monkeypatch.setattr(transaction_store, "TRANSACTION_STORE_DIR", tmp_path / "transactions")
+    return tmp_path
+
+
+def _write_export(path, lines):
+    path.write_text("".join(lines))
+
+
+def _keys(df: pd.DataFrame) -> set:
+    return set(hash_keys(df).tolist())
+
+
+def _edit_first_row(keys: set) -> int:
+    """Edit the notes of the first stored row whose key is in keys; returns its key."""
+    df = load_transactions()
+    position = next(i for i, key in enumerate(hash_keys(df).tolist()) if key in keys)
+    df['notes'] = df['notes'].astype(object)
+    df.loc[df.index[position], 'notes'] = EDITED_NOTES
+    save_edited_data(df)
+    return int(hash_keys(df)[position])
+
+
+def _notes_of(key: int) -> str:
+    df = load_transactions()
+    return df['notes'].to_numpy()[hash_keys(df) == key][0]
+
+
+def test_changed_export_keeps_uploads_and_edits(store):
+    lines = generate_block(3_000, seed=21).to_csv(index=False).splitlines(keepends=True)
+    export = store / "export.csv"
+    _write_export(export, lines)
+    process_files([export], verbose=False, workers=1)
+
+    uploaded = process_dataframe(generate_block(500, seed=22), verbose=False, profile=False)
+    save_processed_data(uploaded)
+
+    # The export drops its first 1000 rows: their stored rows must go
+    _write_export(export, lines[:1] + lines[1001:])
+    current = pipeline.process_transactions(str(export), verbose=False, cache=False)
+    edited_key = _edit_first_row(_keys(current))
+
+    process_files([export], verbose=False, workers=1)
+
+    stored = _keys(load_transactions())
+    assert stored == _keys(current) | _keys(uploaded)
+    assert _notes_of(edited_key) == EDITED_NOTES
+
+
+def test_overlapping_export_does_not_overwrite_edits(store):
+    lines = generate_block(2_000, seed=23).to_csv(index=False).splitlines(keepends=True)
+    export = store / "export.csv"
+    _write_export(export, lines)
+    process_files([export], verbose=False, workers=1)
+    stored = load_transactions()
+    edited_key = _edit_first_row(_keys(stored))
+
+    # Appended rows repeat the whole export (same keys and times)
+    _write_export(export, lines + lines[1:])
+    process_files([export], verbose=False, workers=1)
+
+    assert _keys(load_transactions()) == _keys(stored)
+    assert _notes_of(edited_key) == EDITED_NOTES
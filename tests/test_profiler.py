@@ -0,0 +1,35 @@
+"""Profiling reports of concurrent pipeline runs."""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from src.profiler import StageProfiler, load_profile_report, load_profile_reports
+
+
+def _save_report(path, source: str):
+    """Profile one stage and add its report to path (run in a worker process)."""
+    profiler = StageProfiler(source=source)
+    with profiler.stage("load"):
+        pass
+    profiler.save(path)
+
+
+def test_concurrent_saves_keep_every_run(tmp_path):
+    path = tmp_path / "pipeline_profile.json"
+    sources = [f"file_{i}.csv" for i in range(16)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_save_report, [path] * len(sources), sources))
+
+    runs = load_profile_reports(path)
+    assert sorted(run["source"] for run in runs) == sorted(sources)
+    assert load_profile_report(path) == runs[-1]
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_single_run_report_still_loads(tmp_path):
+    path = tmp_path / "pipeline_profile.json"
+    report = StageProfiler(source="old.csv").report()
+    path.write_text(json.dumps(report))
+
+    assert load_profile_reports(path) == [report]
+    assert load_profile_report(path) == report
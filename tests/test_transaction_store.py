@@ -0,0 +1,41 @@
+"""Concurrent writers of the transaction store."""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.pipeline import process_dataframe
+from src.synthetic_data import generate_block
+from src.transaction_store import load_dedup_index, load_transactions, read_manifest, write_transactions
+
+WRITERS = 4
+BATCHES = 4
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture(scope="module")
+def processed():
+    """Processed synthetic transactions (one row per dedup key)."""
+    return process_dataframe(generate_block(5_000, seed=11), verbose=False, profile=False)
+
+
+def _write_share(store_dir, df, writer: int):
+    """Write every WRITERS-th row of df in BATCHES separate writes."""
+    share = df.iloc[writer::WRITERS]
+    for batch in range(BATCHES):
+        write_transactions(share.iloc[batch::BATCHES], store_dir)
+
+
+def test_concurrent_writers_lose_no_rows(tmp_path, processed):
+    with ProcessPoolExecutor(max_workers=WRITERS) as executor:
+        futures = [executor.submit(_write_share, tmp_path, processed, writer) for writer in range(WRITERS)]
+        for future in futures:
+            future.result()
+
+    manifest = read_manifest(tmp_path)
+
+    assert len(load_transactions(tmp_path)) == len(processed)
+    assert len(load_dedup_index(tmp_path)) == len(processed)
+    assert manifest["version"] == WRITERS * BATCHES
+    assert sum(segment["rows"] for segment in manifest["segments"]) == len(processed)
@@ -0,0 +1,73 @@
+"""vector_store against a Chroma-like collection (the default chroma backend)."""
+
+import pytest
+
+from src import vector_store
+from src.embedding_backends import HashingEmbeddingBackend
+from src.pipeline import process_dataframe
+from src.synthetic_data import generate_block
+
+
+class ListOnlyCollection:
+    """In-memory collection that validates embeddings like chromadb 0.4 does."""
+
+    def __init__(self):
+        self.entries = {}
+
+    @staticmethod
+    def _validate(embeddings):
+        if not isinstance(embeddings, list):
+            raise ValueError(f"Expected embeddings to be a list, got {type(embeddings).__name__}")
+        for embedding in embeddings:
+            if not isinstance(embedding, list) or not all(isinstance(value, (int, float)) for value in embedding):
+                raise ValueError("Expected each embedding to be a list of numbers")
+
+    def get(self, ids=None, include=None):
+        keys = list(self.entries) if ids is None else [key for key in ids if key in self.entries]
+        return {
+            'ids': keys,
+            'documents': [self.entries[key][1] for key in keys],
+            'metadatas': [self.entries[key][2] for key in keys],
+        }
+
+    def delete(self, ids):
+        for key in ids:
+            self.entries.pop(key, None)
+
+    def update(self, ids, metadatas):
+        for key, metadata in zip(ids, metadatas):
+            embedding, document, _ = self.entries[key]
+            self.entries[key] = (embedding, document, metadata)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self._validate(embeddings)
+        for entry in zip(ids, embeddings, documents, metadatas):
+            self.entries[entry[0]] = entry[1:]
+
+    def query(self, query_embeddings, n_results=10):
+        self._validate(query_embeddings)
+        keys = list(self.entries)[:n_results]
+        return {
+            'ids': [keys],
+            'documents': [[self.entries[key][1] for key in keys]],
+            'metadatas': [[self.entries[key][2] for key in keys]],
+            'distances': [[0.0] * len(keys)],
+        }
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = ListOnlyCollection()
+    monkeypatch.setattr(vector_store, "get_embedding_backend", lambda: HashingEmbeddingBackend())
+    monkeypatch.setattr(vector_store, "initialize_vector_store", lambda db_path, name: (None, collection))
+    return collection
+
+
+def test_store_and_search_pass_lists_to_chroma(collection, tmp_path):
+    df = process_dataframe(generate_block(200, seed=2), verbose=False, profile=False)
+
+    stats = vector_store.store_transactions(df, "transactions", None, str(tmp_path))
+    results = vector_store.search_relevant_transactions("groceries", "transactions", None, str(tmp_path), top_k=5)
+
+    assert stats['added'] == len(collection.entries) == len(df)
+    assert len(results) == 5